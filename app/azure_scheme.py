@@ -6,10 +6,10 @@ class AzureScheme:
     _scheme: OidcAuthorizationCodeBearer | None = None
 
     @classmethod
-    def init(cls, tenant_id: str, client_id: str):
+    def init(cls, tenant_id: str, client_id: str, config_url: str | None = None):
         cls._scheme = OidcAuthorizationCodeBearer(
             name="Azure AD",
-            config_url=get_azure_oidc_config_url(tenant_id),
+            config_url=config_url or get_azure_oidc_config_url(tenant_id),
             client_id=client_id,
             scopes={
                 f"api://{client_id}/user_impersonation": "user_impersonation",
@@ -0,0 +1,197 @@
+import asyncio
+import logging
+from functools import cache
+from typing import Callable
+
+import orjson
+from fastapi import Depends, FastAPI, Request
+from fastapi.middleware.asyncexitstack import AsyncExitStackMiddleware
+from slowapi.errors import RateLimitExceeded
+from starlette.middleware.exceptions import ExceptionMiddleware
+from starlette.routing import Match
+from starlette.types import Message, Scope
+
+from app.config import Settings, get_settings
+from app.middleware import RequestMetricsMiddleware
+from app.models.batch import BatchRequestItem, BatchResponseItem
+
+logger = logging.getLogger(__name__)
+
+# copied from the batch request, the others are set per sub-request
+_SCOPE_KEYS = (
+    "type",
+    "asgi",
+    "http_version",
+    "scheme",
+    "server",
+    "client",
+    "root_path",
+    "app",
+)
+
+# describe the body of the batch request, not the one of the sub-request
+_EXCLUDED_HEADERS = frozenset(
+    [
+        b"accept",
+        b"accept-encoding",
+        b"content-length",
+        b"content-type",
+        b"expect",
+        b"idempotency-key",
+    ]
+)
+
+
+class BatchExecutor:
+    def __init__(self, app: FastAPI, max_concurrency: int = 10) -> None:
+        """Runs the sub-requests of a batch in-process through the routes of `app`.
+
+        The sub-requests skip the middlewares of the app except the request
+        metrics, and share the state of the batch request, so the authentication
+        of the batch request is reused instead of verifying the token again. Each
+        sub-request is charged to the default rate limit of its route like a
+        request of its own. Sub-requests are JSON only.
+
+        Args:
+            app (FastAPI): The app routing the sub-requests.
+            max_concurrency (int, optional): The maximum number of sub-requests of
+                a batch running at the same time. Defaults to 10.
+        """
+        self.app = app
+        self.max_concurrency = max_concurrency
+
+        exception_handlers = {
+            key: handler
+            for key, handler in app.exception_handlers.items()
+            if key not in (500, Exception)
+        }
+        # the innermost part of the middleware stack built by FastAPI
+        self._app = RequestMetricsMiddleware(
+            ExceptionMiddleware(
+                AsyncExitStackMiddleware(app.router), handlers=exception_handlers
+            )
+        )
+
+    async def execute(
+        self, request: Request, items: list[BatchRequestItem]
+    ) -> list[BatchResponseItem]:
+        scopes = [self._scope(request, item) for item in items]
+        # charged before running any of them, like the middleware of the app does
+        limited = [self._check_rate_limit(scope) for scope in scopes]
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(
+            item: BatchRequestItem, scope: Scope, limited: BatchResponseItem | None
+        ) -> BatchResponseItem:
+            if limited is not None:
+                return limited
+            async with semaphore:
+                return await self._call(scope, item)
+
+        return await asyncio.gather(*map(run, items, scopes, limited))
+
+    def _scope(self, request: Request, item: BatchRequestItem) -> Scope:
+        path, _, query_string = item.path.partition("?")
+
+        headers = [
+            (name, value)
+            for name, value in request.scope["headers"]
+            if name not in _EXCLUDED_HEADERS
+        ]
+        headers.append((b"accept", b"application/json"))
+        if item.body is not None:
+            headers.append((b"content-type", b"application/json"))
+
+        return {
+            **{key: request.scope[key] for key in _SCOPE_KEYS if key in request.scope},
+            # holds the authenticated user of the batch request
+            "state": request.scope.setdefault("state", {}),
+            "method": item.method,
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query_string.encode(),
+            "headers": headers,
+            "batch": True,
+        }
+
+    def _check_rate_limit(self, scope: Scope) -> BatchResponseItem | None:
+        limiter = getattr(self.app.state, "limiter", None)
+        if limiter is None or not limiter.enabled:
+            return None
+
+        handler = self._handler(scope)
+        if handler is None:
+            return None
+
+        name = f"{handler.__module__}.{handler.__name__}"
+        # the decorators of the routes check their own limits
+        if name in limiter._exempt_routes or name in limiter._route_limits:
+            return None
+
+        # keyed like the requests the middleware checks before authentication
+        try:
+            limiter._check_request_limit(Request({**scope, "state": {}}), handler, True)
+        except RateLimitExceeded as error:
+            return BatchResponseItem(
+                status=429, body={"error": f"Rate limit exceeded: {error.detail}"}
+            )
+        return None
+
+    def _handler(self, scope: Scope) -> Callable | None:
+        for route in self.app.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL and hasattr(route, "endpoint"):
+                return route.endpoint
+        return None
+
+    async def _call(self, scope: Scope, item: BatchRequestItem) -> BatchResponseItem:
+        body = orjson.dumps(item.body) if item.body is not None else b""
+        request_sent = False
+        status = 500
+        content_type = b""
+        chunks: list[bytes] = []
+
+        async def receive() -> Message:
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            # streaming responses end with the sub-request
+            return {"type": "http.disconnect"}
+
+        async def send(message: Message):
+            nonlocal status, content_type
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                content_type = dict(message.get("headers", [])).get(
+                    b"content-type", b""
+                )
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        try:
+            await self._app(scope, receive, send)
+        except Exception:
+            logger.exception("Batch request %s %s failed", item.method, item.path)
+            return BatchResponseItem(
+                status=500, body={"detail": "Internal Server Error"}
+            )
+
+        content = b"".join(chunks)
+        if not content:
+            return BatchResponseItem(status=status)
+        if content_type.startswith(b"application/json"):
+            return BatchResponseItem(status=status, body=orjson.loads(content))
+        return BatchResponseItem(status=status, body=content.decode(errors="replace"))
+
+
+@cache
+def _batch_executor(app: FastAPI, max_concurrency: int) -> BatchExecutor:
+    return BatchExecutor(app, max_concurrency=max_concurrency)
+
+
+def get_batch_executor(
+    request: Request, settings: Settings = Depends(get_settings)
+) -> BatchExecutor:
+    return _batch_executor(request.app, settings.BATCH_MAX_CONCURRENCY)
@@ -1,4 +1,6 @@
 import multiprocessing
+import os
+import tempfile
 from functools import cache
 from typing import Literal
 
@@ -9,7 +11,9 @@ from pydantic import (
     Field,
     PostgresDsn,
     RedisDsn,
+    SecretStr,
     condecimal,
+    confloat,
     conint,
     constr,
 )
@@ -38,11 +42,77 @@ class Settings(BaseSettings):
         ..., env="OPENAPI_CLIENT_ID"
     )
     API_CLIENT_ID: constr(strip_whitespace=True) = Field(..., env="API_CLIENT_ID")
+    # enables the on-behalf-of token exchange for downstream APIs, see app.on_behalf_of
+    API_CLIENT_SECRET: SecretStr | None = Field(default=None, env="API_CLIENT_SECRET")
+    # seconds before their expiry at which downstream tokens are exchanged again
+    OBO_TOKEN_REFRESH_MARGIN_S: confloat(ge=0) = Field(
+        default=300,
+        env="OBO_TOKEN_REFRESH_MARGIN_S",
+    )
+    OBO_TOKEN_CACHE_MAX_SIZE: conint(gt=0) = Field(
+        default=10_000,
+        env="OBO_TOKEN_CACHE_MAX_SIZE",
+    )
+    # OpenID Connect discovery URL of a local identity provider, e.g. the stand-in of
+    # the load tests, instead of the Azure AD tenant
+    OIDC_CONFIG_URL: AnyHttpUrl | None = Field(default=None, env="OIDC_CONFIG_URL")
 
     POSTGRES_CONNECTION_STRING: PostgresDsn = Field(
         ..., env="POSTGRES_CONNECTION_STRING"
     )
     REDIS_CONNECTION_STRING: RedisDsn | None = Field(env="REDIS_CONNECTION_STRING")
+    # the outbound client shared by the worker, HTTP/2 requires the http2 extra
+    HTTP_CLIENT_HTTP2: bool = Field(default=True, env="HTTP_CLIENT_HTTP2")
+    HTTP_CLIENT_MAX_CONNECTIONS: conint(gt=0) = Field(
+        default=100,
+        env="HTTP_CLIENT_MAX_CONNECTIONS",
+    )
+    HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS: conint(ge=0) = Field(
+        default=20,
+        env="HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS",
+    )
+    HTTP_CLIENT_KEEPALIVE_EXPIRY_S: confloat(gt=0) = Field(
+        default=60,
+        env="HTTP_CLIENT_KEEPALIVE_EXPIRY_S",
+    )
+    HTTP_CLIENT_TIMEOUT_S: confloat(gt=0) = Field(
+        default=10,
+        env="HTTP_CLIENT_TIMEOUT_S",
+    )
+    # background jobs in Redis, only enable them with a deployed consumer
+    # `python -m app.jobs.worker`, otherwise the queue grows without limit
+    JOBS_ENABLED: bool = Field(default=False, env="JOBS_ENABLED")
+    JOB_QUEUE_NAME: str = Field(default="default", env="JOB_QUEUE_NAME")
+    JOB_WORKER_CONCURRENCY: conint(gt=0) = Field(
+        default=10,
+        env="JOB_WORKER_CONCURRENCY",
+    )
+    JOB_WORKER_POLL_INTERVAL_MS: confloat(gt=0) = Field(
+        default=100,
+        env="JOB_WORKER_POLL_INTERVAL_MS",
+    )
+    JOB_MAX_ATTEMPTS: conint(gt=0) = Field(default=5, env="JOB_MAX_ATTEMPTS")
+    JOB_TIMEOUT_S: confloat(gt=0) = Field(default=60, env="JOB_TIMEOUT_S")
+    # the retry delays double from the backoff up to the maximum
+    JOB_RETRY_BACKOFF_S: confloat(gt=0) = Field(default=1, env="JOB_RETRY_BACKOFF_S")
+    JOB_RETRY_BACKOFF_MAX_S: confloat(gt=0) = Field(
+        default=300,
+        env="JOB_RETRY_BACKOFF_MAX_S",
+    )
+    # pool connections opened at startup before /ready reports the worker as ready
+    DB_POOL_PREWARM_CONNECTIONS: conint(ge=0, le=5) = Field(
+        default=2,
+        env="DB_POOL_PREWARM_CONNECTIONS",
+    )
+    # seconds a result of the /ready dependency checks is reused
+    READINESS_CHECK_TTL_S: confloat(ge=0) = Field(
+        default=5,
+        env="READINESS_CHECK_TTL_S",
+    )
+    READINESS_CHECK_TIMEOUT_S: confloat(gt=0) = Field(
+        default=2,
+        env="READINESS_CHECK_TIMEOUT_S",
+    )
 
     GUNICORN_LOG_LEVEL: LOG_LEVELS = Field(default="INFO", env="GUNICORN_LOG_LEVEL")
     DEFAULT_LOG_LEVEL: LOG_LEVELS = Field(default="WARNING", env="DEFAULT_LOG_LEVEL")
@@ -57,12 +127,83 @@ class Settings(BaseSettings):
         },
         env="LOG_CONFIG",
     )
+    ACCESS_LOG_ENABLED: bool = Field(default=True, env="ACCESS_LOG_ENABLED")
+    # requests that are never logged, as "METHOD /path" or "/path" for all methods
+    ACCESS_LOG_EXCLUDED: list[str] = Field(
+        default=["GET /health", "GET /ready", "/oauth2-redirect", "GET /metrics"],
+        env="ACCESS_LOG_EXCLUDED",
+    )
+    # 4xx/5xx responses and slow requests are always logged
+    ACCESS_LOG_SUCCESS_SAMPLE_RATE: confloat(ge=0, le=1) = Field(
+        default=1.0,
+        env="ACCESS_LOG_SUCCESS_SAMPLE_RATE",
+    )
+    ACCESS_LOG_SLOW_REQUEST_THRESHOLD_MS: confloat(ge=0) = Field(
+        default=1000,
+        env="ACCESS_LOG_SLOW_REQUEST_THRESHOLD_MS",
+    )
+
+    # records waiting to be written by the logging thread of a worker
+    LOG_QUEUE_MAX_SIZE: conint(gt=0) = Field(default=10_000, env="LOG_QUEUE_MAX_SIZE")
+    LOG_QUEUE_FULL_POLICY: Literal["drop", "block"] = Field(
+        default="drop",
+        env="LOG_QUEUE_FULL_POLICY",
+    )
 
     # https://docs.gunicorn.org/en/stable/design.html#how-many-workers
     WORKER_COUNT: conint(gt=0, le=multiprocessing.cpu_count() * 2 + 1) = Field(
         default=multiprocessing.cpu_count() * 2 + 1,
         env="WORKER_COUNT",
     )
+    # uvicorn event loop and HTTP parser, see app.gunicorn_worker.WORKER_PROFILES
+    WORKER_PROFILE: Literal["default", "throughput", "compat"] = Field(
+        default="default",
+        env="WORKER_PROFILE",
+    )
+    # maximum concurrent connections and requests per worker before it responds 503
+    WORKER_LIMIT_CONCURRENCY: conint(gt=0) | None = Field(
+        default=None,
+        env="WORKER_LIMIT_CONCURRENCY",
+    )
+    WORKER_H11_MAX_INCOMPLETE_EVENT_SIZE: conint(gt=0) | None = Field(
+        default=None,
+        env="WORKER_H11_MAX_INCOMPLETE_EVENT_SIZE",
+    )
+    # pending connections of the listening socket
+    WORKER_BACKLOG: conint(gt=0) = Field(default=2048, env="WORKER_BACKLOG")
+    # seconds a worker may be silent before the arbiter restarts it
+    WORKER_TIMEOUT_S: conint(gt=0) = Field(default=30, env="WORKER_TIMEOUT_S")
+    # seconds a worker gets to finish its requests when it is restarted
+    WORKER_GRACEFUL_TIMEOUT_S: conint(gt=0) = Field(
+        default=30,
+        env="WORKER_GRACEFUL_TIMEOUT_S",
+    )
+    # 1 day because the app is deployed behind a load balancer
+    WORKER_KEEPALIVE_S: conint(gt=0) = Field(
+        default=24 * 60 * 60,
+        env="WORKER_KEEPALIVE_S",
+    )
+    # recycle workers after a random number of requests in
+    # [max_requests, max_requests + jitter], 0 disables it
+    WORKER_MAX_REQUESTS: conint(ge=0) = Field(default=0, env="WORKER_MAX_REQUESTS")
+    WORKER_MAX_REQUESTS_JITTER: conint(ge=0) = Field(
+        default=0,
+        env="WORKER_MAX_REQUESTS_JITTER",
+    )
+    # recycle workers whose resident set size exceeds the soft limit
+    WORKER_MEMORY_SOFT_LIMIT_MB: conint(gt=0) | None = Field(
+        default=None,
+        env="WORKER_MEMORY_SOFT_LIMIT_MB",
+    )
+    WORKER_MEMORY_CHECK_INTERVAL_S: confloat(gt=0) = Field(
+        default=10,
+        env="WORKER_MEMORY_CHECK_INTERVAL_S",
+    )
+    # maximum delay of a recycling so workers don't restart at the same moment
+    WORKER_RECYCLE_JITTER_S: confloat(ge=0) = Field(
+        default=60,
+        env="WORKER_RECYCLE_JITTER_S",
+    )
 
     APPLICATIONINSIGHTS_CONNECTION_STRING: constr(strip_whitespace=True) | None = Field(
         env="APPLICATIONINSIGHTS_CONNECTION_STRING",
@@ -72,12 +213,246 @@ class Settings(BaseSettings):
         default=1.0,
         env="TRACING_SAMPLER_RATE",
     )
+    # sampler rates by route template, e.g. {"/samples/{id}": 0.1}
+    TRACING_ROUTE_SAMPLER_RATES: dict[
+        str, condecimal(ge=0.0, le=1.0, decimal_places=5)
+    ] = Field(
+        default={},
+        env="TRACING_ROUTE_SAMPLER_RATES",
+    )
+    # per worker, None doesn't limit the sampled traces
+    TRACING_MAX_TRACES_PER_SECOND: confloat(gt=0) | None = Field(
+        default=None,
+        env="TRACING_MAX_TRACES_PER_SECOND",
+    )
+    # record unsampled traces and export them anyway if they failed or were slow
+    TRACING_TAIL_SAMPLING_ENABLED: bool = Field(
+        default=True,
+        env="TRACING_TAIL_SAMPLING_ENABLED",
+    )
+    TRACING_TAIL_LATENCY_THRESHOLD_MS: confloat(gt=0) = Field(
+        default=1000,
+        env="TRACING_TAIL_LATENCY_THRESHOLD_MS",
+    )
+    TRACING_TAIL_BUFFER_MAX_TRACES: conint(gt=0) = Field(
+        default=1000,
+        env="TRACING_TAIL_BUFFER_MAX_TRACES",
+    )
+
+    # target of the traces, logs and metrics, azure_monitor requires
+    # APPLICATIONINSIGHTS_CONNECTION_STRING, otlp the otlp extra and the
+    # OTEL_EXPORTER_OTLP_* environment variables, file writes NDJSON files
+    TELEMETRY_EXPORTER: Literal["azure_monitor", "otlp", "file"] = Field(
+        default="azure_monitor",
+        env="TELEMETRY_EXPORTER",
+    )
+    TELEMETRY_EXPORT_DIR: str = Field(
+        default=os.path.join(tempfile.gettempdir(), "app-telemetry"),
+        env="TELEMETRY_EXPORT_DIR",
+    )
+    # items are dropped and counted in app.telemetry.dropped when the queue is full
+    TELEMETRY_SPAN_QUEUE_MAX_SIZE: conint(gt=0) = Field(
+        default=2048,
+        env="TELEMETRY_SPAN_QUEUE_MAX_SIZE",
+    )
+    TELEMETRY_SPAN_BATCH_MAX_SIZE: conint(gt=0) = Field(
+        default=512,
+        env="TELEMETRY_SPAN_BATCH_MAX_SIZE",
+    )
+    TELEMETRY_SPAN_EXPORT_DELAY_MS: conint(gt=0) = Field(
+        default=5000,
+        env="TELEMETRY_SPAN_EXPORT_DELAY_MS",
+    )
+    TELEMETRY_LOG_QUEUE_MAX_SIZE: conint(gt=0) = Field(
+        default=2048,
+        env="TELEMETRY_LOG_QUEUE_MAX_SIZE",
+    )
+    TELEMETRY_LOG_BATCH_MAX_SIZE: conint(gt=0) = Field(
+        default=512,
+        env="TELEMETRY_LOG_BATCH_MAX_SIZE",
+    )
+    TELEMETRY_LOG_EXPORT_DELAY_MS: conint(gt=0) = Field(
+        default=5000,
+        env="TELEMETRY_LOG_EXPORT_DELAY_MS",
+    )
+    TELEMETRY_METRIC_EXPORT_INTERVAL_MS: conint(gt=0) = Field(
+        default=5000,
+        env="TELEMETRY_METRIC_EXPORT_INTERVAL_MS",
+    )
+    TELEMETRY_EXPORT_TIMEOUT_MS: conint(gt=0) = Field(
+        default=30_000,
+        env="TELEMETRY_EXPORT_TIMEOUT_MS",
+    )
 
     SYSTEM_METRICS_ENABLED: bool = Field(
         default=False,
         env="SYSTEM_METRICS_ENABLED",
     )
 
+    # serve the metrics of all workers in the Prometheus format on /metrics
+    METRICS_ENDPOINT_ENABLED: bool = Field(
+        default=False,
+        env="METRICS_ENDPOINT_ENABLED",
+    )
+    # shared by the workers, cleared when gunicorn starts
+    METRICS_MULTIPROCESS_DIR: str = Field(
+        default=os.path.join(tempfile.gettempdir(), "app-metrics"),
+        env="METRICS_MULTIPROCESS_DIR",
+    )
+    METRICS_EXPORT_INTERVAL_MS: conint(gt=0) = Field(
+        default=5000,
+        env="METRICS_EXPORT_INTERVAL_MS",
+    )
+
+    # records the event loop lag of the workers and logs the stacks of blocking code
+    EVENT_LOOP_MONITOR_ENABLED: bool = Field(
+        default=True,
+        env="EVENT_LOOP_MONITOR_ENABLED",
+    )
+    EVENT_LOOP_LAG_INTERVAL_MS: confloat(gt=0) = Field(
+        default=100,
+        env="EVENT_LOOP_LAG_INTERVAL_MS",
+    )
+    EVENT_LOOP_SLOW_CALLBACK_THRESHOLD_MS: confloat(gt=0) = Field(
+        default=100,
+        env="EVENT_LOOP_SLOW_CALLBACK_THRESHOLD_MS",
+    )
+    EVENT_LOOP_SLOW_CALLBACK_SAMPLE_RATE: confloat(ge=0, le=1) = Field(
+        default=1.0,
+        env="EVENT_LOOP_SLOW_CALLBACK_SAMPLE_RATE",
+    )
+    # minimum seconds between two logged stacks
+    EVENT_LOOP_SLOW_CALLBACK_REPORT_INTERVAL_S: confloat(ge=0) = Field(
+        default=10,
+        env="EVENT_LOOP_SLOW_CALLBACK_REPORT_INTERVAL_S",
+    )
+
+    # admin-only /diagnostics/profile endpoint and the `X-Profile: <token>` header
+    PROFILING_ENABLED: bool = Field(
+        default=False,
+        env="PROFILING_ENABLED",
+    )
+    # shared with the callers allowed to profile single requests, unset disables it
+    PROFILING_REQUEST_TOKEN: SecretStr | None = Field(
+        default=None,
+        env="PROFILING_REQUEST_TOKEN",
+    )
+    PROFILING_REQUEST_INTERVAL_MS: confloat(gt=0) = Field(
+        default=1,
+        env="PROFILING_REQUEST_INTERVAL_MS",
+    )
+
+    # statements slower than this are logged and added as event to the span
+    DB_SLOW_QUERY_THRESHOLD_MS: confloat(gt=0) = Field(
+        default=200,
+        env="DB_SLOW_QUERY_THRESHOLD_MS",
+    )
+    # EXPLAIN ANALYZE executes the statement again in the background, SELECT
+    # statements without row locks only
+    DB_SLOW_QUERY_EXPLAIN_SAMPLE_RATE: confloat(ge=0, le=1) = Field(
+        default=0.01,
+        env="DB_SLOW_QUERY_EXPLAIN_SAMPLE_RATE",
+    )
+    DB_SLOW_QUERY_EXPLAIN_TIMEOUT_MS: conint(gt=0) = Field(
+        default=5000,
+        env="DB_SLOW_QUERY_EXPLAIN_TIMEOUT_MS",
+    )
+    # fingerprints of the /diagnostics/queries statistics per worker
+    DB_QUERY_STATS_MAX_STATEMENTS: conint(gt=0) = Field(
+        default=1000,
+        env="DB_QUERY_STATS_MAX_STATEMENTS",
+    )
+
+    # tables with more (estimated) rows than this report an estimated total count
+    SAMPLE_STATS_EXACT_COUNT_THRESHOLD: conint(ge=0) = Field(
+        default=100_000,
+        env="SAMPLE_STATS_EXACT_COUNT_THRESHOLD",
+    )
+    SAMPLE_STATS_CACHE_TTL_SECONDS: conint(ge=0) = Field(
+        default=60,
+        env="SAMPLE_STATS_CACHE_TTL_SECONDS",
+    )
+
+    # monthly partitions created ahead of the current month
+    SAMPLE_PARTITION_PREMAKE_MONTHS: conint(ge=0) = Field(
+        default=3,
+        env="SAMPLE_PARTITION_PREMAKE_MONTHS",
+    )
+    # full months kept before the current one, None keeps all partitions
+    SAMPLE_RETENTION_MONTHS: conint(gt=0) | None = Field(
+        default=None,
+        env="SAMPLE_RETENTION_MONTHS",
+    )
+    SAMPLE_RETENTION_ACTION: Literal["detach", "drop"] = Field(
+        default="detach",
+        env="SAMPLE_RETENTION_ACTION",
+    )
+
+    # POST /batch, each sub-request is charged to the rate limit
+    BATCH_MAX_REQUESTS: conint(gt=0) = Field(default=50, env="BATCH_MAX_REQUESTS")
+    BATCH_MAX_CONCURRENCY: conint(gt=0) = Field(
+        default=10,
+        env="BATCH_MAX_CONCURRENCY",
+    )
+
+    # Idempotency-Key of POST and PATCH, stored in Redis if configured
+    IDEMPOTENCY_TTL_S: conint(gt=0) = Field(default=86400, env="IDEMPOTENCY_TTL_S")
+    # the key is released when the request didn't finish in time
+    IDEMPOTENCY_LOCK_TTL_S: conint(gt=0) = Field(
+        default=60,
+        env="IDEMPOTENCY_LOCK_TTL_S",
+    )
+    # duplicates wait for the original request, 409 after the timeout
+    IDEMPOTENCY_WAIT_TIMEOUT_S: confloat(ge=0) = Field(
+        default=30,
+        env="IDEMPOTENCY_WAIT_TIMEOUT_S",
+    )
+
+    # GET /samples/changes, slower subscribers are disconnected and resume
+    SAMPLE_CHANGES_BUFFER_SIZE: conint(gt=0) = Field(
+        default=100,
+        env="SAMPLE_CHANGES_BUFFER_SIZE",
+    )
+    SAMPLE_CHANGES_HEARTBEAT_S: confloat(gt=0) = Field(
+        default=15,
+        env="SAMPLE_CHANGES_HEARTBEAT_S",
+    )
+    # streams end after this, clients reconnect and spread over the workers
+    SAMPLE_CHANGES_MAX_DURATION_S: confloat(gt=0) = Field(
+        default=300,
+        env="SAMPLE_CHANGES_MAX_DURATION_S",
+    )
+    # transactions writing samples commit within this, changes recorded this long
+    # before the Last-Event-ID are replayed again on resume since ids are assigned
+    # before the commit
+    SAMPLE_CHANGES_VISIBILITY_MARGIN_S: confloat(ge=0) = Field(
+        default=60,
+        env="SAMPLE_CHANGES_VISIBILITY_MARGIN_S",
+    )
+    # changes older than this can't be resumed from
+    SAMPLE_CHANGE_RETENTION_HOURS: conint(gt=0) = Field(
+        default=24,
+        env="SAMPLE_CHANGE_RETENTION_HOURS",
+    )
+
+    # coalesce concurrent sample creates into multi-row inserts per worker
+    SAMPLE_WRITE_BATCHING_ENABLED: bool = Field(
+        default=False,
+        env="SAMPLE_WRITE_BATCHING_ENABLED",
+    )
+    WRITE_BATCH_MAX_SIZE: conint(gt=0, le=1000) = Field(
+        default=100,
+        env="WRITE_BATCH_MAX_SIZE",
+    )
+    WRITE_BATCH_MAX_DELAY_MS: confloat(gt=0, le=1000) = Field(
+        default=5.0,
+        env="WRITE_BATCH_MAX_DELAY_MS",
+    )
+    WRITE_BATCH_MAX_CONCURRENT_FLUSHES: conint(gt=0) = Field(
+        default=2,
+        env="WRITE_BATCH_MAX_CONCURRENT_FLUSHES",
+    )
+
 
 @cache
 def get_settings():
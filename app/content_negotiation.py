@@ -0,0 +1,185 @@
+"""Binary encodings of the API's JSON representations.
+
+Routers using `NegotiatedRoute` and `NegotiatedResponse` answer with MessagePack
+(or CBOR, if `cbor2` is installed) when the client asks for it in the `Accept`
+header, and accept request bodies in the same encodings via `Content-Type`.
+The encoded documents have the same structure as the JSON ones, request bodies
+are validated by the same models.
+"""
+import importlib.util
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable
+
+import msgpack
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+from pydantic.error_wrappers import ErrorWrapper
+
+from app.responses import ORJSONResponse, orjson_dumps
+
+# cbor2 is optional and slow to import, it's loaded with the first CBOR document
+has_cbor = importlib.util.find_spec("cbor2") is not None
+
+
+@dataclass(frozen=True)
+class Codec:
+    media_type: str
+    encode: Callable[[Any], bytes]
+    decode: Callable[[bytes], Any]
+
+
+JSON = Codec("application/json", encode=orjson_dumps, decode=lambda body: body)
+
+MSGPACK = Codec(
+    "application/msgpack",
+    encode=lambda content: msgpack.packb(content, default=jsonable_encoder),
+    decode=lambda body: msgpack.unpackb(body),
+)
+
+_codecs: dict[str, Codec] = {
+    MSGPACK.media_type: MSGPACK,
+    "application/x-msgpack": MSGPACK,
+}
+
+
+def _cbor_dumps(content: Any) -> bytes:
+    import cbor2
+
+    return cbor2.dumps(
+        content,
+        default=lambda encoder, value: encoder.encode(jsonable_encoder(value)),
+    )
+
+
+def _cbor_loads(body: bytes) -> Any:
+    import cbor2
+
+    return cbor2.loads(body)
+
+
+if has_cbor:
+    CBOR = Codec("application/cbor", encode=_cbor_dumps, decode=_cbor_loads)
+    _codecs[CBOR.media_type] = CBOR
+
+# media ranges answered with JSON, and whether they name it explicitly
+_json_media_ranges = {JSON.media_type: True, "application/*": False, "*/*": False}
+
+_response_codec: ContextVar[Codec] = ContextVar("response_codec", default=JSON)
+
+
+@lru_cache(maxsize=128)
+def negotiate(accept: str | None) -> Codec:
+    """Returns the codec of the most preferred media type in an `Accept` header.
+
+    Media types without a codec are ignored, `application/json` is used if no
+    binary encoding is acceptable.
+    """
+    if not accept:
+        return JSON
+
+    best, best_preference = JSON, (0.0, False)
+
+    for media_range in accept.split(","):
+        media_type, *params = media_range.split(";")
+        media_type = media_type.strip().lower()
+
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+
+        if media_type in _codecs:
+            codec, explicit = _codecs[media_type], True
+        elif media_type in _json_media_ranges:
+            codec, explicit = JSON, _json_media_ranges[media_type]
+        else:
+            continue
+
+        # explicit media types win over wildcards with the same quality
+        preference = (quality, explicit)
+        if quality > 0 and preference > best_preference:
+            best, best_preference = codec, preference
+
+    return best
+
+
+def _content_type_codec(content_type: str | None) -> Codec | None:
+    if not content_type:
+        return None
+    return _codecs.get(content_type.partition(";")[0].strip().lower())
+
+
+class _DecodedRequest(Request):
+    def __init__(self, request: Request, body: bytes, content: Any) -> None:
+        # FastAPI only parses bodies with a JSON content type
+        headers = [
+            (name, value)
+            for name, value in request.scope["headers"]
+            if name != b"content-type"
+        ]
+        headers.append((b"content-type", JSON.media_type.encode()))
+
+        # share the state with the original request
+        request.scope.setdefault("state", {})
+        super().__init__({**request.scope, "headers": headers}, request.receive)
+
+        self._body = body
+        self._json = content
+
+
+async def _decode_request(request: Request) -> Request:
+    codec = _content_type_codec(request.headers.get("content-type"))
+    if codec is None:
+        return request
+
+    body = await request.body()
+    if not body:
+        return request
+
+    try:
+        content = codec.decode(body)
+    except (ValueError, msgpack.UnpackException) as e:
+        raise RequestValidationError([ErrorWrapper(e, ("body",))], body=body) from e
+
+    return _DecodedRequest(request, body, content)
+
+
+class NegotiatedResponse(ORJSONResponse):
+    """Renders the content with the codec negotiated by `NegotiatedRoute`."""
+
+    def __init__(self, content: Any, *args, **kwargs) -> None:
+        self.codec = _response_codec.get()
+        self.media_type = self.codec.media_type
+        super().__init__(content, *args, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        return self.codec.encode(content)
+
+
+class NegotiatedRoute(APIRoute):
+    """Decodes binary request bodies and negotiates the response encoding."""
+
+    def get_route_handler(self) -> Callable:
+        route_handler = super().get_route_handler()
+
+        async def negotiated_route_handler(request: Request) -> Response:
+            request = await _decode_request(request)
+
+            token = _response_codec.set(negotiate(request.headers.get("accept")))
+            try:
+                response = await route_handler(request)
+            finally:
+                _response_codec.reset(token)
+
+            response.headers.add_vary_header("Accept")
+            return response
+
+        return negotiated_route_handler
@@ -1,12 +1,21 @@
+import asyncio
+from contextlib import AsyncExitStack
 from functools import cache
 from typing import Callable
 
 from fastapi import Depends
-from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import declarative_base
 
 from app.config import Settings, get_settings
+from app.database.slow_queries import QueryMonitor
+from app.telemetry.metrics import instrument_engine
 
 Base = declarative_base()
 
@@ -23,10 +32,14 @@ def session_factory(connection_string: str):
         pool_use_lifo=True,  # https://docs.sqlalchemy.org/en/14/core/pooling.html#pool-use-lifo
     )
 
+    from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+
     SQLAlchemyInstrumentor().instrument(
         engine=engine.sync_engine,
         enable_commenter=True,
     )
+    instrument_engine(engine.sync_engine)
+    QueryMonitor.instrument_engine(engine.sync_engine)
 
     async_session: Callable[..., AsyncSession] = async_sessionmaker(
         engine,
@@ -36,6 +49,27 @@ def session_factory(connection_string: str):
     return async_session
 
 
+def get_engine(connection_string: str) -> AsyncEngine:
+    return session_factory(connection_string).kw["bind"]
+
+
+async def prewarm_pool(connection_string: str, connections: int):
+    """Opens pool connections so the first requests skip the connection handshake."""
+    engine = get_engine(connection_string)
+    connections = min(connections, engine.pool.size())
+
+    async with AsyncExitStack() as stack:
+        # returned to the pool when the stack exits
+        await asyncio.gather(
+            *(stack.enter_async_context(engine.connect()) for _ in range(connections))
+        )
+
+
+async def ping_database(connection_string: str):
+    async with get_engine(connection_string).connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
 async def get_db(settings: Settings = Depends(get_settings)):
     create_async_session = session_factory(settings.POSTGRES_CONNECTION_STRING)
     async with create_async_session() as session:
@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import weakref
+from typing import Awaitable, Callable, Generic, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class WriteBatcher(Generic[T, R]):
+    _batchers: "weakref.WeakSet[WriteBatcher]" = weakref.WeakSet()
+
+    def __init__(
+        self,
+        flush: Callable[[list[T]], Awaitable[list[R]]],
+        max_batch_size: int = 100,
+        max_delay: float = 0.005,
+        max_concurrent_flushes: int = 2,
+    ) -> None:
+        """Coalesces concurrent single item writes into batches.
+
+        Items are collected until either `max_batch_size` items are pending or the
+        oldest pending item waited for `max_delay` seconds. The batch is then written
+        with a single `flush` call, which must return one result per item in order.
+        If a batch fails, its items are retried one by one so every caller gets
+        its own result or error.
+
+        Args:
+            flush (Callable[[list[T]], Awaitable[list[R]]]):
+                Writes a batch of items and returns their results.
+            max_batch_size (int, optional):
+                The maximum number of items per batch. Defaults to 100.
+            max_delay (float, optional):
+                The maximum time in seconds an item waits for its batch to fill up.
+                Defaults to 0.005.
+            max_concurrent_flushes (int, optional):
+                The maximum number of batches written at the same time. Defaults to 2.
+        """
+        self._flush = flush
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+
+        self._pending: list[tuple[T, asyncio.Future[R]]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._flush_semaphore = asyncio.Semaphore(max_concurrent_flushes)
+        self._tasks: set[asyncio.Task] = set()
+
+        WriteBatcher._batchers.add(self)
+
+    async def submit(self, item: T) -> R:
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[R] = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._start_flush)
+
+        return await future
+
+    async def close(self) -> None:
+        """Flushes the pending items and waits for all running batches."""
+        self._start_flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    @classmethod
+    async def close_all(cls) -> None:
+        """Closes the batchers of the process, called on shutdown."""
+        for batcher in list(cls._batchers):
+            await batcher.close()
+
+    def _start_flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.create_task(self._write(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _write(self, batch: list[tuple[T, asyncio.Future[R]]]) -> None:
+        async with self._flush_semaphore:
+            # callers that gave up in the meantime don't need to be written
+            batch = [(item, future) for item, future in batch if not future.done()]
+            if not batch:
+                return
+
+            try:
+                results = await self._flush([item for item, _ in batch])
+            except Exception as e:
+                if len(batch) == 1:
+                    _set_exception(batch[0][1], e)
+                    return
+
+                logger.warning(
+                    "Batch of %d items failed, retrying items individually",
+                    len(batch),
+                    exc_info=True,
+                )
+                for item, future in batch:
+                    await self._write_one(item, future)
+                return
+
+            for (_, future), result in zip(batch, results):
+                _set_result(future, result)
+
+    async def _write_one(self, item: T, future: asyncio.Future[R]) -> None:
+        try:
+            (result,) = await self._flush([item])
+        except Exception as e:
+            _set_exception(future, e)
+        else:
+            _set_result(future, result)
+
+
+def _set_result(future: asyncio.Future, result) -> None:
+    if not future.done():
+        future.set_result(result)
+
+
+def _set_exception(future: asyncio.Future, exception: BaseException) -> None:
+    if not future.done():
+        future.set_exception(exception)
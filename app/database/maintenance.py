@@ -0,0 +1,82 @@
+"""Partition maintenance for the time partitioned tables.
+
+Pre-creates the partitions for the upcoming months and expires the ones that
+fall out of the retention policy configured in `Settings`, and deletes the
+sample changes older than `SAMPLE_CHANGE_RETENTION_HOURS`. Run it periodically,
+for example once a day:
+
+    python -m app.database.maintenance
+"""
+import asyncio
+import logging
+from datetime import date, timedelta
+
+from sqlalchemy import delete, func, pool
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.config import Settings, get_settings
+from app.database.partitioning import (
+    add_months,
+    create_partitions,
+    expire_partitions,
+    month_start,
+)
+from app.database.tables import SampleChangeTable, SampleTable
+
+logger = logging.getLogger(__name__)
+
+
+async def maintain_partitions(
+    engine: AsyncEngine, settings: Settings, today: date | None = None
+):
+    current_month = month_start(today or date.today())
+    table = SampleTable.__tablename__
+
+    async with engine.begin() as conn:
+        await create_partitions(
+            conn,
+            table,
+            start=current_month,
+            months=settings.SAMPLE_PARTITION_PREMAKE_MONTHS + 1,
+        )
+
+        if settings.SAMPLE_RETENTION_MONTHS is not None:
+            await expire_partitions(
+                conn,
+                table,
+                before=add_months(current_month, -settings.SAMPLE_RETENTION_MONTHS),
+                action=settings.SAMPLE_RETENTION_ACTION,
+            )
+
+
+async def expire_changes(engine: AsyncEngine, settings: Settings) -> int:
+    # compared with the database time, which also sets the change dates
+    retention = timedelta(hours=settings.SAMPLE_CHANGE_RETENTION_HOURS)
+
+    async with engine.begin() as conn:
+        result = await conn.execute(
+            delete(SampleChangeTable).where(
+                SampleChangeTable.change_date < func.now() - retention
+            )
+        )
+
+    logger.info("Deleted %d expired sample changes", result.rowcount)
+    return result.rowcount
+
+
+async def main():
+    settings = get_settings()
+    engine = create_async_engine(
+        settings.POSTGRES_CONNECTION_STRING, poolclass=pool.NullPool
+    )
+
+    try:
+        await maintain_partitions(engine, settings)
+        await expire_changes(engine, settings)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,179 @@
+import asyncio
+import json
+import logging
+import weakref
+from typing import Any
+
+from opentelemetry.metrics import CallbackOptions, Observation
+from sqlalchemy.engine import make_url
+
+from app.telemetry.metrics import meter
+
+logger = logging.getLogger(__name__)
+
+notifications_dropped = meter.create_counter(
+    "app.notifications.dropped",
+    description="Subscriptions closed because their buffer was full, by channel",
+)
+
+
+class Subscription:
+    def __init__(self, hub: "NotificationHub", buffer_size: int) -> None:
+        """Notifications of a channel for a single consumer, see `NotificationHub`."""
+        self._hub = hub
+        self._queue: asyncio.Queue[Any] = asyncio.Queue(buffer_size)
+        self.closed = False
+        self.dropped = False
+
+    async def get(self, timeout: float | None = None) -> Any:
+        """Returns the next notification, or None once the subscription is closed.
+
+        Notifications buffered before the subscription was closed are returned
+        first. Raises `asyncio.TimeoutError` if none arrives within `timeout`.
+        """
+        if self.closed and self._queue.empty():
+            return None
+        return await asyncio.wait_for(self._queue.get(), timeout)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._hub._unsubscribe(self)
+        try:
+            # wakes up a waiting consumer, a full buffer is drained first anyway
+            self._queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+    def _put(self, payload: Any) -> bool:
+        try:
+            self._queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    async def __aenter__(self) -> "Subscription":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+
+class NotificationHub:
+    _hubs: "weakref.WeakSet[NotificationHub]" = weakref.WeakSet()
+
+    def __init__(self, connection_string: str, channel: str, buffer_size: int = 100):
+        """Fans out the Postgres notifications of `channel` to the subscribers of
+        the worker.
+
+        The hub holds a single dedicated connection executing `LISTEN`, opened with
+        the first subscription. Each subscriber buffers up to `buffer_size`
+        notifications, a subscriber falling further behind is dropped so it can't
+        hold back the others or grow the memory of the worker. When the connection
+        is lost all subscriptions are closed, the next subscription reconnects.
+        Subscribers resume from the last notification they received with a query.
+
+        Usage:
+            hub = NotificationHub(connection_string, "sample_change")
+            async with await hub.subscribe() as subscription:
+                while (payload := await subscription.get()) is not None:
+                    ...
+
+        Args:
+            connection_string (str): The SQLAlchemy connection string of the database.
+            channel (str): The channel to listen on, the payloads are JSON.
+            buffer_size (int, optional): The notifications buffered per subscriber.
+                Defaults to 100.
+        """
+        self.connection_string = connection_string
+        self.channel = channel
+        self.buffer_size = buffer_size
+
+        self._connection = None
+        self._connect_lock = asyncio.Lock()
+        self._subscriptions: set[Subscription] = set()
+
+        NotificationHub._hubs.add(self)
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscriptions)
+
+    async def subscribe(self) -> Subscription:
+        """Subscribes to the channel, raises if the connection can't be opened."""
+        await self._listen()
+
+        subscription = Subscription(self, self.buffer_size)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    async def close(self):
+        for subscription in list(self._subscriptions):
+            subscription.close()
+
+        async with self._connect_lock:
+            connection, self._connection = self._connection, None
+            if connection is not None and not connection.is_closed():
+                await connection.close()
+
+    @classmethod
+    async def close_all(cls):
+        for hub in list(cls._hubs):
+            await hub.close()
+
+    async def _listen(self):
+        if self._connection is not None:
+            return
+
+        async with self._connect_lock:
+            if self._connection is not None:
+                return
+
+            import asyncpg
+
+            url = make_url(self.connection_string).set(drivername="postgresql")
+            connection = await asyncpg.connect(
+                url.render_as_string(hide_password=False)
+            )
+            connection.add_termination_listener(self._on_termination)
+            await connection.add_listener(self.channel, self._on_notification)
+            self._connection = connection
+
+    def _unsubscribe(self, subscription: Subscription):
+        self._subscriptions.discard(subscription)
+
+    def _on_notification(self, connection, pid: int, channel: str, payload: str):
+        try:
+            payload = json.loads(payload)
+        except ValueError:
+            logger.warning("Invalid notification on channel %s", channel)
+            return
+
+        for subscription in list(self._subscriptions):
+            if not subscription._put(payload):
+                subscription.dropped = True
+                subscription.close()
+                notifications_dropped.add(1, {"channel": channel})
+                logger.info("Dropped slow subscriber of channel %s", channel)
+
+    def _on_termination(self, connection):
+        logger.warning("Lost the connection listening on channel %s", self.channel)
+        if self._connection is connection:
+            self._connection = None
+        for subscription in list(self._subscriptions):
+            subscription.close()
+
+
+def _observe_subscribers(options: CallbackOptions) -> list[Observation]:
+    return [
+        Observation(hub.subscribers, {"channel": hub.channel})
+        for hub in list(NotificationHub._hubs)
+    ]
+
+
+meter.create_observable_gauge(
+    "app.notifications.subscribers",
+    callbacks=[_observe_subscribers],
+    description="Subscribers of the Postgres notifications of the worker by channel",
+)
@@ -0,0 +1,224 @@
+import logging
+import re
+from datetime import date
+from typing import Literal
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+logger = logging.getLogger(__name__)
+
+RETENTION_ACTIONS = Literal["detach", "drop"]
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y_%m}"
+
+
+async def list_partitions(conn: AsyncConnection, table: str) -> dict[str, date]:
+    """Returns the monthly partitions of `table` with the month they start at."""
+    result = await conn.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:table)"
+        ),
+        {"table": table},
+    )
+
+    pattern = re.compile(rf"^{re.escape(table)}_p(\d{{4}})_(\d{{2}})$")
+
+    partitions: dict[str, date] = {}
+    for (name,) in result.all():
+        match = pattern.match(name)
+        if match is not None:
+            partitions[name] = date(int(match[1]), int(match[2]), 1)
+
+    return partitions
+
+
+async def default_partition(
+    conn: AsyncConnection, table: str
+) -> tuple[str, str] | None:
+    """Returns the default partition of `table` and the column it's partitioned by."""
+    result = await conn.execute(
+        text(
+            "SELECT d.relname, a.attname FROM pg_partitioned_table p "
+            "JOIN pg_class d ON d.oid = p.partdefid "
+            "JOIN pg_attribute a ON a.attrelid = p.partrelid "
+            "AND a.attnum = p.partattrs[0] "
+            "WHERE p.partrelid = to_regclass(:table)"
+        ),
+        {"table": table},
+    )
+    row = result.first()
+    return (row[0], row[1]) if row is not None else None
+
+
+async def stored_columns(conn: AsyncConnection, table: str) -> list[str]:
+    """Returns the columns of `table` in order, without the generated columns."""
+    result = await conn.execute(
+        text(
+            "SELECT attname FROM pg_attribute "
+            "WHERE attrelid = to_regclass(:table) AND attnum > 0 "
+            "AND NOT attisdropped AND attgenerated = '' "
+            "ORDER BY attnum"
+        ),
+        {"table": table},
+    )
+    return [name for (name,) in result.all()]
+
+
+async def create_partitions(
+    conn: AsyncConnection, table: str, start: date, months: int
+) -> list[str]:
+    """Creates the monthly partitions for `months` months beginning at `start`."""
+    first = month_start(start)
+    return await _create_partitions(
+        conn, table, [add_months(first, offset) for offset in range(months)]
+    )
+
+
+async def _create_partitions(
+    conn: AsyncConnection, table: str, months: list[date]
+) -> list[str]:
+    quote = conn.dialect.identifier_preparer.quote
+    existing = await list_partitions(conn, table)
+
+    missing = [
+        month for month in months if partition_name(table, month) not in existing
+    ]
+    if not missing:
+        return []
+
+    # a partition can't be created while the default partition holds rows of its
+    # month, those are moved out of the detached default partition instead
+    moving = False
+    default = await default_partition(conn, table)
+    if default is not None:
+        default_name, column = default
+        moving = await conn.scalar(
+            text(
+                f"SELECT EXISTS (SELECT FROM {quote(default_name)} "
+                f"WHERE {quote(column)} >= :start AND {quote(column)} < :end)"
+            ),
+            {"start": min(missing), "end": add_months(max(missing), 1)},
+        )
+        if moving:
+            columns = await stored_columns(conn, table)
+            await conn.execute(
+                text(
+                    f"ALTER TABLE {quote(table)} "
+                    f"DETACH PARTITION {quote(default_name)}"
+                )
+            )
+
+    created = []
+    for month in missing:
+        name = partition_name(table, month)
+        await conn.execute(
+            text(
+                f"CREATE TABLE {quote(name)} PARTITION OF {quote(table)} "
+                f"FOR VALUES FROM ('{month.isoformat()}') "
+                f"TO ('{add_months(month, 1).isoformat()}')"
+            )
+        )
+        logger.info("Created partition %s", name)
+        created.append(name)
+
+        if moving:
+            await _move_rows(conn, default_name, name, column, columns, month)
+
+    if moving:
+        await conn.execute(
+            text(
+                f"ALTER TABLE {quote(table)} "
+                f"ATTACH PARTITION {quote(default_name)} DEFAULT"
+            )
+        )
+
+    return created
+
+
+async def _move_rows(
+    conn: AsyncConnection,
+    source: str,
+    partition: str,
+    column: str,
+    columns: list[str],
+    month: date,
+):
+    quote = conn.dialect.identifier_preparer.quote
+
+    # generated columns can't be inserted, they are computed again
+    column_list = ", ".join(quote(name) for name in columns)
+
+    # the rows are not new, so the row triggers of the table don't fire
+    await conn.execute(text(f"ALTER TABLE {quote(partition)} DISABLE TRIGGER USER"))
+    try:
+        result = await conn.execute(
+            text(
+                f"WITH moved AS (DELETE FROM {quote(source)} "
+                f"WHERE {quote(column)} >= :start AND {quote(column)} < :end "
+                f"RETURNING {column_list}) "
+                f"INSERT INTO {quote(partition)} ({column_list}) "
+                f"SELECT {column_list} FROM moved"
+            ),
+            {"start": month, "end": add_months(month, 1)},
+        )
+    finally:
+        await conn.execute(text(f"ALTER TABLE {quote(partition)} ENABLE TRIGGER USER"))
+    logger.info("Moved %d rows from %s to %s", result.rowcount, source, partition)
+
+
+async def expire_partitions(
+    conn: AsyncConnection,
+    table: str,
+    before: date,
+    action: RETENTION_ACTIONS = "detach",
+) -> list[str]:
+    """Detaches or drops the monthly partitions that end on or before `before`.
+
+    The expired rows of the default partition are moved to partitions of their
+    months first, so they are expired the same way.
+    """
+    quote = conn.dialect.identifier_preparer.quote
+
+    default = await default_partition(conn, table)
+    if default is not None:
+        default_name, column = default
+        result = await conn.execute(
+            text(
+                f"SELECT DISTINCT date_trunc('month', {quote(column)})::date "
+                f"FROM {quote(default_name)} WHERE {quote(column)} < :before"
+            ),
+            {"before": before},
+        )
+        await _create_partitions(conn, table, sorted(row[0] for row in result.all()))
+
+    existing = await list_partitions(conn, table)
+
+    expired = []
+    for name, month in sorted(existing.items(), key=lambda item: item[1]):
+        if add_months(month, 1) > before:
+            continue
+
+        if action == "drop":
+            await conn.execute(text(f"DROP TABLE {quote(name)}"))
+        else:
+            await conn.execute(
+                text(f"ALTER TABLE {quote(table)} DETACH PARTITION {quote(name)}")
+            )
+        logger.info("Expired partition %s (%s)", name, action)
+        expired.append(name)
+
+    return expired
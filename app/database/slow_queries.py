@@ -0,0 +1,334 @@
+"""Statement statistics, slow query logging and sampled query plans.
+
+`QueryMonitor` times every statement of the instrumented engines and aggregates
+them by fingerprint, the SQL with literals and parameters replaced by `?`.
+Statements slower than the threshold are logged with their fingerprint and
+parameter shape and added as `slow_query` event to the current span. For a
+sample of slow `SELECT` statements, `EXPLAIN (ANALYZE, BUFFERS)` runs the
+statement again on a separate connection in the background, and the plan is
+logged with the trace of the request.
+"""
+import asyncio
+import logging
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Any, Callable, Literal
+
+from opentelemetry import trace
+from sqlalchemy import Engine, event, pool
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+logger = logging.getLogger(__name__)
+
+OTHER_STATEMENTS = "<other>"
+
+_COMMENTS = re.compile(r"/\*.*?\*/|--[^\n]*", re.DOTALL)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_PARAMETERS = re.compile(r"\$\d+|%\(\w+\)s|%s|\?")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+# row locks would wait for the transaction of the slow query
+_LOCKING = re.compile(r"\bFOR\s+(?:NO\s+KEY\s+)?(?:UPDATE|SHARE|KEY\s+SHARE)\b", re.I)
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(statement: str) -> str:
+    """Returns the statement without comments, literals and parameter values."""
+    statement = _COMMENTS.sub(" ", statement)
+    statement = _STRINGS.sub("?", statement)
+    statement = _PARAMETERS.sub("?", statement)
+    statement = _NUMBERS.sub("?", statement)
+    statement = _LISTS.sub("(...)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+def parameter_shape(parameters: Any, executemany: bool = False) -> str:
+    """Returns the types of the parameters, never their values."""
+    if executemany and parameters:
+        return f"{len(parameters)} x {parameter_shape(parameters[0])}"
+    if isinstance(parameters, dict):
+        types = (f"{key}: {type(value).__name__}" for key, value in parameters.items())
+    else:
+        types = (type(value).__name__ for value in parameters or ())
+    return f"({', '.join(types)})"
+
+
+@dataclass
+class StatementStats:
+    fingerprint: str
+    calls: int = 0
+    errors: int = 0
+    slow_calls: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ms / self.calls if self.calls else 0.0
+
+
+class QueryMonitor:
+    _monitor: "QueryMonitor | None" = None
+
+    def __init__(
+        self,
+        slow_query_threshold: float = 0.2,
+        explain_sample_rate: float = 0.0,
+        explain_timeout: float = 5.0,
+        max_statements: int = 1000,
+    ) -> None:
+        """Aggregates the statements of the instrumented engines by fingerprint.
+
+        Args:
+            slow_query_threshold (float, optional): The duration in seconds above
+                which statements are logged. Defaults to 0.2.
+            explain_sample_rate (float, optional): The ratio of slow `SELECT`
+                statements that are run again with `EXPLAIN (ANALYZE, BUFFERS)`.
+                One statement is explained at a time, without row locks.
+                Defaults to 0.0.
+            explain_timeout (float, optional): The statement timeout in seconds of
+                the `EXPLAIN`. Defaults to 5.0.
+            max_statements (int, optional): The maximum number of fingerprints,
+                statements of new fingerprints are aggregated as `<other>` when
+                exceeded. Defaults to 1000.
+        """
+        self.slow_query_threshold = slow_query_threshold
+        self.explain_sample_rate = explain_sample_rate
+        self.explain_timeout = explain_timeout
+        self.max_statements = max_statements
+
+        self._statements: dict[str, StatementStats] = {}
+        self._lock = threading.Lock()
+        self._explain_engines: dict[str, AsyncEngine] = {}
+        self._explaining: set[asyncio.Task] = set()
+
+    @classmethod
+    def init(cls, **kwargs) -> "QueryMonitor":
+        cls._monitor = cls(**kwargs)
+        return cls._monitor
+
+    @classmethod
+    def instance(cls) -> "QueryMonitor":
+        if cls._monitor is None:  # pragma: no cover
+            raise RuntimeError("QueryMonitor not initialized")
+        return cls._monitor
+
+    @classmethod
+    def instrument_engine(cls, engine: Engine):
+        """Reports the statements of `engine` to the monitor of the process.
+
+        Statements are not recorded while no monitor is initialized, so processes
+        without one, like the maintenance scripts, don't have to initialize it.
+        """
+        _instrument(engine, lambda: cls._monitor)
+
+    def instrument(self, engine: Engine):
+        _instrument(engine, lambda: self)
+
+    def record(
+        self,
+        conn,
+        statement: str,
+        parameters: Any,
+        executemany: bool,
+        duration: float,
+        error: bool = False,
+    ):
+        statement_fingerprint = key = fingerprint(statement)
+        is_slow = duration >= self.slow_query_threshold
+
+        with self._lock:
+            stats = self._statements.get(key)
+            if stats is None:
+                if len(self._statements) >= self.max_statements:
+                    key = OTHER_STATEMENTS
+                stats = self._statements.setdefault(key, StatementStats(key))
+
+            stats.calls += 1
+            stats.errors += error
+            stats.slow_calls += is_slow
+            stats.total_ms += duration * 1000
+            stats.max_ms = max(stats.max_ms, duration * 1000)
+
+        if is_slow:
+            self._report_slow_query(
+                conn,
+                statement,
+                parameters,
+                executemany,
+                duration,
+                statement_fingerprint,
+            )
+
+    def top(
+        self,
+        limit: int = 20,
+        order_by: Literal["total_ms", "mean_ms", "max_ms", "calls"] = "total_ms",
+    ) -> list[StatementStats]:
+        with self._lock:
+            statements = [replace(stats) for stats in self._statements.values()]
+        statements.sort(key=lambda stats: getattr(stats, order_by), reverse=True)
+        return statements[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+
+    def _report_slow_query(
+        self,
+        conn,
+        statement: str,
+        parameters: Any,
+        executemany: bool,
+        duration: float,
+        statement_fingerprint: str,
+    ):
+        shape = parameter_shape(parameters, executemany)
+
+        logger.warning(
+            "Slow query took %d ms: %s",
+            duration * 1000,
+            statement_fingerprint,
+            extra={
+                "duration_ms": duration * 1000,
+                "statement": statement_fingerprint,
+                "parameters": shape,
+            },
+        )
+
+        span = trace.get_current_span()
+        if span.is_recording():
+            span.add_event(
+                "slow_query",
+                {
+                    "db.statement": statement_fingerprint,
+                    "db.parameters": shape,
+                    "db.duration_ms": duration * 1000,
+                },
+            )
+
+        if (
+            not executemany
+            and statement_fingerprint.upper().startswith("SELECT")
+            and not _LOCKING.search(statement_fingerprint)
+            and not self._explaining
+            and random.random() < self.explain_sample_rate
+        ):
+            self._start_explain(
+                conn.engine, statement, parameters, statement_fingerprint
+            )
+
+    def _start_explain(
+        self,
+        engine: Engine,
+        statement: str,
+        parameters: Any,
+        statement_fingerprint: str,
+    ):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # only the async engines are explained
+            return
+
+        # keeps the trace context of the request for the log record
+        task = loop.create_task(
+            self._report_plan(engine, statement, parameters, statement_fingerprint)
+        )
+        self._explaining.add(task)
+        task.add_done_callback(self._explaining.discard)
+
+    async def _report_plan(
+        self,
+        engine: Engine,
+        statement: str,
+        parameters: Any,
+        statement_fingerprint: str,
+    ):
+        plan = await self._explain(engine, statement, parameters)
+        if plan is None:
+            return
+
+        logger.info(
+            "Slow query plan: %s",
+            statement_fingerprint,
+            extra={"statement": statement_fingerprint, "plan": plan},
+        )
+
+        span = trace.get_current_span()
+        if span.is_recording():
+            span.add_event(
+                "slow_query_plan",
+                {"db.statement": statement_fingerprint, "db.plan": plan},
+            )
+
+    async def _explain(
+        self, engine: Engine, statement: str, parameters: Any
+    ) -> str | None:
+        # a separate unpooled connection, so the pool of the app is never exhausted
+        try:
+            explain_engine = self._explain_engine(engine)
+            async with explain_engine.connect() as conn:
+                await conn.exec_driver_sql(
+                    "SET LOCAL statement_timeout = "
+                    f"{int(self.explain_timeout * 1000)}"
+                )
+                result = await conn.exec_driver_sql(
+                    f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters
+                )
+                plan = "\n".join(row[0] for row in result)
+                # EXPLAIN ANALYZE executes the statement
+                await conn.rollback()
+                return plan
+        except Exception:
+            logger.info("Failed to explain the slow query", exc_info=True)
+            return None
+
+    def _explain_engine(self, engine: Engine) -> AsyncEngine:
+        url = engine.url.render_as_string(hide_password=False)
+        explain_engine = self._explain_engines.get(url)
+        if explain_engine is None:
+            explain_engine = self._explain_engines[url] = create_async_engine(
+                url, poolclass=pool.NullPool
+            )
+        return explain_engine
+
+
+def _instrument(engine: Engine, get_monitor: Callable[[], QueryMonitor | None]):
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        if get_monitor() is None:
+            return
+        conn.info.setdefault("query_monitor_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        start_times = conn.info.get("query_monitor_start_time")
+        monitor = get_monitor()
+        if start_times and monitor is not None:
+            duration = time.perf_counter() - start_times.pop()
+            monitor.record(conn, statement, parameters, many, duration)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        conn = context.connection
+        if conn is None or context.statement is None:
+            return
+        start_times = conn.info.get("query_monitor_start_time")
+        monitor = get_monitor()
+        if start_times and monitor is not None:
+            duration = time.perf_counter() - start_times.pop()
+            monitor.record(
+                conn,
+                context.statement,
+                context.parameters,
+                context.execution_context is not None
+                and context.execution_context.executemany,
+                duration,
+                error=True,
+            )
@@ -1,3 +1,4 @@
+from .sample_change_table import SampleChangeTable
 from .sample_table import SampleTable
 
-__all__ = ["SampleTable"]
+__all__ = ["SampleChangeTable", "SampleTable"]
@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, String, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+# written by the trigger on the sample table, which also notifies this channel
+SAMPLE_CHANGE_CHANNEL = "sample_change"
+
+
+class SampleChangeTable(Base):
+    __tablename__ = "sample_change"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    operation: Mapped[str] = mapped_column(String(6), nullable=False)
+    sample_id: Mapped[int] = mapped_column(nullable=False)
+    # the changed sample, None for deletes
+    sample: Mapped[dict] = mapped_column(JSONB, nullable=True)
+    # expired by app.database.maintenance
+    change_date: Mapped[datetime] = mapped_column(
+        nullable=False, index=True, server_default=func.now()
+    )
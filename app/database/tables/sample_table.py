@@ -1,15 +1,51 @@
 from datetime import datetime
 
-from sqlalchemy import Integer, String, func
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Computed, Index, Integer, String, func
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import Mapped, declared_attr, mapped_column
 
 from app.database import Base
 
+# "english" is passed explicitly so the expression is immutable and can be stored
+SEARCH_CONFIG = "english"
+
 
 class SampleTable(Base):
     __tablename__ = "sample"
+    __table_args__ = (
+        Index("ix_sample_search_vector", "search_vector", postgresql_using="gin"),
+        Index(
+            "ix_sample_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        # partitions are managed by app.database.maintenance
+        {"postgresql_partition_by": "RANGE (create_date)"},
+    )
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(
+        Integer, primary_key=True, autoincrement=True, index=True
+    )
     name: Mapped[str] = mapped_column(String, nullable=False)
     description: Mapped[str] = mapped_column(String[100], nullable=True)
-    create_date: Mapped[datetime] = mapped_column(insert_default=func.now())
+    # part of the primary key because postgres requires the partition key in it
+    create_date: Mapped[datetime] = mapped_column(
+        primary_key=True, insert_default=func.now()
+    )
+
+    # maintained by postgres, never loaded unless explicitly requested
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(name, '')), 'A') || "
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'B')",
+            persisted=True,
+        ),
+        deferred=True,
+    )
+
+    @declared_attr
+    def __mapper_args__(cls):
+        # ids come from a single sequence, so rows are still identified by id alone
+        return {"primary_key": [cls.__table__.c.id]}
@@ -0,0 +1,88 @@
+from functools import cache
+from typing import Any, Iterable, Optional
+
+from fastapi import HTTPException, Query, Response
+from pydantic import BaseModel, create_model
+
+from app.responses import ORJSONResponse
+
+_FIELDS_QUERY = Query(
+    None,
+    description="Comma separated fields to return, all fields if omitted",
+    example="id,name",
+)
+
+
+class Fieldset:
+    def __init__(self, model: type[BaseModel], required: Iterable[str] = ("id",)):
+        """Dependency for the `fields` query parameter of sparse fieldsets.
+
+        `fields` is a comma separated subset of the fields of `model`, the
+        dependency resolves to the selected fields plus `required`, or to None
+        when the parameter is omitted. Repositories select only the columns of the
+        fields with `app.repositories.select_fields`. Routes keep `model` as
+        response model, so the full representation is documented and validated,
+        and return sparse results with `sparse_response`.
+
+        Usage:
+            @router.get("/", response_model=list[Sample])
+            async def get_samples(fields=Depends(Fieldset(Sample))):
+                samples = await service.get(fields=fields)
+                if fields is None:
+                    return samples
+                return sparse_response(Sample, samples)
+
+        Args:
+            model (type[BaseModel]): The model of the response.
+            required (Iterable[str], optional): The fields that are always
+                returned. Defaults to ("id",).
+        """
+        self.model = model
+        self.required = frozenset(required)
+
+    def __call__(self, fields: str | None = _FIELDS_QUERY) -> frozenset[str] | None:
+        if fields is None:
+            return None
+
+        selected = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = selected - self.model.__fields__.keys()
+        if unknown:
+            raise HTTPException(400, f"Unknown fields: {', '.join(sorted(unknown))}")
+
+        return frozenset(selected | self.required)
+
+
+@cache
+def partial_model(model: type[BaseModel]) -> type[BaseModel]:
+    """A copy of `model` whose fields are all optional.
+
+    Only the fields that were set are serialized with `exclude_unset`, which
+    keeps the omitted fields of a sparse fieldset out of the response.
+    """
+    return create_model(
+        f"Partial{model.__name__}",
+        __config__=model.__config__,
+        **{
+            name: (Optional[field.outer_type_], None)
+            for name, field in model.__fields__.items()
+        },
+    )
+
+
+def sparse_response(
+    model: type[BaseModel],
+    content: Any,
+    response_class: type[Response] = ORJSONResponse,
+) -> Response:
+    """Renders the dicts of a sparse fieldset, or a list of them, with only the
+    selected fields.
+
+    The content is validated by `partial_model(model)` instead of the response
+    model of the route, which would reject the omitted fields.
+    """
+    partial = partial_model(model)
+    if isinstance(content, list):
+        return response_class(
+            [partial.parse_obj(item).dict(exclude_unset=True) for item in content]
+        )
+    return response_class(partial.parse_obj(content).dict(exclude_unset=True))
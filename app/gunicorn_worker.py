@@ -1,8 +1,65 @@
+from typing import Any
+
 from uvicorn.workers import UvicornWorker
 
+from app.config import Settings, get_settings
+from app.telemetry.event_loop import create_event_loop_monitor
+from app.telemetry.logging import attach_uvicorn_error_logger
+
+# https://www.uvicorn.org/settings/#implementation
+WORKER_PROFILES: dict[str, dict[str, Any]] = {
+    # uvloop and httptools when they are installed, asyncio and h11 otherwise
+    "default": {"loop": "auto", "http": "auto"},
+    # fails to start without uvloop and httptools instead of silently falling back
+    "throughput": {"loop": "uvloop", "http": "httptools"},
+    # pure Python implementations, for debugging and platforms without wheels
+    "compat": {"loop": "asyncio", "http": "h11"},
+}
+
+
+def worker_config_kwargs(settings: Settings) -> dict[str, Any]:
+    """Returns the uvicorn settings of the worker profile and the overrides."""
+    config_kwargs = dict(WORKER_PROFILES[settings.WORKER_PROFILE])
+
+    if settings.WORKER_LIMIT_CONCURRENCY is not None:
+        config_kwargs["limit_concurrency"] = settings.WORKER_LIMIT_CONCURRENCY
+    if settings.WORKER_H11_MAX_INCOMPLETE_EVENT_SIZE is not None:
+        config_kwargs[
+            "h11_max_incomplete_event_size"
+        ] = settings.WORKER_H11_MAX_INCOMPLETE_EVENT_SIZE
+
+    return config_kwargs
+
 
 class HeadlessUvicornWorker(UvicornWorker):
     # https://www.uvicorn.org/settings/
     CONFIG_KWARGS = {
         "server_header": False,
+        # replaced by app.middleware.AccessLogMiddleware
+        "access_log": False,
     }
+
+    def __init__(self, *args, **kwargs) -> None:
+        # read by UvicornWorker.__init__, the backlog and timeouts are gunicorn
+        # settings in gunicorn.conf.py
+        self.CONFIG_KWARGS = {
+            **self.CONFIG_KWARGS,
+            **worker_config_kwargs(get_settings()),
+        }
+        super().__init__(*args, **kwargs)
+
+        # UvicornWorker.__init__ gave uvicorn.error the gunicorn error log handlers
+        attach_uvicorn_error_logger()
+
+    async def _serve(self) -> None:
+        # runs on the event loop of the worker, after the gunicorn post_fork hook
+        # initialized the metrics
+        monitor = create_event_loop_monitor(get_settings())
+        if monitor is not None:
+            monitor.start()
+
+        try:
+            await super()._serve()
+        finally:
+            if monitor is not None:
+                monitor.stop()
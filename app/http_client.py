@@ -0,0 +1,50 @@
+import importlib.util
+import logging
+
+from httpx import AsyncClient, Limits, Timeout
+
+from app.config import Settings
+
+logger = logging.getLogger(__name__)
+
+has_h2 = importlib.util.find_spec("h2") is not None
+
+
+class HttpClient:
+    _client: AsyncClient | None = None
+
+    @classmethod
+    def init(cls, settings: Settings) -> AsyncClient:
+        """Creates the pooled client shared by all outbound requests of the worker.
+
+        Connections to the same host are kept alive and reused, HTTP/2 multiplexes
+        concurrent requests on a single connection when the `http2` extra is
+        installed. Called on startup so the pool belongs to the event loop of the
+        worker.
+        """
+        http2 = settings.HTTP_CLIENT_HTTP2 and has_h2
+        if settings.HTTP_CLIENT_HTTP2 and not has_h2:
+            logger.warning("HTTP/2 requires the http2 extra, falling back to HTTP/1.1")
+
+        cls._client = AsyncClient(
+            http2=http2,
+            limits=Limits(
+                max_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_CLIENT_KEEPALIVE_EXPIRY_S,
+            ),
+            timeout=Timeout(settings.HTTP_CLIENT_TIMEOUT_S),
+        )
+        return cls._client
+
+    @classmethod
+    def instance(cls) -> AsyncClient:
+        if cls._client is None:  # pragma: no cover
+            raise RuntimeError("HttpClient not initialized")
+        return cls._client
+
+    @classmethod
+    async def close(cls):
+        if cls._client is not None:
+            await cls._client.aclose()
+            cls._client = None
@@ -0,0 +1,240 @@
+import asyncio
+import base64
+import hashlib
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from functools import cache
+
+import orjson
+from fastapi import Depends, Header, HTTPException, Request, Response
+from redis.asyncio import Redis
+
+from app.cache import TTLCache
+from app.config import Settings, get_settings
+
+IDEMPOTENCY_KEY_HEADER = "idempotency-key"
+REPLAYED_HEADER = "idempotent-replayed"
+
+
+@dataclass
+class StoredResponse:
+    status: int
+    headers: list[tuple[str, str]]
+    body: bytes
+
+
+@dataclass
+class Record:
+    fingerprint: str
+    # None while the original request is running
+    response: StoredResponse | None = None
+
+
+class IdempotencyStore(ABC):
+    """Stores the responses of requests by idempotency key.
+
+    `claim` marks a key as running unless it exists, which makes the caller the
+    one request that runs. The claim expires after `lock_ttl` seconds, so the
+    key is released if the worker running the request dies.
+    """
+
+    @abstractmethod
+    async def claim(self, key: str, fingerprint: str, lock_ttl: float) -> Record | None:
+        """Claims the key, or returns its record if it's claimed already."""
+
+    @abstractmethod
+    async def complete(self, key: str, record: Record, ttl: float):
+        pass
+
+    @abstractmethod
+    async def release(self, key: str):
+        pass
+
+
+class MemoryIdempotencyStore(IdempotencyStore):
+    def __init__(self, maxsize: int = 10_000) -> None:
+        """Per-process store, a retry served by another worker runs again."""
+        self._records: TTLCache[str, Record] = TTLCache(maxsize=maxsize)
+
+    async def claim(self, key: str, fingerprint: str, lock_ttl: float) -> Record | None:
+        record = self._records.get(key)
+        if record is not None:
+            return record
+
+        self._records.set(key, Record(fingerprint), lock_ttl)
+        return None
+
+    async def complete(self, key: str, record: Record, ttl: float):
+        self._records.set(key, record, ttl)
+
+    async def release(self, key: str):
+        self._records.delete(key)
+
+
+class RedisIdempotencyStore(IdempotencyStore):
+    def __init__(self, redis: Redis) -> None:
+        """Store shared by all workers."""
+        self.redis = redis
+
+    async def claim(self, key: str, fingerprint: str, lock_ttl: float) -> Record | None:
+        claimed = await self.redis.set(
+            key, _dumps(Record(fingerprint)), px=int(lock_ttl * 1000), nx=True
+        )
+        if claimed:
+            return None
+
+        value = await self.redis.get(key)
+        if value is None:
+            # expired in between, claim it again
+            return await self.claim(key, fingerprint, lock_ttl)
+        return _loads(value)
+
+    async def complete(self, key: str, record: Record, ttl: float):
+        await self.redis.set(key, _dumps(record), px=int(ttl * 1000))
+
+    async def release(self, key: str):
+        await self.redis.delete(key)
+
+
+def _dumps(record: Record) -> bytes:
+    value: dict = {"fingerprint": record.fingerprint}
+    if record.response is not None:
+        value["status"] = record.response.status
+        value["headers"] = record.response.headers
+        value["body"] = base64.b64encode(record.response.body).decode()
+    return orjson.dumps(value)
+
+
+def _loads(value: bytes) -> Record:
+    record = orjson.loads(value)
+    if "status" not in record:
+        return Record(record["fingerprint"])
+
+    response = StoredResponse(
+        record["status"],
+        [(name, header) for name, header in record["headers"]],
+        base64.b64decode(record["body"]),
+    )
+    return Record(record["fingerprint"], response)
+
+
+@dataclass
+class IdempotencyClaim:
+    """The claimed key of a request, completed by `IdempotencyMiddleware`."""
+
+    store: IdempotencyStore
+    key: str
+    fingerprint: str
+    ttl: float
+
+    async def complete(self, response: StoredResponse):
+        await self.store.complete(
+            self.key, Record(self.fingerprint, response), self.ttl
+        )
+
+    async def release(self):
+        await self.store.release(self.key)
+
+
+class IdempotentReplayException(Exception):
+    def __init__(self, response: StoredResponse) -> None:
+        self.response = response
+
+
+def idempotent_replay_handler(
+    request: Request, exc: IdempotentReplayException
+) -> Response:
+    response = Response(exc.response.body, status_code=exc.response.status)
+    for name, value in exc.response.headers:
+        response.headers.append(name, value)
+    response.headers[REPLAYED_HEADER] = "true"
+    return response
+
+
+@cache
+def _redis_store(connection_string: str) -> RedisIdempotencyStore:
+    return RedisIdempotencyStore(Redis.from_url(connection_string))
+
+
+@cache
+def _memory_store() -> MemoryIdempotencyStore:
+    return MemoryIdempotencyStore()
+
+
+def get_idempotency_store(
+    settings: Settings = Depends(get_settings),
+) -> IdempotencyStore:
+    if settings.REDIS_CONNECTION_STRING is None:
+        return _memory_store()
+    return _redis_store(settings.REDIS_CONNECTION_STRING)
+
+
+class Idempotency:
+    def __init__(self, poll_interval: float = 0.05, max_poll_interval: float = 0.5):
+        """Dependency handling the `Idempotency-Key` header of a route.
+
+        The first request with a key runs, and `IdempotencyMiddleware` stores its
+        response for `IDEMPOTENCY_TTL_S`. Later requests with the key get the
+        stored response, concurrent ones wait for the original request to finish
+        instead of running in parallel. Keys are scoped to the authenticated user,
+        so the dependency has to run after the authentication. Reusing a key for a
+        different method, path or body is rejected with 422.
+
+        Usage:
+            @router.post("/", dependencies=[Depends(Idempotency())])
+
+        Args:
+            poll_interval (float, optional): The initial seconds between two checks
+                for the response of the original request, doubled on each check.
+                Defaults to 0.05.
+            max_poll_interval (float, optional): The maximum seconds between two
+                checks. Defaults to 0.5.
+        """
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+
+    async def __call__(
+        self,
+        request: Request,
+        idempotency_key: str | None = Header(None, max_length=255),
+        settings: Settings = Depends(get_settings),
+        store: IdempotencyStore = Depends(get_idempotency_store),
+    ) -> None:
+        if idempotency_key is None:
+            return
+
+        user = getattr(request.state, "user", None)
+        principal = (user.claims.get("oid") or user.claims.get("sub")) if user else ""
+        key = f"idempotency:{principal}:{idempotency_key}"
+
+        fingerprint = hashlib.sha256(
+            b"%s %s\n%s"
+            % (request.method.encode(), request.url.path.encode(), await request.body())
+        ).hexdigest()
+
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT_S
+        poll_interval = self.poll_interval
+        while True:
+            record = await store.claim(
+                key, fingerprint, settings.IDEMPOTENCY_LOCK_TTL_S
+            )
+            if record is None:
+                request.state.idempotency = IdempotencyClaim(
+                    store, key, fingerprint, settings.IDEMPOTENCY_TTL_S
+                )
+                return
+
+            if record.fingerprint != fingerprint:
+                raise HTTPException(
+                    422, "Idempotency-Key was already used for a different request"
+                )
+            if record.response is not None:
+                raise IdempotentReplayException(record.response)
+            if time.monotonic() >= deadline:
+                raise HTTPException(
+                    409, "A request with this Idempotency-Key is still in progress"
+                )
+
+            await asyncio.sleep(poll_interval)
+            poll_interval = min(poll_interval * 2, self.max_poll_interval)
@@ -0,0 +1,20 @@
+import logging
+
+from app.config import get_settings
+from app.database import session_factory
+from app.jobs.registry import registry
+from app.repositories.sample_repository import SampleRepository
+
+logger = logging.getLogger(__name__)
+
+
+@registry.job("samples.created")
+async def sample_created(id: int):
+    settings = get_settings()
+    async with session_factory(settings.POSTGRES_CONNECTION_STRING)() as session:
+        item = await SampleRepository(session).get_by_id(id)
+
+    if item is None:
+        # deleted before the job ran
+        return
+    logger.info("Sample %d created", item.id, extra={"sample_id": item.id})
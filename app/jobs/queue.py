@@ -0,0 +1,191 @@
+"""Redis-backed job queue.
+
+Jobs are hashes at `jobs:<queue>:job:<id>`, their ids wait in the `queued`
+sorted set scored by the time they become available. Dequeuing moves ids to the
+`running` sorted set scored by the end of their lease; jobs whose worker died
+are requeued once their lease expired. A job id is only enqueued once while the
+job is queued or running, which deduplicates jobs with the same `dedupe_key`.
+"""
+import json
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from functools import cache
+from typing import Any
+
+from fastapi import Depends
+from redis.asyncio import Redis
+
+from app.config import Settings, get_settings
+from app.telemetry.metrics import jobs_enqueued
+
+logger = logging.getLogger(__name__)
+
+DEAD_JOBS_MAX_LENGTH = 1000
+
+_ENQUEUE = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'name', ARGV[2], 'args', ARGV[3], 'attempts', 0,
+    'enqueued_at', ARGV[4])
+redis.call('ZADD', KEYS[2], ARGV[5], ARGV[1])
+return 1
+"""
+
+_DEQUEUE = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+for _, id in ipairs(expired) do
+    redis.call('ZREM', KEYS[2], id)
+    redis.call('ZADD', KEYS[1], ARGV[1], id)
+end
+
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1],
+    'WITHSCORES', 'LIMIT', 0, ARGV[3])
+local jobs = {}
+for i = 1, #due, 2 do
+    local id = due[i]
+    local key = ARGV[4] .. id
+    redis.call('ZREM', KEYS[1], id)
+    -- skips the jobs completed by a worker whose lease had expired
+    if redis.call('EXISTS', key) == 1 then
+        redis.call('ZADD', KEYS[2], ARGV[2], id)
+        local attempts = redis.call('HINCRBY', key, 'attempts', 1)
+        local job = redis.call('HMGET', key, 'name', 'args', 'enqueued_at')
+        table.insert(jobs, {id, due[i + 1], attempts, job[1], job[2], job[3]})
+    end
+end
+return jobs
+"""
+
+
+@dataclass
+class Job:
+    id: str
+    name: str
+    args: dict[str, Any]
+    attempts: int
+    enqueued_at: float
+    available_at: float
+
+
+class JobQueue:
+    def __init__(self, redis: Redis, name: str = "default") -> None:
+        """Enqueues jobs for `app.jobs.worker` and hands them out to it.
+
+        Args:
+            redis (Redis): The client of the Redis storing the jobs.
+            name (str, optional): The name of the queue. Defaults to "default".
+        """
+        self.redis = redis
+        self.name = name
+        self._prefix = f"jobs:{name}"
+        self._enqueue = redis.register_script(_ENQUEUE)
+        self._dequeue = redis.register_script(_DEQUEUE)
+
+    @property
+    def queued_key(self) -> str:
+        return f"{self._prefix}:queued"
+
+    @property
+    def running_key(self) -> str:
+        return f"{self._prefix}:running"
+
+    @property
+    def dead_key(self) -> str:
+        return f"{self._prefix}:dead"
+
+    def job_key(self, job_id: str) -> str:
+        return f"{self._prefix}:job:{job_id}"
+
+    async def enqueue(
+        self,
+        name: str,
+        args: dict[str, Any] | None = None,
+        dedupe_key: str | None = None,
+        delay: float = 0,
+    ) -> str | None:
+        """Enqueues the job `name` with the keyword arguments `args`.
+
+        Returns the job id, or None if a job with the same `dedupe_key` is
+        already queued or running.
+        """
+        job_id = dedupe_key or uuid.uuid4().hex
+        now = time.time()
+
+        enqueued = await self._enqueue(
+            keys=[self.job_key(job_id), self.queued_key],
+            args=[job_id, name, json.dumps(args or {}), now, now + delay],
+        )
+
+        jobs_enqueued.add(1, {"job": name, "deduplicated": not enqueued})
+        if not enqueued:
+            logger.debug("Job %s is already queued", job_id)
+            return None
+        return job_id
+
+    async def dequeue(self, count: int, lease: float) -> list[Job]:
+        """Hands out up to `count` available jobs for `lease` seconds."""
+        now = time.time()
+        # the job keys are built in the script from the prefix of the queue
+        jobs = await self._dequeue(
+            keys=[self.queued_key, self.running_key],
+            args=[now, now + lease, count, self.job_key("")],
+        )
+
+        return [
+            Job(
+                id=job_id.decode(),
+                name=name.decode(),
+                args=json.loads(args),
+                attempts=attempts,
+                enqueued_at=float(enqueued_at),
+                available_at=float(available_at),
+            )
+            for job_id, available_at, attempts, name, args, enqueued_at in jobs
+        ]
+
+    async def complete(self, job: Job):
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.running_key, job.id)
+            pipe.delete(self.job_key(job.id))
+            await pipe.execute()
+
+    async def retry(self, job: Job, delay: float, error: str):
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.running_key, job.id)
+            pipe.hset(self.job_key(job.id), "error", error)
+            pipe.zadd(self.queued_key, {job.id: time.time() + delay})
+            await pipe.execute()
+
+    async def fail(self, job: Job, error: str):
+        """Moves the job to the dead jobs, which keeps the latest of them."""
+        dead_job = {
+            "id": job.id,
+            "name": job.name,
+            "args": job.args,
+            "attempts": job.attempts,
+            "error": error,
+            "failed_at": time.time(),
+        }
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(self.running_key, job.id)
+            pipe.delete(self.job_key(job.id))
+            pipe.lpush(self.dead_key, json.dumps(dead_job))
+            pipe.ltrim(self.dead_key, 0, DEAD_JOBS_MAX_LENGTH - 1)
+            await pipe.execute()
+
+    async def size(self) -> int:
+        return await self.redis.zcard(self.queued_key)
+
+
+@cache
+def _job_queue(connection_string: str, name: str) -> JobQueue:
+    return JobQueue(Redis.from_url(connection_string), name)
+
+
+def get_job_queue(settings: Settings = Depends(get_settings)) -> JobQueue | None:
+    if not settings.JOBS_ENABLED or settings.REDIS_CONNECTION_STRING is None:
+        return None
+    return _job_queue(settings.REDIS_CONNECTION_STRING, settings.JOB_QUEUE_NAME)
@@ -0,0 +1,49 @@
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+Handler = Callable[..., Awaitable[Any]]
+
+
+@dataclass
+class JobDefinition:
+    name: str
+    handler: Handler
+    max_attempts: int | None = None
+    timeout: float | None = None
+
+
+class JobRegistry:
+    def __init__(self) -> None:
+        """The handlers of the jobs, by job name.
+
+        Usage:
+            @registry.job("samples.created", max_attempts=3)
+            async def sample_created(id: int):
+                ...
+        """
+        self._jobs: dict[str, JobDefinition] = {}
+
+    def job(
+        self, name: str, max_attempts: int | None = None, timeout: float | None = None
+    ) -> Callable[[Handler], Handler]:
+        """Registers the decorated coroutine function as handler of the job `name`.
+
+        `max_attempts` and `timeout` override the defaults of the worker.
+        """
+
+        def decorator(handler: Handler) -> Handler:
+            if name in self._jobs:
+                raise ValueError(f"Job {name} is already registered")
+            self._jobs[name] = JobDefinition(name, handler, max_attempts, timeout)
+            return handler
+
+        return decorator
+
+    def get(self, name: str) -> JobDefinition | None:
+        return self._jobs.get(name)
+
+    def definitions(self) -> list[JobDefinition]:
+        return list(self._jobs.values())
+
+
+registry = JobRegistry()
@@ -0,0 +1,254 @@
+"""Consumes the jobs of the queue outside of the API workers.
+
+Usage:
+    python -m app.jobs.worker
+"""
+import asyncio
+import logging
+import random
+import signal
+import time
+
+from app.config import Settings, get_settings
+from app.database.slow_queries import QueryMonitor
+from app.jobs.queue import Job, JobQueue, get_job_queue
+from app.jobs.registry import JobRegistry
+from app.telemetry.azure_monitor import AzureMonitor
+from app.telemetry.export import ExportOptions, create_exporters
+from app.telemetry.logging import init_logging, shutdown_logging
+from app.telemetry.metrics import (
+    create_metric_readers,
+    init_metrics,
+    job_duration,
+    job_latency,
+)
+from app.telemetry.otel import patch_otel
+from app.telemetry.sampling import create_sampler
+
+logger = logging.getLogger(__name__)
+
+
+class JobWorker:
+    def __init__(
+        self,
+        queue: JobQueue,
+        registry: JobRegistry,
+        concurrency: int = 10,
+        poll_interval: float = 0.1,
+        max_attempts: int = 5,
+        timeout: float = 60.0,
+        retry_backoff: float = 1.0,
+        retry_backoff_max: float = 300.0,
+    ) -> None:
+        """Runs up to `concurrency` jobs of the queue at the same time.
+
+        Failed jobs are retried after an exponential backoff with jitter until
+        `max_attempts` is reached, then they are moved to the dead jobs. Jobs
+        stay leased to the worker for twice the longest timeout of all jobs, if
+        the worker dies they are handed out again afterwards.
+
+        Args:
+            queue (JobQueue): The queue of the jobs.
+            registry (JobRegistry): The handlers of the jobs.
+            concurrency (int, optional): The maximum number of jobs running at the
+                same time. Defaults to 10.
+            poll_interval (float, optional): The seconds to wait for new jobs when
+                the queue is empty. Defaults to 0.1.
+            max_attempts (int, optional): The default attempts of a job.
+                Defaults to 5.
+            timeout (float, optional): The default seconds after which a job is
+                cancelled and fails. Defaults to 60.0.
+            retry_backoff (float, optional): The seconds before the first retry,
+                doubled for each further attempt. Defaults to 1.0.
+            retry_backoff_max (float, optional): The maximum seconds between
+                retries. Defaults to 300.0.
+        """
+        self.queue = queue
+        self.registry = registry
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+
+        self._stopping = asyncio.Event()
+        self._running: set[asyncio.Task] = set()
+
+    def stop(self):
+        """Stops fetching jobs, `run` returns once the running jobs finished."""
+        self._stopping.set()
+
+    async def run(self):
+        while not self._stopping.is_set():
+            free = self.concurrency - len(self._running)
+            if free == 0:
+                await asyncio.wait(self._running, return_when=asyncio.FIRST_COMPLETED)
+                continue
+
+            jobs = await self._dequeue(free)
+            for job in jobs:
+                task = asyncio.create_task(self._run_job(job))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+
+            if not jobs:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+        if self._running:
+            await asyncio.wait(self._running)
+
+    async def _dequeue(self, count: int) -> list[Job]:
+        try:
+            return await self.queue.dequeue(count, lease=self._max_timeout() * 2)
+        except Exception:
+            logger.exception("Failed to fetch jobs")
+            return []
+
+    def _max_timeout(self) -> float:
+        # the job is only known after dequeuing it, so the lease has to cover all
+        return max(
+            [self.timeout]
+            + [
+                definition.timeout
+                for definition in self.registry.definitions()
+                if definition.timeout is not None
+            ]
+        )
+
+    async def _run_job(self, job: Job):
+        definition = self.registry.get(job.name)
+        if definition is None:
+            logger.error("No handler for job %s", job.name)
+            await self.queue.fail(job, f"No handler for job {job.name}")
+            return
+
+        max_attempts = definition.max_attempts or self.max_attempts
+        timeout = definition.timeout or self.timeout
+
+        job_latency.record(
+            max(0.0, time.time() - job.available_at) * 1000, {"job": job.name}
+        )
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(definition.handler(**job.args), timeout)
+        except Exception as error:
+            duration = (time.perf_counter() - start) * 1000
+            if job.attempts >= max_attempts:
+                logger.exception(
+                    "Job %s %s failed after %d attempts", job.name, job.id, job.attempts
+                )
+                job_duration.record(duration, {"job": job.name, "result": "failed"})
+                await self.queue.fail(job, repr(error))
+                return
+
+            delay = self._backoff(job.attempts)
+            logger.warning(
+                "Job %s %s failed, retrying in %.1f seconds",
+                job.name,
+                job.id,
+                delay,
+                exc_info=True,
+            )
+            job_duration.record(duration, {"job": job.name, "result": "retry"})
+            await self.queue.retry(job, delay, repr(error))
+            return
+
+        job_duration.record(
+            (time.perf_counter() - start) * 1000, {"job": job.name, "result": "success"}
+        )
+        await self.queue.complete(job)
+
+    def _backoff(self, attempts: int) -> float:
+        backoff = min(self.retry_backoff * 2 ** (attempts - 1), self.retry_backoff_max)
+        # spread the retries of jobs that failed together
+        return backoff * random.uniform(0.5, 1.0)
+
+
+def init_telemetry(settings: Settings):
+    # the job worker runs outside of gunicorn, whose post_fork hook does this for
+    # the API workers
+    patch_otel(enable_system_metrics=settings.SYSTEM_METRICS_ENABLED)
+
+    metric_readers = create_metric_readers(settings)
+    exporters = create_exporters(settings)
+    if exporters is not None:
+        AzureMonitor.init(
+            exporters,
+            sampler=create_sampler(settings),
+            metric_readers=metric_readers,
+            export_options=ExportOptions.from_settings(settings),
+        )
+    elif metric_readers:
+        init_metrics(metric_readers)
+
+
+def create_job_worker(settings: Settings, queue: JobQueue) -> JobWorker:
+    # registers the handlers
+    from app.jobs import handlers  # noqa: F401
+    from app.jobs.registry import registry
+
+    return JobWorker(
+        queue,
+        registry,
+        concurrency=settings.JOB_WORKER_CONCURRENCY,
+        poll_interval=settings.JOB_WORKER_POLL_INTERVAL_MS / 1000,
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+        timeout=settings.JOB_TIMEOUT_S,
+        retry_backoff=settings.JOB_RETRY_BACKOFF_S,
+        retry_backoff_max=settings.JOB_RETRY_BACKOFF_MAX_S,
+    )
+
+
+async def serve(settings: Settings):
+    queue = get_job_queue(settings)
+    if queue is None:
+        raise SystemExit(
+            "The job worker requires JOBS_ENABLED and REDIS_CONNECTION_STRING"
+        )
+
+    worker = create_job_worker(settings, queue)
+
+    loop = asyncio.get_running_loop()
+    for sig in [signal.SIGINT, signal.SIGTERM]:
+        loop.add_signal_handler(sig, worker.stop)
+
+    logger.info(
+        "Job worker consuming queue %s with concurrency %d",
+        queue.name,
+        worker.concurrency,
+    )
+    try:
+        await worker.run()
+    finally:
+        await queue.redis.close()
+
+
+def main():
+    settings = get_settings()
+
+    init_logging(
+        settings.DEFAULT_LOG_LEVEL,
+        settings.LOG_CONFIG,
+        queue_max_size=settings.LOG_QUEUE_MAX_SIZE,
+        queue_full_policy=settings.LOG_QUEUE_FULL_POLICY,
+    )
+    init_telemetry(settings)
+
+    # logs the slow queries of the handlers
+    QueryMonitor.init(
+        slow_query_threshold=settings.DB_SLOW_QUERY_THRESHOLD_MS / 1000,
+        max_statements=settings.DB_QUERY_STATS_MAX_STATEMENTS,
+    )
+
+    try:
+        asyncio.run(serve(settings))
+    finally:
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+import asyncio
+
 from fastapi import Request
 from slowapi import Limiter
 
@@ -39,3 +41,10 @@ class RateLimit:
         if cls._limiter is None:  # pragma: no cover
             raise RuntimeError("RateLimit not initialized")
         return cls._limiter
+
+    @classmethod
+    async def check_storage(cls):
+        """Connects to the storage of the limits, raises when it's unavailable."""
+        # the Redis storage uses a synchronous client
+        if not await asyncio.to_thread(cls.instance()._storage.check):
+            raise ConnectionError("The rate limit storage is unavailable")
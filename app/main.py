@@ -1,6 +1,8 @@
 import logging
+from dataclasses import asdict
+from functools import partial
 
-from fastapi import FastAPI, Request, Response, Security, status
+from fastapi import Depends, FastAPI, Request, Response, Security, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import RedirectResponse
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
@@ -11,25 +13,49 @@ from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
 
 from app.azure_scheme import AzureScheme
 from app.config import get_settings
+from app.database import ping_database, prewarm_pool
+from app.database.batching import WriteBatcher
+from app.database.notifications import NotificationHub
+from app.database.slow_queries import QueryMonitor
+from app.http_client import HttpClient
+from app.idempotency import IdempotentReplayException, idempotent_replay_handler
 from app.limiter import RateLimit
-from app.middleware import UncaughtExceptionHandlerMiddleware
-from app.responses import default_responses
-from app.telemetry.logging import UvicornLoggingFilter, init_logging
+from app.middleware import (
+    AccessLogFilter,
+    AccessLogMiddleware,
+    IdempotencyMiddleware,
+    RequestMetricsMiddleware,
+    RequestProfilingMiddleware,
+    UncaughtExceptionHandlerMiddleware,
+)
+from app.on_behalf_of import OnBehalfOf
+from app.packages.auth.dependencies import RoleValidator
+from app.readiness import Readiness
+from app.responses import ORJSONResponse, default_responses
+from app.telemetry import prometheus
+from app.telemetry.logging import init_logging
+from app.telemetry.metrics import (
+    create_metric_readers,
+    has_meter_provider,
+    init_metrics,
+)
 
 logger = logging.getLogger(__name__)
 
-uvicorn_access_logger = logging.getLogger("uvicorn.access")
-uvicorn_access_logger.addFilter(UvicornLoggingFilter(path="/health", method="GET"))
-uvicorn_access_logger.addFilter(UvicornLoggingFilter(path="/oauth2-redirect"))
-
 settings = get_settings()
 
-init_logging(settings.DEFAULT_LOG_LEVEL, settings.LOG_CONFIG)
+init_logging(
+    settings.DEFAULT_LOG_LEVEL,
+    settings.LOG_CONFIG,
+    queue_max_size=settings.LOG_QUEUE_MAX_SIZE,
+    queue_full_policy=settings.LOG_QUEUE_FULL_POLICY,
+)
 
 app = FastAPI(
     title="Hello World",
     version="0.1.0",
     description="Hello World API",
+    default_response_class=ORJSONResponse,
     swagger_ui_oauth2_redirect_url="/oauth2-redirect",
     swagger_ui_init_oauth={
         "usePkceWithAuthorizationCodeGrant": True,
@@ -37,19 +63,75 @@ app = FastAPI(
     },
 )
 
-FastAPIInstrumentor.instrument_app(app, excluded_urls="health,oauth2-redirect")
+if settings.PROFILING_ENABLED:
+    # added before the OpenTelemetry middleware to attach profiles to the request span
+    app.add_middleware(
+        RequestProfilingMiddleware,
+        token=(
+            settings.PROFILING_REQUEST_TOKEN.get_secret_value()
+            if settings.PROFILING_REQUEST_TOKEN is not None
+            else None
+        ),
+        interval=settings.PROFILING_REQUEST_INTERVAL_MS / 1000,
+    )
+
+app.add_middleware(RequestMetricsMiddleware)
+
+# stores the responses of requests with an Idempotency-Key
+app.add_middleware(IdempotencyMiddleware)
+app.add_exception_handler(IdempotentReplayException, idempotent_replay_handler)
+
+if settings.ACCESS_LOG_ENABLED:
+    # added before the OpenTelemetry middleware to log the request span
+    app.add_middleware(
+        AccessLogMiddleware,
+        access_log_filter=AccessLogFilter(
+            settings.ACCESS_LOG_EXCLUDED,
+            success_sample_rate=settings.ACCESS_LOG_SUCCESS_SAMPLE_RATE,
+            slow_request_threshold=settings.ACCESS_LOG_SLOW_REQUEST_THRESHOLD_MS / 1000,
+        ),
+    )
+
+FastAPIInstrumentor.instrument_app(
+    app, excluded_urls="health,ready,oauth2-redirect,metrics"
+)
 
 
 app.add_middleware(ProxyHeadersMiddleware)
 app.add_middleware(UncaughtExceptionHandlerMiddleware)
 
-AzureScheme.init(settings.TENANT_ID, settings.API_CLIENT_ID)
+AzureScheme.init(
+    settings.TENANT_ID, settings.API_CLIENT_ID, config_url=settings.OIDC_CONFIG_URL
+)
+
+QueryMonitor.init(
+    slow_query_threshold=settings.DB_SLOW_QUERY_THRESHOLD_MS / 1000,
+    explain_sample_rate=settings.DB_SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+    explain_timeout=settings.DB_SLOW_QUERY_EXPLAIN_TIMEOUT_MS / 1000,
+    max_statements=settings.DB_QUERY_STATS_MAX_STATEMENTS,
+)
 
 limiter = RateLimit.init(settings.REDIS_CONNECTION_STRING)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 app.add_middleware(SlowAPIMiddleware)
 
+readiness = Readiness.init(
+    check_ttl=settings.READINESS_CHECK_TTL_S,
+    check_timeout=settings.READINESS_CHECK_TIMEOUT_S,
+)
+readiness.add_check(
+    "database",
+    partial(ping_database, settings.POSTGRES_CONNECTION_STRING),
+    prewarm=partial(
+        prewarm_pool,
+        settings.POSTGRES_CONNECTION_STRING,
+        settings.DB_POOL_PREWARM_CONNECTIONS,
+    ),
+)
+# reloads the OpenID configuration and signing keys only when they failed or expired
+readiness.add_check("auth", lambda: AzureScheme.instance().openid_config.load_config())
+readiness.add_check("rate_limit", RateLimit.check_storage)
 
 if settings.BACKEND_CORS_ORIGINS:
     app.add_middleware(
@@ -61,11 +143,61 @@ if settings.BACKEND_CORS_ORIGINS:
     )
 
 
+@app.on_event("startup")
+async def init_http_client() -> None:
+    http_client = HttpClient.init(settings)
+    openid_config = AzureScheme.instance().openid_config
+    openid_config.http_client = http_client
+
+    if settings.API_CLIENT_SECRET is not None:
+        OnBehalfOf.init(
+            http_client,
+            openid_config,
+            settings.API_CLIENT_ID,
+            settings.API_CLIENT_SECRET.get_secret_value(),
+            refresh_margin=settings.OBO_TOKEN_REFRESH_MARGIN_S,
+            maxsize=settings.OBO_TOKEN_CACHE_MAX_SIZE,
+        )
+
+
 @app.on_event("startup")
 async def load_auth_config() -> None:
     await AzureScheme.instance().load_config()
 
 
+@app.on_event("shutdown")
+async def close_http_client() -> None:
+    await HttpClient.close()
+
+
+@app.on_event("shutdown")
+async def close_notification_hubs() -> None:
+    await NotificationHub.close_all()
+
+
+@app.on_event("shutdown")
+async def close_write_batchers() -> None:
+    # writes the items still waiting for their batch
+    await WriteBatcher.close_all()
+
+
+@app.on_event("startup")
+async def prewarm() -> None:
+    # runs after the OpenID configuration is loaded
+    results = await Readiness.instance().prewarm()
+    logger.info(
+        "Prewarmed %s",
+        ", ".join(f"{name}: {result.ok}" for name, result in results.items()),
+    )
+
+
+@app.on_event("startup")
+async def init_local_metrics() -> None:
+    # the gunicorn post_fork hook sets up the metrics of the workers
+    if settings.METRICS_ENDPOINT_ENABLED and not has_meter_provider():
+        init_metrics(create_metric_readers(settings))
+
+
 @app.get("/", include_in_schema=False)
 async def get_root(request: Request, response: Response):
     return RedirectResponse("/docs")
@@ -76,13 +208,40 @@ def health(request: Request, response: Response):
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
+@app.get("/ready", include_in_schema=False)
+async def ready(request: Request, response: Response):
+    readiness = Readiness.instance()
+    results = await readiness.check()
+    is_ready = readiness.prewarmed and all(result.ok for result in results.values())
+
+    return ORJSONResponse(
+        {
+            "ready": is_ready,
+            "checks": {name: asdict(result) for name, result in results.items()},
+        },
+        status_code=(
+            status.HTTP_200_OK if is_ready else status.HTTP_503_SERVICE_UNAVAILABLE
+        ),
+    )
+
+
+if settings.METRICS_ENDPOINT_ENABLED:
+
+    @app.get("/metrics", include_in_schema=False)
+    def get_metrics(request: Request, response: Response):
+        content = prometheus.render(
+            prometheus.collect(settings.METRICS_MULTIPROCESS_DIR)
+        )
+        return Response(content, media_type=prometheus.CONTENT_TYPE)
+
+
 @app.get("/error")
 async def get_error(request: Request, response: Response):
     raise Exception("This is an error")
 
 
 def add_routers():
-    from app.routers import samples, users
+    from app.routers import batch, diagnostics, samples, users
 
     app.include_router(
         users.router,
@@ -104,5 +263,26 @@ def add_routers():
         responses={**default_responses},
     )
 
+    app.include_router(
+        batch.router,
+        prefix="/batch",
+        tags=["batch"],
+        dependencies=[
+            Security(AzureScheme.instance(), scopes=["user_impersonation"]),
+        ],
+        responses={**default_responses},
+    )
+
+    app.include_router(
+        diagnostics.router,
+        prefix="/diagnostics",
+        tags=["diagnostics"],
+        dependencies=[
+            Security(AzureScheme.instance(), scopes=["user_impersonation"]),
+            Depends(RoleValidator(["admin"])),
+        ],
+        responses={**default_responses},
+    )
+
 
 add_routers()
@@ -1,3 +1,14 @@
+from .access_log import AccessLogFilter, AccessLogMiddleware
+from .idempotency import IdempotencyMiddleware
+from .profiling import RequestProfilingMiddleware
+from .request_metrics import RequestMetricsMiddleware
 from .uncaught_exception_handler import UncaughtExceptionHandlerMiddleware
 
-__all__ = ["UncaughtExceptionHandlerMiddleware"]
+__all__ = [
+    "AccessLogFilter",
+    "AccessLogMiddleware",
+    "IdempotencyMiddleware",
+    "RequestMetricsMiddleware",
+    "RequestProfilingMiddleware",
+    "UncaughtExceptionHandlerMiddleware",
+]
@@ -0,0 +1,120 @@
+import logging
+import random
+import time
+from typing import Iterable
+
+from opentelemetry.trace import get_current_span
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.telemetry.logging import ACCESS_LOGGER_NAME
+
+access_logger = logging.getLogger(ACCESS_LOGGER_NAME)
+
+HTTP_METHODS = ("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS")
+
+
+class AccessLogFilter:
+    def __init__(
+        self,
+        excluded: Iterable[str] = (),
+        success_sample_rate: float = 1.0,
+        slow_request_threshold: float = 1.0,
+    ):
+        """Decides which requests are written to the access log.
+
+        Usage:
+            AccessLogFilter(["GET /health", "/oauth2-redirect"], success_sample_rate=0.1)
+
+        Args:
+            excluded (Iterable[str], optional): The requests that are never logged,
+                as `METHOD /path` or `/path` for all methods. Defaults to ().
+            success_sample_rate (float, optional): The ratio of logged 2xx and 3xx
+                responses. 4xx and 5xx responses are always logged. Defaults to 1.0.
+            slow_request_threshold (float, optional): The duration in seconds above
+                which requests are always logged. Defaults to 1.0.
+        """
+        self._excluded = frozenset(_expand_exclusions(excluded))
+        self._success_sample_rate = success_sample_rate
+        self._slow_request_threshold = slow_request_threshold
+
+    def is_excluded(self, method: str, path: str) -> bool:
+        return (method, path) in self._excluded
+
+    def should_log(self, status_code: int, duration: float) -> bool:
+        if status_code >= 400 or duration >= self._slow_request_threshold:
+            return True
+        if self._success_sample_rate >= 1:
+            return True
+        return random.random() < self._success_sample_rate
+
+
+def _expand_exclusions(excluded: Iterable[str]) -> Iterable[tuple[str, str]]:
+    for exclusion in excluded:
+        method, _, path = exclusion.strip().rpartition(" ")
+        methods = [method.upper()] if method else HTTP_METHODS
+
+        # match the path with and without trailing slash
+        path = path.rstrip("/") or "/"
+        for method in methods:
+            yield method, path
+            yield method, path + "/"
+
+
+class AccessLogMiddleware:
+    def __init__(self, app: ASGIApp, access_log_filter: AccessLogFilter) -> None:
+        """Writes one structured access log record per logged request.
+
+        The records carry the request duration and the trace and span ID of the
+        request span, so the middleware must be added before the OpenTelemetry
+        middleware.
+        """
+        self.app = app
+        self.access_log_filter = access_log_filter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or not access_logger.isEnabledFor(logging.INFO)
+            or self.access_log_filter.is_excluded(scope["method"], scope["path"])
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - start
+            if self.access_log_filter.should_log(status_code, duration):
+                _log(scope, status_code, duration)
+
+
+def _log(scope: Scope, status_code: int, duration: float) -> None:
+    method, path = scope["method"], scope["path"]
+    client = scope.get("client")
+
+    extra = {
+        "method": method,
+        "path": path,
+        "status_code": status_code,
+        "duration_ms": round(duration * 1000, 3),
+    }
+    if client:
+        extra["client_addr"] = client[0]
+
+    span_context = get_current_span().get_span_context()
+    if span_context.is_valid:
+        extra["trace_id"] = format(span_context.trace_id, "032x")
+        extra["span_id"] = format(span_context.span_id, "016x")
+
+    access_logger.info(
+        "%s %s %d %.1fms", method, path, status_code, duration * 1000, extra=extra
+    )
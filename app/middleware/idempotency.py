@@ -0,0 +1,79 @@
+import logging
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.idempotency import IDEMPOTENCY_KEY_HEADER, IdempotencyClaim, StoredResponse
+
+logger = logging.getLogger(__name__)
+
+_METHODS = frozenset(["POST", "PATCH"])
+
+# describe the original response only
+_EXCLUDED_HEADERS = frozenset(["content-length", "date", "server", "retry-after"])
+
+
+class IdempotencyMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        """Stores the response of requests that claimed an idempotency key.
+
+        The key is claimed by the `Idempotency` dependency of the route. Responses
+        below 500 are stored and replayed to retries, server errors and failed
+        requests release the key so a retry runs again.
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in _METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        header = IDEMPOTENCY_KEY_HEADER.encode()
+        if not any(name == header for name, _ in scope["headers"]):
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        headers: list[tuple[str, str]] = []
+        chunks: list[bytes] = []
+
+        async def send_capturing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for name, value in message.get("headers", []):
+                    name = name.decode("latin-1").lower()
+                    if name not in _EXCLUDED_HEADERS and not name.startswith(
+                        "x-ratelimit"
+                    ):
+                        headers.append((name, value.decode("latin-1")))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_capturing)
+        except Exception:
+            await self._release(scope)
+            raise
+
+        claim: IdempotencyClaim | None = scope.get("state", {}).get("idempotency")
+        if claim is None:
+            return
+
+        try:
+            if status < 500:
+                await claim.complete(StoredResponse(status, headers, b"".join(chunks)))
+            else:
+                await claim.release()
+        except Exception:
+            logger.exception("Failed to store the idempotent response")
+
+    async def _release(self, scope: Scope):
+        claim: IdempotencyClaim | None = scope.get("state", {}).get("idempotency")
+        if claim is None:
+            return
+
+        try:
+            await claim.release()
+        except Exception:
+            logger.exception("Failed to release the idempotency key")
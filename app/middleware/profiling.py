@@ -0,0 +1,92 @@
+import hmac
+import logging
+
+from opentelemetry.trace import get_current_span
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.telemetry.profiling import (
+    PROFILE_STACKS_KEY,
+    ProfilerBusyException,
+    profile_request,
+)
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile"
+
+# Application Insights truncates longer custom properties
+PROFILE_ATTRIBUTE_MAX_LENGTH = 8192
+
+
+class RequestProfilingMiddleware:
+    def __init__(
+        self, app: ASGIApp, token: str | None = None, interval: float = 0.001
+    ) -> None:
+        """Profiles requests with the `X-Profile: <token>` header.
+
+        The collapsed stacks are attached to the request span as the `profile.stacks`
+        attribute. Requests are not profiled while another profiler runs in the worker.
+        The header is checked before the authentication of the request, so it has to
+        carry the shared `token` instead of enabling profiles for every caller. The
+        header is removed from all requests.
+
+        Args:
+            app (ASGIApp): The ASGI app.
+            token (str | None, optional): The token to request a profile, no requests
+                are profiled without one. Defaults to None.
+            interval (float, optional): The sampling interval in seconds.
+                Defaults to 0.001.
+        """
+        self.app = app
+        self.token = token
+        self.interval = interval
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        header = PROFILE_HEADER.encode()
+        value = next((v for name, v in scope["headers"] if name == header), None)
+        if value is None:
+            await self.app(scope, receive, send)
+            return
+
+        scope = {
+            **scope,
+            "headers": [(name, v) for name, v in scope["headers"] if name != header],
+        }
+        if not self._is_authorized(value):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            profiler = profile_request(
+                f"{scope['method']} {scope['path']}", self.interval
+            )
+        except ProfilerBusyException:
+            logger.info("Skipped request profile, the profiler is busy")
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profile = profiler.stop()
+
+            span = get_current_span()
+            if span.is_recording():
+                span.set_attributes(
+                    {
+                        PROFILE_STACKS_KEY: profile.collapsed(
+                            max_length=PROFILE_ATTRIBUTE_MAX_LENGTH
+                        ),
+                        "profile.samples": profile.sample_count,
+                        "profile.interval_ms": profile.interval * 1000,
+                    }
+                )
+
+    def _is_authorized(self, value: bytes) -> bool:
+        return self.token is not None and hmac.compare_digest(
+            value, self.token.encode()
+        )
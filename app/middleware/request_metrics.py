@@ -0,0 +1,62 @@
+import time
+from typing import Callable
+
+from starlette.routing import BaseRoute
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.telemetry.metrics import request_duration
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        """Records the request duration by route template, method and status code.
+
+        Request rate and error rate are the counts of the histogram by status code.
+        """
+        self.app = app
+        self._routes: dict[Callable, str] | None = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            attributes = {
+                "http.method": scope["method"],
+                "http.status_code": status_code,
+            }
+
+            route = self._route(scope)
+            if route is not None:
+                attributes["http.route"] = route
+
+            request_duration.record((time.perf_counter() - start) * 1000, attributes)
+
+    def _route(self, scope: Scope) -> str | None:
+        # the router sets the endpoint of the matched route on the scope, its
+        # path is the route template without the high cardinality path params
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return None
+
+        if self._routes is None:
+            routes: list[BaseRoute] = scope["app"].routes
+            self._routes = {
+                route.endpoint: route.path
+                for route in routes
+                if hasattr(route, "endpoint") and hasattr(route, "path")
+            }
+
+        return self._routes.get(endpoint)
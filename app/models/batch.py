@@ -0,0 +1,28 @@
+from typing import Any, Literal
+
+from pydantic import BaseModel, Field, constr
+
+Path = constr(regex=r"^/", max_length=2048)
+
+
+class BatchRequestItem(BaseModel):
+    method: Literal["GET", "POST", "PATCH", "DELETE"] = "GET"
+    path: Path = Field(
+        ..., description="Path and query string", example="/samples/1?fields=name"
+    )
+    body: Any = Field(None, description="JSON body")
+
+
+class BatchRequest(BaseModel):
+    requests: list[BatchRequestItem] = Field(..., min_items=1)
+
+
+class BatchResponseItem(BaseModel):
+    status: int
+    body: Any = Field(None, description="JSON body, or text for other content types")
+
+
+class BatchResponse(BaseModel):
+    responses: list[BatchResponseItem] = Field(
+        ..., description="In the order of the requests"
+    )
@@ -1,4 +1,7 @@
-from pydantic import BaseModel, constr
+from datetime import date
+from typing import Literal
+
+from pydantic import BaseModel, Field, constr
 
 from app.models._meta import AllOptional
 
@@ -21,3 +24,32 @@ class Sample(SampleBase):
 
     class Config:
         orm_mode = True
+
+
+class SampleSearchResult(BaseModel):
+    items: list[Sample]
+    next_cursor: str | None
+
+
+class Statistic(BaseModel):
+    value: int
+    exact: bool = Field(..., description="False if the value is an estimate")
+
+
+class DailyStatistic(Statistic):
+    day: date
+
+
+class SampleStats(BaseModel):
+    total: Statistic
+    per_day: list[DailyStatistic]
+
+
+class SampleChange(BaseModel):
+    id: int = Field(..., description="Resume after it with `Last-Event-ID`")
+    operation: Literal["insert", "update", "delete"]
+    sample_id: int
+    sample: Sample | None = Field(None, description="None for deletes")
+
+    class Config:
+        orm_mode = True
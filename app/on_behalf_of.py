@@ -0,0 +1,51 @@
+from fastapi import Depends
+from httpx import AsyncClient
+
+from app.packages.auth import OnBehalfOfTokenProvider, User
+from app.packages.auth.dependencies import get_required_user
+from app.packages.auth.openid_config import OpenIdConfig
+
+
+class OnBehalfOf:
+    _provider: OnBehalfOfTokenProvider | None = None
+
+    @classmethod
+    def init(
+        cls,
+        http_client: AsyncClient,
+        openid_config: OpenIdConfig,
+        client_id: str,
+        client_secret: str,
+        refresh_margin: float = 300,
+        maxsize: int = 10_000,
+    ):
+        cls._provider = OnBehalfOfTokenProvider(
+            http_client,
+            openid_config,
+            client_id,
+            client_secret,
+            refresh_margin=refresh_margin,
+            maxsize=maxsize,
+        )
+        return cls._provider
+
+    @classmethod
+    def instance(cls):
+        if cls._provider is None:  # pragma: no cover
+            raise RuntimeError("OnBehalfOf not initialized, is API_CLIENT_SECRET set?")
+        return cls._provider
+
+
+class DownstreamToken:
+    def __init__(self, scopes: list[str]):
+        """Dependency returning a token of the signed-in user for a downstream API.
+
+        Usage:
+            graph_token: str = Depends(
+                DownstreamToken(["https://graph.microsoft.com/User.Read"])
+            )
+        """
+        self.scopes = scopes
+
+    async def __call__(self, user: User = Depends(get_required_user)) -> str:
+        return await OnBehalfOf.instance().get_token(user, self.scopes)
@@ -1,4 +1,5 @@
 from .auth import OidcAuthorizationCodeBearer
+from .on_behalf_of import OnBehalfOfTokenProvider
 from .user import User
 
-__all__ = ["OidcAuthorizationCodeBearer", "User"]
+__all__ = ["OidcAuthorizationCodeBearer", "OnBehalfOfTokenProvider", "User"]
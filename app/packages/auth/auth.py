@@ -1,4 +1,5 @@
 import logging
+import time
 
 from fastapi.exceptions import HTTPException
 from fastapi.security import (
@@ -15,9 +16,15 @@ from .openid_config import OpenIdConfig
 from .user import User
 
 try:
-    from opentelemetry import trace  # noqa
+    from opentelemetry import metrics, trace  # noqa
 
     has_opentelemetry = True
+
+    auth_duration = metrics.get_meter(__name__).create_histogram(
+        "app.auth.duration",
+        unit="ms",
+        description="Duration of the request authentication by result",
+    )
 except ModuleNotFoundError:
     has_opentelemetry = False
 
@@ -122,6 +129,23 @@ class OidcAuthorizationCodeBearer(SecurityBase):
 
     async def __call__(
         self, request: Request, security_scopes: SecurityScopes
+    ) -> User | None:
+        if not has_opentelemetry:
+            return await self._authenticate(request, security_scopes)
+
+        start = time.perf_counter()
+        authenticated = False
+        try:
+            user = await self._authenticate(request, security_scopes)
+            authenticated = user is not None
+            return user
+        finally:
+            auth_duration.record(
+                (time.perf_counter() - start) * 1000, {"authenticated": authenticated}
+            )
+
+    async def _authenticate(
+        self, request: Request, security_scopes: SecurityScopes
     ) -> User | None:
         # refresh config if needed
         await self.openid_config.load_config()
@@ -132,7 +156,12 @@ class OidcAuthorizationCodeBearer(SecurityBase):
             if access_token is None:
                 raise InvalidAuthException("No access token provided")
 
-            claims = self._verify(access_token)
+            user: User | None = getattr(request.state, "user", None)
+            if user is not None and user.access_token == access_token:
+                # verified before for this request, e.g. by the batch containing it
+                claims = user.claims
+            else:
+                claims = self._verify(access_token)
 
             token_scope_string = claims.get("scp")
 
@@ -146,9 +175,7 @@ class OidcAuthorizationCodeBearer(SecurityBase):
                     raise InvalidAuthException("Required scope missing")
 
             # Attach the user to the request. Can be accessed through `request.state.user`
-            user: User = User(
-                **{**claims, "claims": claims, "access_token": access_token}
-            )
+            user = User(**{**claims, "claims": claims, "access_token": access_token})
             request.state.user = user
 
             # Add the user id to the opentelemetry tracing span
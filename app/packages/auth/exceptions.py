@@ -25,3 +25,12 @@ class InvalidAuthException(HTTPException):
             detail=detail,
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+
+class OnBehalfOfException(HTTPException):
+    """
+    Exception raised when the token of the user cannot be exchanged for a downstream API
+    """
+
+    def __init__(self, detail: str) -> None:
+        super().__init__(status_code=status.HTTP_502_BAD_GATEWAY, detail=detail)
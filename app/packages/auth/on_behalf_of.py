@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+
+from httpx import AsyncClient, HTTPError
+
+from .exceptions import OnBehalfOfException
+from .openid_config import OpenIdConfig
+from .user import User
+
+logger = logging.getLogger(__name__)
+
+JWT_BEARER_GRANT_TYPE = "urn:ietf:params:oauth:grant-type:jwt-bearer"
+
+
+@dataclass
+class AccessToken:
+    token: str
+    expires_at: float
+
+    def is_fresh(self, refresh_margin: float) -> bool:
+        return time.monotonic() < self.expires_at - refresh_margin
+
+
+class OnBehalfOfTokenProvider:
+    def __init__(
+        self,
+        http_client: AsyncClient,
+        openid_config: OpenIdConfig,
+        client_id: str,
+        client_secret: str,
+        refresh_margin: float = 300,
+        maxsize: int = 10_000,
+    ) -> None:
+        """Exchanges the access tokens of users for tokens of downstream APIs.
+
+        Implements the OAuth 2.0 on-behalf-of flow against the token endpoint of
+        the OpenID configuration. Tokens are cached per user and scopes until
+        `refresh_margin` seconds before they expire, concurrent requests for the
+        same user and scopes share a single exchange.
+
+        Usage:
+            token = await provider.get_token(user, ["https://graph.microsoft.com/.default"])
+            await http_client.get(url, headers={"Authorization": f"Bearer {token}"})
+
+        Args:
+            http_client (AsyncClient): The client of the token requests.
+            openid_config (OpenIdConfig): The configuration with the token endpoint.
+            client_id (str): The client ID of the API.
+            client_secret (str): The client secret of the API.
+            refresh_margin (float, optional): The seconds before their expiry at
+                which tokens are exchanged again. Defaults to 300.
+            maxsize (int, optional): The maximum number of cached tokens, the
+                least recently used are evicted. Defaults to 10_000.
+        """
+        self.http_client = http_client
+        self.openid_config = openid_config
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_margin = refresh_margin
+        self.maxsize = maxsize
+
+        self._tokens: dict[tuple[str, str], AccessToken] = {}
+        self._locks: dict[tuple[str, str], asyncio.Lock] = {}
+
+    async def get_token(self, user: User, scopes: list[str]) -> str:
+        scope = " ".join(sorted(scopes))
+        # oid identifies the user across the applications of the tenant
+        key = (f"{user.tid}:{user.claims.get('oid') or user.claims.get('sub')}", scope)
+
+        cached = self._tokens.get(key)
+        if cached is not None and cached.is_fresh(self.refresh_margin):
+            self._touch(key, cached)
+            return cached.token
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        try:
+            async with lock:
+                # another request may have exchanged the token while we were waiting
+                cached = self._tokens.get(key)
+                if cached is None or not cached.is_fresh(self.refresh_margin):
+                    cached = await self._exchange(user.access_token, scope)
+                self._touch(key, cached)
+                return cached.token
+        finally:
+            if not lock.locked() and self._locks.get(key) is lock:
+                del self._locks[key]
+
+    def clear(self):
+        self._tokens.clear()
+
+    def _touch(self, key: tuple[str, str], token: AccessToken):
+        self._tokens.pop(key, None)
+        self._tokens[key] = token
+        while len(self._tokens) > self.maxsize:
+            del self._tokens[next(iter(self._tokens))]
+
+    async def _exchange(self, assertion: str, scope: str) -> AccessToken:
+        await self.openid_config.load_config()
+
+        try:
+            response = await self.http_client.post(
+                self.openid_config.token_endpoint,
+                data={
+                    "grant_type": JWT_BEARER_GRANT_TYPE,
+                    "client_id": self.client_id,
+                    "client_secret": self.client_secret,
+                    "assertion": assertion,
+                    "scope": scope,
+                    "requested_token_use": "on_behalf_of",
+                },
+            )
+        except HTTPError as e:
+            logger.error("On-behalf-of token request failed", exc_info=True)
+            raise OnBehalfOfException("Token request failed") from e
+
+        if response.is_error:
+            # e.g. invalid_grant when the user has to consent to the scope
+            try:
+                error = response.json().get("error", "unknown_error")
+            except ValueError:
+                error = "unknown_error"
+            logger.warning(
+                "On-behalf-of token exchange failed with %s: %s",
+                response.status_code,
+                error,
+            )
+            raise OnBehalfOfException(f"Token exchange failed: {error}")
+
+        payload = response.json()
+        return AccessToken(
+            token=payload["access_token"],
+            expires_at=time.monotonic() + int(payload["expires_in"]),
+        )
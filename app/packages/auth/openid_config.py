@@ -12,9 +12,12 @@ class OpenIdConfig:
         self,
         config_url: str,
         timeout_in_h: int,
+        http_client: AsyncClient | None = None,
     ) -> None:
         self.config_url = config_url
         self.timeout_in_h = timeout_in_h
+        # a shared client reuses its connections, otherwise one is created per load
+        self.http_client = http_client
 
         self._config_timestamp: datetime | None = None
 
@@ -53,15 +56,30 @@ class OpenIdConfig:
         """
         Load openid config, fetch signing keys
         """
+        if self.http_client is not None:
+            await self._fetch_openid_config(self.http_client)
+            return
+
         async with AsyncClient(timeout=10) as client:
-            logger.info("Fetching OpenID Connect config from %s", self.config_url)
-            openid_response = await client.get(self.config_url)
-            openid_response.raise_for_status()
-            openid_cfg = openid_response.json()
+            await self._fetch_openid_config(client)
+
+    async def _fetch_openid_config(self, client: AsyncClient) -> None:
+        logger.info("Fetching OpenID Connect config from %s", self.config_url)
+        openid_response = await client.get(self.config_url)
+        openid_response.raise_for_status()
+        openid_cfg = openid_response.json()
+
+        self.authorization_endpoint = openid_cfg["authorization_endpoint"]
+        self.token_endpoint = openid_cfg["token_endpoint"]
+        self.issuer = openid_cfg["issuer"]
 
-            self.authorization_endpoint = openid_cfg["authorization_endpoint"]
-            self.token_endpoint = openid_cfg["token_endpoint"]
-            self.issuer = openid_cfg["issuer"]
+        jwks_uri = openid_cfg["jwks_uri"]
+        self.jwks_client = PyJWKClient(jwks_uri, cache_keys=True)
 
-            jwks_uri = openid_cfg["jwks_uri"]
-            self.jwks_client = PyJWKClient(jwks_uri, cache_keys=True)
+        # prefetch the signing keys, PyJWKClient fetches them synchronously on
+        # the event loop when the first token is verified
+        logger.info("Fetching JSON Web Key Set from %s", jwks_uri)
+        jwks_response = await client.get(jwks_uri)
+        jwks_response.raise_for_status()
+        if self.jwks_client.jwk_set_cache is not None:
+            self.jwks_client.jwk_set_cache.put(jwks_response.json())
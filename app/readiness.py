@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from functools import partial
+from typing import Awaitable, Callable
+
+from app.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+Check = Callable[[], Awaitable[None]]
+
+
+@dataclass
+class CheckResult:
+    ok: bool
+    duration_ms: float
+    error: str | None = None
+
+
+class Readiness:
+    _readiness: "Readiness | None" = None
+
+    def __init__(self, check_ttl: float = 5.0, check_timeout: float = 2.0) -> None:
+        """Readiness of the worker to take traffic, reported by `/ready`.
+
+        Each dependency has a check, an awaitable raising when the dependency is
+        unavailable, and optionally a prewarm step that also opens the connections
+        the first requests would otherwise pay for. The worker is ready once the
+        prewarm steps run by `prewarm` at startup succeeded and all checks pass,
+        failed prewarm steps are retried by `check` in place of their checks.
+        Check results are cached for `check_ttl` seconds so frequent probes don't
+        load the dependencies.
+
+        Args:
+            check_ttl (float, optional): The seconds a check result is reused.
+                Defaults to 5.0.
+            check_timeout (float, optional): The seconds after which a check or
+                prewarm step fails. Defaults to 2.0.
+        """
+        self.check_ttl = check_ttl
+        self.check_timeout = check_timeout
+        self.prewarmed = False
+
+        self._checks: dict[str, Check] = {}
+        self._prewarms: dict[str, Check] = {}
+        # the dependencies whose prewarm step failed
+        self._cold: set[str] = set()
+        self._results: TTLCache[str, CheckResult] = TTLCache()
+
+    @classmethod
+    def init(cls, **kwargs) -> "Readiness":
+        cls._readiness = cls(**kwargs)
+        return cls._readiness
+
+    @classmethod
+    def instance(cls) -> "Readiness":
+        if cls._readiness is None:  # pragma: no cover
+            raise RuntimeError("Readiness not initialized")
+        return cls._readiness
+
+    def add_check(self, name: str, check: Check, prewarm: Check | None = None):
+        self._checks[name] = check
+        self._prewarms[name] = prewarm or check
+
+    async def prewarm(self) -> dict[str, CheckResult]:
+        """Runs the prewarm steps of all dependencies concurrently."""
+        results = await asyncio.gather(
+            *(self._run(name, prewarm) for name, prewarm in self._prewarms.items())
+        )
+        for name, result in zip(self._prewarms, results):
+            self._results.set(name, result, self.check_ttl)
+
+        self._cold = {
+            name for name, result in zip(self._prewarms, results) if not result.ok
+        }
+        self.prewarmed = not self._cold
+        return dict(zip(self._prewarms, results))
+
+    async def check(self) -> dict[str, CheckResult]:
+        """Returns the cached or current results of all checks."""
+        results = await asyncio.gather(
+            *(
+                self._results.get_or_set(
+                    name,
+                    partial(
+                        self._run,
+                        name,
+                        self._prewarms[name] if name in self._cold else check,
+                    ),
+                    self.check_ttl,
+                )
+                for name, check in self._checks.items()
+            )
+        )
+
+        if self._cold:
+            self._cold.difference_update(
+                name for name, result in zip(self._checks, results) if result.ok
+            )
+            self.prewarmed = not self._cold
+
+        return dict(zip(self._checks, results))
+
+    async def _run(self, name: str, check: Check) -> CheckResult:
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(check(), self.check_timeout)
+        except Exception as error:
+            duration_ms = (time.perf_counter() - start) * 1000
+            logger.warning("Readiness check %s failed: %r", name, error)
+            return CheckResult(False, duration_ms, repr(error))
+        return CheckResult(True, (time.perf_counter() - start) * 1000)
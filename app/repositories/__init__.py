@@ -1,15 +1,25 @@
 from functools import cache
+from typing import Collection
 
 from fastapi import Depends
+from sqlalchemy import Result, Select, inspect, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import Base, get_db
 
 
 class Repository:
     def __init__(self, db: AsyncSession):
         self.db = db
 
+    async def release(self):
+        """Returns the connection of the session to the pool.
+
+        Long-lived responses call it after their last query, the session is only
+        closed once the response finished.
+        """
+        await self.db.close()
+
 
 @cache
 def get_repository(repository: type[Repository]) -> Repository:
@@ -17,3 +27,30 @@ def get_repository(repository: type[Repository]) -> Repository:
         return repository(db)
 
     return get
+
+
+def select_fields(entity: type[Base], fields: Collection[str] | None = None) -> Select:
+    """Selects the whole entity, or only the columns of the fields of a sparse
+    fieldset so the other columns are never fetched.
+
+    Read the result with `fields_result`.
+    """
+    if fields is None:
+        return select(entity)
+
+    columns = inspect(entity).column_attrs
+    unknown = set(fields).difference(columns.keys())
+    if unknown:
+        raise ValueError(f"{entity.__name__} has no columns {sorted(unknown)}")
+
+    # in table order, so the statement is the same for every order of the fields
+    return select(
+        *(column.class_attribute for column in columns if column.key in fields)
+    )
+
+
+def fields_result(result: Result, fields: Collection[str] | None = None) -> list:
+    """The entities of a `select_fields` query, or dicts of the selected fields."""
+    if fields is None:
+        return result.scalars().all()
+    return [dict(row) for row in result.mappings()]
@@ -1,17 +1,156 @@
-from sqlalchemy import select
+from datetime import date, datetime, timedelta
+from typing import Collection
 
-from app.database.tables import SampleTable
-from app.repositories import Repository
+from sqlalchemy import (
+    Date,
+    Float,
+    and_,
+    cast,
+    func,
+    insert,
+    literal_column,
+    or_,
+    select,
+    text,
+    tuple_,
+)
+
+from app.database.tables import SampleChangeTable, SampleTable
+from app.database.tables.sample_table import SEARCH_CONFIG
+from app.repositories import Repository, fields_result, select_fields
 
 
 class SampleRepository(Repository):
-    async def get(self, skip: int = 0, limit: int = 100) -> list[SampleTable]:
-        query = select(SampleTable).offset(skip).limit(limit)
+    async def get(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        created_after: datetime | None = None,
+        created_before: datetime | None = None,
+        fields: Collection[str] | None = None,
+    ) -> list[SampleTable] | list[dict]:
+        query = select_fields(SampleTable, fields)
+
+        # filtering on the partition key lets postgres skip unrelated partitions
+        if created_after is not None:
+            query = query.where(SampleTable.create_date >= created_after)
+        if created_before is not None:
+            query = query.where(SampleTable.create_date < created_before)
+
+        query = query.offset(skip).limit(limit)
         result = await self.db.execute(query)
-        return result.scalars().all()
+        return fields_result(result, fields)
+
+    async def get_by_id(
+        self, id: int, fields: Collection[str] | None = None
+    ) -> SampleTable | dict | None:
+        if fields is None:
+            return await self.db.get(SampleTable, id)
+
+        query = select_fields(SampleTable, fields).where(SampleTable.id == id)
+        result = await self.db.execute(query)
+        return next(iter(fields_result(result, fields)), None)
+
+    async def search(
+        self, q: str, limit: int = 20, after: tuple[float, int] | None = None
+    ) -> list[tuple[SampleTable, float]]:
+        """Full-text and fuzzy name search ordered by descending rank.
 
-    async def get_by_id(self, id: int) -> SampleTable | None:
-        return await self.db.get(SampleTable, id)
+        Pages are addressed by the (rank, id) of the last row of the previous page
+        so deep pages cost the same as the first one.
+        """
+        ts_query = func.websearch_to_tsquery(
+            literal_column(f"'{SEARCH_CONFIG}'::regconfig"), q
+        )
+
+        rank = cast(
+            func.ts_rank_cd(SampleTable.search_vector, ts_query)
+            + func.similarity(SampleTable.name, q),
+            Float,
+        )
+        rank_label = rank.label("rank")
+
+        query = select(SampleTable, rank_label).where(
+            or_(
+                SampleTable.search_vector.bool_op("@@")(ts_query),
+                SampleTable.name.bool_op("%")(q),
+                SampleTable.name.istartswith(q, autoescape=True),
+            )
+        )
+
+        if after is not None:
+            query = query.where(tuple_(rank, SampleTable.id) < tuple_(*after))
+
+        query = query.order_by(rank_label.desc(), SampleTable.id.desc()).limit(limit)
+
+        result = await self.db.execute(query)
+        return [(row[0], row[1]) for row in result.all()]
+
+    async def count(self) -> int:
+        query = select(func.count()).select_from(SampleTable)
+        return await self.db.scalar(query)
+
+    async def count_estimate(self) -> int | None:
+        """Row count estimate maintained by VACUUM and ANALYZE.
+
+        Sums up the estimates of the leaf partitions only, `ANALYZE` also sets an
+        estimate of the whole partitioned table on the parent since Postgres 14.
+        Returns None if the table has not been analyzed yet.
+        """
+        query = text(
+            "SELECT sum(c.reltuples)::bigint "
+            "FROM pg_partition_tree(to_regclass(:table)) t "
+            "JOIN pg_class c ON c.oid = t.relid "
+            "WHERE t.isleaf AND c.reltuples >= 0"
+        )
+        estimate = await self.db.scalar(query, {"table": SampleTable.__tablename__})
+        if estimate is None or estimate < 0:
+            return None
+        return estimate
+
+    async def count_per_day(self, since: datetime) -> list[tuple[date, int]]:
+        day = cast(SampleTable.create_date, Date).label("day")
+        query = (
+            select(day, func.count())
+            .where(SampleTable.create_date >= since)
+            .group_by(day)
+            .order_by(day)
+        )
+        result = await self.db.execute(query)
+        return [(row[0], row[1]) for row in result.all()]
+
+    async def get_changes(
+        self, after: int, limit: int = 500, margin: timedelta | None = None
+    ) -> list[SampleChangeTable]:
+        """The recorded changes following the change `after`, by id.
+
+        Ids are assigned before the commit, so a change with a lower id can become
+        visible after `after`. With a `margin`, the changes recorded up to `margin`
+        before `after` are returned as well.
+        """
+        condition = SampleChangeTable.id > after
+        if margin is not None:
+            after_date = (
+                select(SampleChangeTable.change_date)
+                .where(SampleChangeTable.id == after)
+                .scalar_subquery()
+            )
+            condition = or_(
+                condition,
+                and_(
+                    SampleChangeTable.id < after,
+                    SampleChangeTable.change_date >= after_date - margin,
+                ),
+            )
+
+        query = (
+            select(SampleChangeTable)
+            .where(condition)
+            .order_by(SampleChangeTable.id)
+            .limit(limit)
+        )
+        result = await self.db.scalars(query)
+        return result.all()
 
     async def create(self, item: SampleTable) -> SampleTable:
         self.db.add(item)
@@ -19,6 +158,27 @@ class SampleRepository(Repository):
         await self.db.refresh(item)
         return item
 
+    async def create_many(self, values: list[dict]) -> list[SampleTable]:
+        """Inserts all rows with a single multi-row INSERT ... RETURNING.
+
+        The rows are returned in the order of `values`. RETURNING doesn't keep
+        the order of the VALUES, so the ids are taken from the sequence first and
+        the returned rows are matched to `values` by id.
+        """
+        sequence = func.pg_get_serial_sequence(SampleTable.__tablename__, "id")
+        ids = await self.db.scalars(
+            select(func.nextval(sequence)).select_from(
+                func.generate_series(1, len(values))
+            )
+        )
+        values = [{**value, "id": id} for value, id in zip(values, ids.all())]
+
+        query = insert(SampleTable).values(values).returning(SampleTable)
+        result = await self.db.scalars(query)
+        items = {item.id: item for item in result.all()}
+        await self.db.commit()
+        return [items[value["id"]] for value in values]
+
     async def update(self, item: SampleTable) -> SampleTable:
         await self.db.commit()
         await self.db.refresh(item)
@@ -1,7 +1,77 @@
+from decimal import Decimal
+from typing import Any, AsyncIterable, AsyncIterator
+
+import orjson
 from fastapi import status
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
 
+def _orjson_default(obj: Any) -> Any:
+    # types orjson doesn't serialize natively, encoded like fastapi.jsonable_encoder
+    if isinstance(obj, BaseModel):
+        return obj.dict()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def orjson_dumps(content: Any) -> bytes:
+    return orjson.dumps(
+        content, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS
+    )
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson instead of the stdlib json module.
+
+    Produces the same compact output as `JSONResponse` for the types the API returns.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson_dumps(content)
+
+
+class EventSourceResponse(StreamingResponse):
+    """Server-sent events stream of models with an `id` field.
+
+    Each model is sent as an `event` with the model id as event id, so clients
+    resume with the `Last-Event-ID` header. None items are sent as comments, which
+    keep idle connections from being closed by proxies.
+    """
+
+    media_type = "text/event-stream"
+
+    def __init__(
+        self,
+        content: AsyncIterable[BaseModel | None],
+        event: str,
+        retry_ms: int = 3000,
+        **kwargs,
+    ) -> None:
+        headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        super().__init__(
+            self._encode(content, event, retry_ms), headers=headers, **kwargs
+        )
+
+    @staticmethod
+    async def _encode(
+        content: AsyncIterable[BaseModel | None], event: str, retry_ms: int
+    ) -> AsyncIterator[bytes]:
+        yield f"retry: {retry_ms}\n\n".encode()
+        async for item in content:
+            if item is None:
+                yield b": keepalive\n\n"
+                continue
+            yield (
+                f"id: {item.id}\nevent: {event}\ndata: ".encode()
+                + orjson_dumps(item)
+                + b"\n\n"
+            )
+
+
 class Detail(BaseModel):
     detail: str
 
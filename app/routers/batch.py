@@ -0,0 +1,37 @@
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+
+from app.batch import BatchExecutor, get_batch_executor
+from app.config import Settings, get_settings
+from app.content_negotiation import NegotiatedResponse, NegotiatedRoute
+from app.models.batch import BatchRequest, BatchResponse
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    route_class=NegotiatedRoute, default_response_class=NegotiatedResponse
+)
+
+
+@router.post(
+    "",
+    response_model=BatchResponse,
+    description="Runs up to `BATCH_MAX_REQUESTS` API requests in one round trip. "
+    "Each request is charged to the rate limit of its route.",
+)
+async def batch(
+    request: Request,
+    response: Response,
+    batch: BatchRequest,
+    settings: Settings = Depends(get_settings),
+    executor: BatchExecutor = Depends(get_batch_executor),
+):
+    if request.scope.get("batch"):
+        raise HTTPException(400, "Nested batches are not supported")
+    if len(batch.requests) > settings.BATCH_MAX_REQUESTS:
+        raise HTTPException(
+            400, f"At most {settings.BATCH_MAX_REQUESTS} requests per batch"
+        )
+
+    return BatchResponse(responses=await executor.execute(request, batch.requests))
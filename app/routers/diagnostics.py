@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import os
+from enum import Enum
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
+
+from app.config import Settings, get_settings
+from app.database.slow_queries import QueryMonitor
+from app.responses import ORJSONResponse
+from app.telemetry.profiling import ProfilerBusyException, profile_threads
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+WORKER_PID_HEADER = "X-Worker-Pid"
+
+
+class ProfileFormat(str, Enum):
+    collapsed = "collapsed"
+    speedscope = "speedscope"
+
+
+class StatementStats(BaseModel):
+    fingerprint: str
+    calls: int
+    errors: int
+    slow_calls: int
+    total_ms: float
+    mean_ms: float
+    max_ms: float
+
+    class Config:
+        orm_mode = True
+
+
+class QueryStats(BaseModel):
+    pid: int
+    statements: list[StatementStats]
+
+
+@router.get(
+    "/profile",
+    name="Profile Worker",
+    description=(
+        "Samples the stacks of all threads of the worker handling the request for "
+        "`seconds` and returns them as collapsed stacks or a speedscope profile. "
+        "With `pid`, other workers respond with 421 and close the connection, "
+        "retry until the target worker is reached."
+    ),
+    response_class=PlainTextResponse,
+    responses={
+        status.HTTP_200_OK: {
+            "content": {"text/plain": {}, "application/json": {}},
+        },
+        status.HTTP_409_CONFLICT: {"description": "A profile is already running"},
+        status.HTTP_421_MISDIRECTED_REQUEST: {"description": "Not the target worker"},
+    },
+)
+async def get_profile(
+    request: Request,
+    response: Response,
+    seconds: float = Query(10, gt=0, le=120),
+    interval_ms: float = Query(5, ge=1, le=1000),
+    format: ProfileFormat = Query(ProfileFormat.collapsed),
+    pid: int | None = Query(None, description="Only profile this worker process"),
+    settings: Settings = Depends(get_settings),
+):
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Profiling is disabled")
+
+    headers = {WORKER_PID_HEADER: str(os.getpid())}
+
+    if pid is not None and pid != os.getpid():
+        raise HTTPException(
+            status.HTTP_421_MISDIRECTED_REQUEST,
+            f"This is worker {os.getpid()}",
+            headers={**headers, "Connection": "close"},
+        )
+
+    try:
+        profiler = profile_threads(interval_ms / 1000)
+    except ProfilerBusyException:
+        raise HTTPException(status.HTTP_409_CONFLICT, "A profile is already running")
+
+    logger.info("Profiling worker %s for %s seconds", os.getpid(), seconds)
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profile = profiler.stop()
+
+    if format is ProfileFormat.speedscope:
+        return ORJSONResponse(
+            profile.speedscope(),
+            headers={
+                **headers,
+                "Content-Disposition": (
+                    f'attachment; filename="profile-{os.getpid()}.speedscope.json"'
+                ),
+            },
+        )
+
+    return PlainTextResponse(profile.collapsed(), headers=headers)
+
+
+@router.get(
+    "/queries",
+    name="Query Statistics",
+    description=(
+        "The database statements of the worker handling the request aggregated by "
+        "fingerprint, the SQL without literals and parameter values."
+    ),
+    response_model=QueryStats,
+)
+async def get_query_stats(
+    request: Request,
+    response: Response,
+    limit: int = Query(20, ge=1, le=1000),
+    order_by: Literal["total_ms", "mean_ms", "max_ms", "calls"] = Query("total_ms"),
+):
+    response.headers[WORKER_PID_HEADER] = str(os.getpid())
+    return QueryStats(
+        pid=os.getpid(),
+        statements=[
+            StatementStats.from_orm(stats)
+            for stats in QueryMonitor.instance().top(limit, order_by=order_by)
+        ],
+    )
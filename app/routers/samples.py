@@ -1,13 +1,27 @@
 import logging
+from datetime import datetime
 
-from fastapi import APIRouter, Depends, Request, Response
+from fastapi import APIRouter, Depends, Header, Query, Request, Response
 
-from app.models.sample import Sample, SampleCreate, SampleUpdate
+from app.content_negotiation import NegotiatedResponse, NegotiatedRoute
+from app.fieldsets import Fieldset, sparse_response
+from app.idempotency import Idempotency
+from app.models.sample import (
+    Sample,
+    SampleChange,
+    SampleCreate,
+    SampleSearchResult,
+    SampleStats,
+    SampleUpdate,
+)
+from app.responses import EventSourceResponse
 from app.services.sample_service import SampleService, get_sample_service
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(
+    route_class=NegotiatedRoute, default_response_class=NegotiatedResponse
+)
 
 
 @router.get(
@@ -17,9 +31,65 @@ router = APIRouter()
 async def get_samples(
     request: Request,
     response: Response,
+    created_after: datetime | None = Query(None),
+    created_before: datetime | None = Query(None),
+    fields: frozenset[str] | None = Depends(Fieldset(Sample)),
+    sample_service: SampleService = Depends(get_sample_service),
+):
+    samples = await sample_service.get(
+        created_after=created_after, created_before=created_before, fields=fields
+    )
+    if fields is None:
+        return samples
+    return sparse_response(Sample, samples, NegotiatedResponse)
+
+
+@router.get(
+    "/search",
+    response_model=SampleSearchResult,
+)
+async def search_samples(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = Query(None, description="`next_cursor` of the previous page"),
+    sample_service: SampleService = Depends(get_sample_service),
+):
+    return await sample_service.search(q, limit=limit, cursor=cursor)
+
+
+@router.get(
+    "/stats",
+    response_model=SampleStats,
+)
+async def get_sample_stats(
+    request: Request,
+    response: Response,
+    days: int = Query(30, ge=1, le=366, description="Number of days in `per_day`"),
+    sample_service: SampleService = Depends(get_sample_service),
+):
+    return await sample_service.stats(days)
+
+
+@router.get(
+    "/changes",
+    response_class=EventSourceResponse,
+    responses={
+        200: {
+            "description": "Server-sent `sample` events with a change as data",
+            "model": SampleChange,
+        }
+    },
+)
+async def get_sample_changes(
+    request: Request,
+    response: Response,
+    last_event_id: int | None = Header(None, description="Resume after this change"),
     sample_service: SampleService = Depends(get_sample_service),
 ):
-    return await sample_service.get()
+    changes = await sample_service.changes(last_event_id)
+    return EventSourceResponse(changes, event="sample")
 
 
 @router.get(
@@ -30,14 +100,19 @@ async def get_sample_by_id(
     request: Request,
     response: Response,
     id: int,
+    fields: frozenset[str] | None = Depends(Fieldset(Sample)),
     sample_service: SampleService = Depends(get_sample_service),
 ):
-    return await sample_service.get_by_id(id)
+    sample = await sample_service.get_by_id(id, fields=fields)
+    if fields is None:
+        return sample
+    return sparse_response(Sample, sample, NegotiatedResponse)
 
 
 @router.post(
     "/",
     response_model=Sample,
+    dependencies=[Depends(Idempotency())],
 )
 async def create_sample(
     request: Request,
@@ -51,6 +126,7 @@ async def create_sample(
 @router.patch(
     "/{id}",
     response_model=Sample,
+    dependencies=[Depends(Idempotency())],
 )
 async def update_sample(
     request: Request,
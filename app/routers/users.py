@@ -3,13 +3,16 @@ import logging
 from fastapi import APIRouter, Depends, Request, Response, status
 from pydantic import BaseModel
 
+from app.content_negotiation import NegotiatedResponse, NegotiatedRoute
 from app.limiter import RateLimit
 from app.packages.auth import User
 from app.packages.auth.dependencies import RoleValidator, get_required_user
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(
+    route_class=NegotiatedRoute, default_response_class=NegotiatedResponse
+)
 
 
 class Greeting(BaseModel):
@@ -1,27 +1,208 @@
+import asyncio
+import base64
+import binascii
+import json
+import logging
+import time
+from collections import deque
+from datetime import date, datetime, timedelta
+from functools import cache
+from typing import AsyncIterator
+
 from fastapi import Depends, HTTPException
 
+from app.cache import TTLCache
+from app.config import Settings, get_settings
+from app.database import session_factory
+from app.database.batching import WriteBatcher
+from app.database.notifications import NotificationHub, Subscription
 from app.database.tables import SampleTable
-from app.models.sample import SampleCreate, SampleUpdate
+from app.database.tables.sample_change_table import SAMPLE_CHANGE_CHANNEL
+from app.jobs.queue import JobQueue, get_job_queue
+from app.models.sample import (
+    DailyStatistic,
+    SampleChange,
+    SampleCreate,
+    SampleSearchResult,
+    SampleStats,
+    SampleUpdate,
+    Statistic,
+)
 from app.repositories import get_repository
 from app.repositories.sample_repository import SampleRepository
 
+logger = logging.getLogger(__name__)
+
+_stats_cache: TTLCache[tuple, object] = TTLCache(maxsize=512)
+
+_CHANGES_PAGE_SIZE = 500
+
 
 class SampleService:
-    def __init__(self, repo: SampleRepository):
+    def __init__(
+        self,
+        repo: SampleRepository,
+        settings: Settings,
+        write_batcher: WriteBatcher[dict, SampleTable] | None = None,
+        job_queue: JobQueue | None = None,
+        change_hub: NotificationHub | None = None,
+    ):
         self._repo = repo
+        self._settings = settings
+        self._write_batcher = write_batcher
+        self._job_queue = job_queue
+        self._change_hub = change_hub
 
-    async def get(self):
-        return await self._repo.get()
+    async def get(
+        self,
+        created_after: datetime | None = None,
+        created_before: datetime | None = None,
+        fields: frozenset[str] | None = None,
+    ):
+        return await self._repo.get(
+            created_after=created_after, created_before=created_before, fields=fields
+        )
 
-    async def get_by_id(self, id: int):
-        result = await self._repo.get_by_id(id)
+    async def get_by_id(self, id: int, fields: frozenset[str] | None = None):
+        result = await self._repo.get_by_id(id, fields=fields)
         if result is None:
             raise HTTPException(404, "Item not found")
         return result
 
+    async def search(self, q: str, limit: int = 20, cursor: str | None = None):
+        after = _decode_cursor(cursor) if cursor is not None else None
+
+        # fetch one extra row to find out if there is a next page
+        rows = await self._repo.search(q, limit=limit + 1, after=after)
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last_item, last_rank = rows[-1]
+            next_cursor = _encode_cursor(last_rank, last_item.id)
+
+        return SampleSearchResult(
+            items=[item for item, _ in rows],
+            next_cursor=next_cursor,
+        )
+
+    async def changes(
+        self, last_event_id: int | None = None
+    ) -> AsyncIterator[SampleChange | None]:
+        """Subscribes to the sample changes, resuming after `last_event_id`.
+
+        The returned iterator yields None when there was no change for a heartbeat
+        interval, and ends after `SAMPLE_CHANGES_MAX_DURATION_S` or when the
+        subscriber fell behind, after which clients resume from the last change.
+
+        Changes are streamed in commit order, which differs from the id order of
+        concurrent writers. A resume replays the changes recorded up to
+        `SAMPLE_CHANGES_VISIBILITY_MARGIN_S` before `last_event_id` again, so
+        clients receive every change at least once and dedupe them by id.
+        """
+        if self._change_hub is None:
+            raise HTTPException(503, "Change feed unavailable")
+
+        # subscribe before the replay so no change is missed in between
+        subscription = await self._change_hub.subscribe()
+        return self._changes(subscription, last_event_id)
+
+    async def _changes(
+        self, subscription: Subscription, last_event_id: int | None
+    ) -> AsyncIterator[SampleChange | None]:
+        heartbeat = self._settings.SAMPLE_CHANGES_HEARTBEAT_S
+        deadline = time.monotonic() + self._settings.SAMPLE_CHANGES_MAX_DURATION_S
+        margin = timedelta(seconds=self._settings.SAMPLE_CHANGES_VISIBILITY_MARGIN_S)
+
+        async with subscription:
+            # the recently recorded replayed changes, which can be notified too
+            replayed: deque[tuple[datetime, int]] = deque()
+            if last_event_id is not None:
+                last_id = last_event_id
+                page_margin: timedelta | None = margin
+                while True:
+                    changes = await self._repo.get_changes(
+                        last_id, limit=_CHANGES_PAGE_SIZE, margin=page_margin
+                    )
+                    for change in changes:
+                        yield SampleChange.from_orm(change)
+                        last_id = max(last_id, change.id)
+                        replayed.append((change.change_date, change.id))
+                        while replayed[0][0] < change.change_date - margin:
+                            replayed.popleft()
+                    if len(changes) < _CHANGES_PAGE_SIZE:
+                        break
+                    page_margin = None
+                # the stream outlives the replay, don't hold a pool connection
+                await self._repo.release()
+
+            # notified while they were replayed
+            duplicates = {id for _, id in replayed}
+
+            while (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    payload = await subscription.get(min(heartbeat, remaining))
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+
+                if payload is None:
+                    return
+
+                change = SampleChange.parse_obj(payload)
+                if change.id in duplicates:
+                    duplicates.discard(change.id)
+                    continue
+                yield change
+
+    async def stats(self, days: int = 30):
+        ttl = self._settings.SAMPLE_STATS_CACHE_TTL_SECONDS
+
+        total = await _stats_cache.get_or_set(("total",), self._total, ttl)
+        per_day = await _stats_cache.get_or_set(
+            ("per_day", days), lambda: self._per_day(days), ttl
+        )
+
+        return SampleStats(total=total, per_day=per_day)
+
+    async def _total(self) -> Statistic:
+        # COUNT(*) scans the whole table, only use it while the table is small
+        estimate = await self._repo.count_estimate()
+        threshold = self._settings.SAMPLE_STATS_EXACT_COUNT_THRESHOLD
+
+        if estimate is None or estimate < threshold:
+            return Statistic(value=await self._repo.count(), exact=True)
+
+        return Statistic(value=estimate, exact=False)
+
+    async def _per_day(self, days: int) -> list[DailyStatistic]:
+        since = datetime.combine(
+            date.today() - timedelta(days=days - 1), datetime.min.time()
+        )
+        rows = await self._repo.count_per_day(since)
+        return [DailyStatistic(day=day, value=count, exact=True) for day, count in rows]
+
     async def create(self, create: SampleCreate):
-        item = SampleTable(**create.dict())
-        return await self._repo.create(item)
+        if self._write_batcher is not None:
+            item = await self._write_batcher.submit(create.dict())
+        else:
+            item = await self._repo.create(SampleTable(**create.dict()))
+
+        await self._enqueue_created(item)
+        return item
+
+    async def _enqueue_created(self, item: SampleTable):
+        if self._job_queue is None:
+            return
+        try:
+            await self._job_queue.enqueue(
+                "samples.created",
+                {"id": item.id},
+                dedupe_key=f"samples.created:{item.id}",
+            )
+        except Exception:
+            # the sample is stored, don't fail the request for its follow-up work
+            logger.exception("Failed to enqueue the job for sample %d", item.id)
 
     async def update(self, id: int, update: SampleUpdate):
         item = await self._repo.get_by_id(id)
@@ -38,7 +219,68 @@ class SampleService:
         await self._repo.delete(item)
 
 
+def _encode_cursor(rank: float, id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([rank, id]).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[float, int]:
+    try:
+        rank, id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(id, int) or not isinstance(rank, (int, float)):
+            raise ValueError()
+        return float(rank), id
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise HTTPException(400, "Invalid cursor")
+
+
+@cache
+def _sample_write_batcher(
+    connection_string: str,
+    max_batch_size: int,
+    max_delay_ms: float,
+    max_concurrent_flushes: int,
+) -> WriteBatcher[dict, SampleTable]:
+    async def flush(values: list[dict]) -> list[SampleTable]:
+        # batches outlive the request that started them, so use their own session
+        async with session_factory(connection_string)() as session:
+            return await SampleRepository(session).create_many(values)
+
+    return WriteBatcher(
+        flush,
+        max_batch_size=max_batch_size,
+        max_delay=max_delay_ms / 1000,
+        max_concurrent_flushes=max_concurrent_flushes,
+    )
+
+
+def get_sample_write_batcher(settings: Settings = Depends(get_settings)):
+    if not settings.SAMPLE_WRITE_BATCHING_ENABLED:
+        return None
+
+    return _sample_write_batcher(
+        settings.POSTGRES_CONNECTION_STRING,
+        settings.WRITE_BATCH_MAX_SIZE,
+        settings.WRITE_BATCH_MAX_DELAY_MS,
+        settings.WRITE_BATCH_MAX_CONCURRENT_FLUSHES,
+    )
+
+
+@cache
+def _sample_change_hub(connection_string: str, buffer_size: int) -> NotificationHub:
+    return NotificationHub(connection_string, SAMPLE_CHANGE_CHANNEL, buffer_size)
+
+
+def get_sample_change_hub(settings: Settings = Depends(get_settings)):
+    return _sample_change_hub(
+        settings.POSTGRES_CONNECTION_STRING, settings.SAMPLE_CHANGES_BUFFER_SIZE
+    )
+
+
 def get_sample_service(
     sample_repo: SampleRepository = Depends(get_repository(SampleRepository)),
+    settings: Settings = Depends(get_settings),
+    write_batcher: WriteBatcher | None = Depends(get_sample_write_batcher),
+    job_queue: JobQueue | None = Depends(get_job_queue),
+    change_hub: NotificationHub = Depends(get_sample_change_hub),
 ):
-    return SampleService(sample_repo)
+    return SampleService(sample_repo, settings, write_batcher, job_queue, change_hub)
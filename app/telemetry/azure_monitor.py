@@ -1,16 +1,21 @@
-from azure.monitor.opentelemetry.exporter import (
-    AzureMonitorLogExporter,
-    AzureMonitorMetricExporter,
-    AzureMonitorTraceExporter,
-)
 from opentelemetry import metrics, trace
 from opentelemetry.sdk._logs import LoggerProvider, LoggingHandler, set_logger_provider
-from opentelemetry.sdk._logs.export import BatchLogRecordProcessor
 from opentelemetry.sdk.metrics._internal import MeterProvider
-from opentelemetry.sdk.metrics._internal.export import PeriodicExportingMetricReader
+from opentelemetry.sdk.metrics._internal.export import (
+    MetricReader,
+    PeriodicExportingMetricReader,
+)
 from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
-from opentelemetry.sdk.trace.sampling import TraceIdRatioBased
+from opentelemetry.sdk.trace.sampling import ALWAYS_ON, Sampler
+
+from app.telemetry.export import (
+    BoundedBatchLogRecordProcessor,
+    ExportOptions,
+    ObservableBatchSpanProcessor,
+    TelemetryExporters,
+)
+from app.telemetry.logging import add_log_handler
+from app.telemetry.sampling import TailSamplingSpanProcessor
 
 
 class AzureMonitor:
@@ -21,37 +26,64 @@ class AzureMonitor:
     )
 
     @classmethod
-    def init(cls, connection_string: str, tracing_sampler_rate=1.0):
+    def init(
+        cls,
+        exporters: TelemetryExporters,
+        sampler: Sampler = ALWAYS_ON,
+        tail_sampling_latency_threshold: float | None = None,
+        tail_sampling_max_traces: int = 1000,
+        metric_readers: list[MetricReader] | None = None,
+        export_options: ExportOptions = ExportOptions(),
+    ):
+        """Sets up the telemetry providers exporting to `exporters`.
+
+        The exporters are usually the Azure Monitor exporters, see
+        `app.telemetry.export.create_exporters` for the other targets.
+        """
         # trace
-        trace_exporter = AzureMonitorTraceExporter.from_connection_string(
-            connection_string
+        span_processor = ObservableBatchSpanProcessor(
+            exporters.span_exporter,
+            max_queue_size=export_options.span_queue_max_size,
+            max_export_batch_size=export_options.span_batch_max_size,
+            schedule_delay_millis=export_options.span_export_delay_ms,
+            export_timeout_millis=export_options.export_timeout_ms,
         )
+        if tail_sampling_latency_threshold is not None:
+            span_processor = TailSamplingSpanProcessor(
+                span_processor,
+                latency_threshold=tail_sampling_latency_threshold,
+                max_traces=tail_sampling_max_traces,
+            )
 
-        trace_provider = TracerProvider(sampler=TraceIdRatioBased(tracing_sampler_rate))
-        trace_provider.add_span_processor(BatchSpanProcessor(trace_exporter))
+        trace_provider = TracerProvider(sampler=sampler)
+        trace_provider.add_span_processor(span_processor)
 
         trace.set_tracer_provider(trace_provider)
 
         # metric
-        metric_exporter = AzureMonitorMetricExporter.from_connection_string(
-            connection_string
-        )
-
         meter_provider = MeterProvider(
             metric_readers=[
                 PeriodicExportingMetricReader(
-                    metric_exporter, export_interval_millis=5000
-                )
+                    exporters.metric_exporter,
+                    export_interval_millis=export_options.metric_export_interval_ms,
+                    export_timeout_millis=export_options.export_timeout_ms,
+                ),
+                *(metric_readers or []),
             ]
         )
 
         metrics.set_meter_provider(meter_provider)
 
         # log
-        log_exporter = AzureMonitorLogExporter.from_connection_string(connection_string)
-
         cls._log_emitter_provider.add_log_record_processor(
-            BatchLogRecordProcessor(log_exporter)
+            BoundedBatchLogRecordProcessor(
+                exporters.log_exporter,
+                max_queue_size=export_options.log_queue_max_size,
+                max_export_batch_size=export_options.log_batch_max_size,
+                schedule_delay_millis=export_options.log_export_delay_ms,
+                export_timeout_millis=export_options.export_timeout_ms,
+            )
         )
 
         set_logger_provider(cls._log_emitter_provider)
+        add_log_handler(cls.azure_monitor_log_handler)
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import random
+import sys
+import threading
+import time
+import traceback
+
+from app.config import Settings
+from app.telemetry.metrics import event_loop_blocked, event_loop_lag
+
+logger = logging.getLogger(__name__)
+
+
+class EventLoopMonitor:
+    def __init__(
+        self,
+        interval: float = 0.1,
+        slow_callback_threshold: float = 0.1,
+        stack_sample_rate: float = 1.0,
+        stack_report_interval: float = 10.0,
+    ) -> None:
+        """Measures the lag of the event loop and reports blocking callbacks.
+
+        A callback scheduled every `interval` seconds records how late it runs as the
+        `app.event_loop.lag` histogram. A watchdog thread counts the times the loop
+        did not run it for longer than `slow_callback_threshold` in the
+        `app.event_loop.blocked` counter and logs the stack of the blocking code for
+        a sample of them, at most once every `stack_report_interval` seconds.
+
+        Usage:
+            # in the coroutine running the server
+            monitor = EventLoopMonitor()
+            monitor.start()
+
+        Args:
+            interval (float, optional): The seconds between two lag measurements.
+                Defaults to 0.1.
+            slow_callback_threshold (float, optional): The seconds the loop may be
+                blocked before it is reported. Defaults to 0.1.
+            stack_sample_rate (float, optional): The ratio of blocks whose stack is
+                logged. Defaults to 1.0.
+            stack_report_interval (float, optional): The minimum seconds between two
+                logged stacks. Defaults to 10.0.
+        """
+        self.interval = interval
+        self.slow_callback_threshold = slow_callback_threshold
+        self.stack_sample_rate = stack_sample_rate
+        self.stack_report_interval = stack_report_interval
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._handle: asyncio.TimerHandle | None = None
+        self._expected = 0.0
+        self._stopped = threading.Event()
+        self._watchdog: threading.Thread | None = None
+        self._reported_expected = 0.0
+        self._reported_at = -stack_report_interval
+
+    def start(self):
+        """Starts monitoring the running event loop."""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._expected = time.monotonic() + self.interval
+        self._handle = self._loop.call_later(self.interval, self._tick)
+
+        self._stopped.clear()
+        self._watchdog = threading.Thread(
+            target=self._watch, name="EventLoopWatchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    def stop(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+        self._stopped.set()
+        if self._watchdog is not None:
+            self._watchdog.join()
+            self._watchdog = None
+
+    def _tick(self):
+        now = time.monotonic()
+        event_loop_lag.record(max(now - self._expected, 0) * 1000)
+
+        self._expected = now + self.interval
+        self._handle = self._loop.call_later(self.interval, self._tick)
+
+    def _watch(self):
+        while not self._stopped.wait(self.slow_callback_threshold / 2):
+            expected = self._expected
+            blocked = time.monotonic() - expected
+            if blocked < self.slow_callback_threshold:
+                continue
+
+            # report every block once
+            if expected == self._reported_expected:
+                continue
+            self._reported_expected = expected
+
+            event_loop_blocked.add(1)
+            self._report_stack(blocked)
+
+    def _report_stack(self, blocked: float):
+        now = time.monotonic()
+        if now - self._reported_at < self.stack_report_interval:
+            return
+        if random.random() >= self.stack_sample_rate:
+            return
+
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+
+        self._reported_at = now
+        logger.warning(
+            "The event loop is blocked for %d ms by:\n%s",
+            blocked * 1000,
+            "".join(traceback.format_stack(frame)),
+        )
+
+
+def create_event_loop_monitor(settings: Settings) -> EventLoopMonitor | None:
+    if not settings.EVENT_LOOP_MONITOR_ENABLED:
+        return None
+
+    return EventLoopMonitor(
+        interval=settings.EVENT_LOOP_LAG_INTERVAL_MS / 1000,
+        slow_callback_threshold=settings.EVENT_LOOP_SLOW_CALLBACK_THRESHOLD_MS / 1000,
+        stack_sample_rate=settings.EVENT_LOOP_SLOW_CALLBACK_SAMPLE_RATE,
+        stack_report_interval=settings.EVENT_LOOP_SLOW_CALLBACK_REPORT_INTERVAL_S,
+    )
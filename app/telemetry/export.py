@@ -0,0 +1,320 @@
+"""Exporters and batch processors of the telemetry pipeline.
+
+The exporters of the configured target are wrapped to record their latency, the
+batch processors count the items they drop when their queue is full and report
+their queue depth.
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Sequence
+
+from opentelemetry.metrics import CallbackOptions, Observation
+from opentelemetry.sdk._logs import LogData
+from opentelemetry.sdk._logs.export import (
+    BatchLogRecordProcessor,
+    LogExporter,
+    LogExportResult,
+)
+from opentelemetry.sdk.metrics.export import (
+    MetricExporter,
+    MetricExportResult,
+    MetricsData,
+)
+from opentelemetry.sdk.trace import ReadableSpan
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    SpanExporter,
+    SpanExportResult,
+)
+
+from app.config import Settings
+from app.telemetry.metrics import meter, telemetry_dropped, telemetry_export_duration
+
+
+@dataclass
+class TelemetryExporters:
+    span_exporter: SpanExporter
+    log_exporter: LogExporter
+    metric_exporter: MetricExporter
+
+
+@dataclass
+class ExportOptions:
+    span_queue_max_size: int = 2048
+    span_batch_max_size: int = 512
+    span_export_delay_ms: float = 5000
+    log_queue_max_size: int = 2048
+    log_batch_max_size: int = 512
+    log_export_delay_ms: float = 5000
+    metric_export_interval_ms: float = 5000
+    export_timeout_ms: float = 30_000
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "ExportOptions":
+        return cls(
+            span_queue_max_size=settings.TELEMETRY_SPAN_QUEUE_MAX_SIZE,
+            span_batch_max_size=settings.TELEMETRY_SPAN_BATCH_MAX_SIZE,
+            span_export_delay_ms=settings.TELEMETRY_SPAN_EXPORT_DELAY_MS,
+            log_queue_max_size=settings.TELEMETRY_LOG_QUEUE_MAX_SIZE,
+            log_batch_max_size=settings.TELEMETRY_LOG_BATCH_MAX_SIZE,
+            log_export_delay_ms=settings.TELEMETRY_LOG_EXPORT_DELAY_MS,
+            metric_export_interval_ms=settings.TELEMETRY_METRIC_EXPORT_INTERVAL_MS,
+            export_timeout_ms=settings.TELEMETRY_EXPORT_TIMEOUT_MS,
+        )
+
+
+def create_exporters(settings: Settings) -> TelemetryExporters | None:
+    """Returns the exporters of the configured target, None disables the export.
+
+    The exporter packages are only imported for the configured target.
+    """
+    if settings.TELEMETRY_EXPORTER == "azure_monitor":
+        connection_string = settings.APPLICATIONINSIGHTS_CONNECTION_STRING
+        if connection_string is None:
+            return None
+
+        from azure.monitor.opentelemetry.exporter import (
+            AzureMonitorLogExporter,
+            AzureMonitorMetricExporter,
+            AzureMonitorTraceExporter,
+        )
+
+        exporters = TelemetryExporters(
+            AzureMonitorTraceExporter.from_connection_string(connection_string),
+            AzureMonitorLogExporter.from_connection_string(connection_string),
+            AzureMonitorMetricExporter.from_connection_string(connection_string),
+        )
+    elif settings.TELEMETRY_EXPORTER == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http._log_exporter import (
+                OTLPLogExporter,
+            )
+            from opentelemetry.exporter.otlp.proto.http.metric_exporter import (
+                OTLPMetricExporter,
+            )
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+                OTLPSpanExporter,
+            )
+        except ModuleNotFoundError as e:
+            raise ModuleNotFoundError(
+                "The otlp telemetry exporter requires the otlp extra"
+            ) from e
+
+        # configured by the OTEL_EXPORTER_OTLP_* environment variables
+        exporters = TelemetryExporters(
+            OTLPSpanExporter(), OTLPLogExporter(), OTLPMetricExporter()
+        )
+    else:
+        directory = settings.TELEMETRY_EXPORT_DIR
+        exporters = TelemetryExporters(
+            NdjsonSpanExporter(directory),
+            NdjsonLogExporter(directory),
+            NdjsonMetricExporter(directory),
+        )
+
+    return TelemetryExporters(
+        InstrumentedSpanExporter(exporters.span_exporter),
+        InstrumentedLogExporter(exporters.log_exporter),
+        InstrumentedMetricExporter(exporters.metric_exporter),
+    )
+
+
+class _NdjsonFile:
+    def __init__(self, directory: str, signal: str) -> None:
+        self.directory = Path(directory)
+        self.signal = signal
+        self._lock = threading.Lock()
+
+    def write(self, lines: list[str]):
+        # one file per process, workers never write to the same file
+        path = self.directory / f"{self.signal}-{os.getpid()}.ndjson"
+        content = "".join(f"{line}\n" for line in lines)
+
+        with self._lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with path.open("a", encoding="utf-8") as file:
+                file.write(content)
+
+
+class NdjsonSpanExporter(SpanExporter):
+    def __init__(self, directory: str) -> None:
+        """Appends the spans to `<directory>/spans-<pid>.ndjson`."""
+        self._file = _NdjsonFile(directory, "spans")
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        try:
+            self._file.write([span.to_json(indent=None) for span in spans])
+        except OSError:
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+
+class NdjsonLogExporter(LogExporter):
+    def __init__(self, directory: str) -> None:
+        """Appends the log records to `<directory>/logs-<pid>.ndjson`."""
+        self._file = _NdjsonFile(directory, "logs")
+
+    def export(self, batch: Sequence[LogData]) -> LogExportResult:
+        try:
+            self._file.write([data.log_record.to_json(indent=None) for data in batch])
+        except OSError:
+            return LogExportResult.FAILURE
+        return LogExportResult.SUCCESS
+
+    def shutdown(self):
+        pass
+
+
+class NdjsonMetricExporter(MetricExporter):
+    def __init__(self, directory: str) -> None:
+        """Appends the metric collections to `<directory>/metrics-<pid>.ndjson`."""
+        super().__init__()
+        self._file = _NdjsonFile(directory, "metrics")
+
+    def export(
+        self,
+        metrics_data: MetricsData,
+        timeout_millis: float = 10_000,
+        **kwargs,
+    ) -> MetricExportResult:
+        try:
+            self._file.write([metrics_data.to_json(indent=None)])
+        except OSError:
+            return MetricExportResult.FAILURE
+        return MetricExportResult.SUCCESS
+
+    def force_flush(self, timeout_millis: float = 10_000) -> bool:
+        return True
+
+    def shutdown(self, timeout_millis: float = 30_000, **kwargs) -> None:
+        pass
+
+
+def _record_export(signal: str, start: float, success: bool):
+    telemetry_export_duration.record(
+        (time.perf_counter() - start) * 1000,
+        {"signal": signal, "success": success},
+    )
+
+
+class InstrumentedSpanExporter(SpanExporter):
+    def __init__(self, exporter: SpanExporter) -> None:
+        self.exporter = exporter
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        start = time.perf_counter()
+        result = SpanExportResult.FAILURE
+        try:
+            result = self.exporter.export(spans)
+            return result
+        finally:
+            _record_export("spans", start, result is SpanExportResult.SUCCESS)
+
+    def shutdown(self) -> None:
+        self.exporter.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.exporter.force_flush(timeout_millis)
+
+
+class InstrumentedLogExporter(LogExporter):
+    def __init__(self, exporter: LogExporter) -> None:
+        self.exporter = exporter
+
+    def export(self, batch: Sequence[LogData]) -> LogExportResult:
+        start = time.perf_counter()
+        result = LogExportResult.FAILURE
+        try:
+            result = self.exporter.export(batch)
+            return result
+        finally:
+            _record_export("logs", start, result is LogExportResult.SUCCESS)
+
+    def shutdown(self):
+        self.exporter.shutdown()
+
+
+class InstrumentedMetricExporter(MetricExporter):
+    def __init__(self, exporter: MetricExporter) -> None:
+        super().__init__(
+            preferred_temporality=exporter._preferred_temporality,
+            preferred_aggregation=exporter._preferred_aggregation,
+        )
+        self.exporter = exporter
+
+    def export(
+        self,
+        metrics_data: MetricsData,
+        timeout_millis: float = 10_000,
+        **kwargs,
+    ) -> MetricExportResult:
+        start = time.perf_counter()
+        result = MetricExportResult.FAILURE
+        try:
+            result = self.exporter.export(metrics_data, timeout_millis, **kwargs)
+            return result
+        finally:
+            _record_export("metrics", start, result is MetricExportResult.SUCCESS)
+
+    def force_flush(self, timeout_millis: float = 10_000) -> bool:
+        return self.exporter.force_flush(timeout_millis)
+
+    def shutdown(self, timeout_millis: float = 30_000, **kwargs) -> None:
+        self.exporter.shutdown(timeout_millis, **kwargs)
+
+
+_queue_sizes: dict[str, Callable[[], int]] = {}
+
+
+def _observe_queue_sizes(options: CallbackOptions) -> list[Observation]:
+    return [
+        Observation(queue_size(), {"signal": signal})
+        for signal, queue_size in _queue_sizes.items()
+    ]
+
+
+meter.create_observable_gauge(
+    "app.telemetry.queue.size",
+    callbacks=[_observe_queue_sizes],
+    description="Items waiting in the telemetry export queue by signal",
+)
+
+
+class ObservableBatchSpanProcessor(BatchSpanProcessor):
+    """Counts the spans the full queue drops and reports its depth."""
+
+    def __init__(self, span_exporter: SpanExporter, **kwargs) -> None:
+        super().__init__(span_exporter, **kwargs)
+        _queue_sizes["spans"] = lambda: len(self.queue)
+
+    def on_end(self, span: ReadableSpan) -> None:
+        # the queue drops its oldest span when a span is added to the full queue
+        if (
+            not self.done
+            and span.context.trace_flags.sampled
+            and len(self.queue) >= self.max_queue_size
+        ):
+            telemetry_dropped.add(1, {"signal": "spans"})
+        super().on_end(span)
+
+
+class BoundedBatchLogRecordProcessor(BatchLogRecordProcessor):
+    def __init__(
+        self, exporter: LogExporter, max_queue_size: int = 2048, **kwargs
+    ) -> None:
+        """Drops and counts new log records when `max_queue_size` are queued.
+
+        The queue of `BatchLogRecordProcessor` is unbounded.
+        """
+        super().__init__(exporter, **kwargs)
+        self.max_queue_size = max_queue_size
+        _queue_sizes["logs"] = lambda: len(self._queue)
+
+    def emit(self, log_data: LogData) -> None:
+        if not self._shutdown and len(self._queue) >= self.max_queue_size:
+            telemetry_dropped.add(1, {"signal": "logs"})
+            return
+        super().emit(log_data)
@@ -1,12 +1,62 @@
+import atexit
 import logging
+import os
+import queue
 import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Literal
 
-from app.telemetry.azure_monitor import AzureMonitor
+import orjson
+from opentelemetry.context import attach, detach
+from opentelemetry.trace import (
+    INVALID_SPAN_CONTEXT,
+    NonRecordingSpan,
+    get_current_span,
+    set_span_in_context,
+)
+
+from app.telemetry.metrics import log_records_dropped
 
 logger = logging.getLogger(__name__)
 
+LOG_FORMAT = "[%(levelname)s] [%(asctime)s] [%(process)d] [%(name)s] %(message)s"
+
+# records of this logger are written as JSON including the access log fields
+ACCESS_LOGGER_NAME = "app.access"
+ACCESS_LOG_FIELDS = (
+    "method",
+    "path",
+    "status_code",
+    "duration_ms",
+    "client_addr",
+    "trace_id",
+    "span_id",
+)
+
+# attribute carrying the span context of a queued record to the listener thread
+_SPAN_CONTEXT_ATTR = "_otel_span_context"
+
+_listener: "LogQueueListener | None" = None
+_listener_lock = threading.Lock()
 
-def init_logging(default_level=logging.INFO, log_config: dict[str, str] = None):
+
+def init_logging(
+    default_level=logging.INFO,
+    log_config: dict[str, str] = None,
+    queue_max_size: int = 10_000,
+    queue_full_policy: Literal["drop", "block"] = "drop",
+):
+    """Configures the root and uvicorn loggers.
+
+    Records are put on a bounded queue and written to stdout/stderr, and the
+    handlers added with `add_log_handler`, by a `QueueListener` thread, so
+    logging doesn't do formatting and I/O on the event loop. If the queue is full,
+    records are dropped and counted, or the logging call blocks until there is
+    room, depending on `queue_full_policy`.
+    """
     # messages < WARNING go to stdout
     stdout_handler = logging.StreamHandler(sys.stdout)
     stdout_handler.addFilter(MaxLevelFilter(logging.WARNING))
@@ -15,67 +65,205 @@ def init_logging(default_level=logging.INFO, log_config: dict[str, str] = None):
     stderr_handler = logging.StreamHandler(sys.stderr)
     stderr_handler.setLevel(logging.WARNING)
 
-    handlers: list[logging.Handler] = [
-        stdout_handler,
-        stderr_handler,
-        AzureMonitor.azure_monitor_log_handler,
-    ]
-
-    logging.basicConfig(
-        force=True,
-        level=default_level,
-        handlers=handlers,
-        format="[%(levelname)s] [%(asctime)s] [%(process)d] [%(name)s] %(message)s",
+    formatter = LogFormatter(LOG_FORMAT)
+    stdout_handler.setFormatter(formatter)
+    stderr_handler.setFormatter(formatter)
+
+    handlers: list[logging.Handler] = [stdout_handler, stderr_handler]
+
+    queue_handler = BoundedQueueHandler(
+        queue.Queue(queue_max_size), block=queue_full_policy == "block"
     )
+    _start_listener(LogQueueListener(queue_handler, *handlers))
+
+    _set_handlers([queue_handler], level=default_level)
 
     if log_config is not None:
         for key, value in log_config.items():
             logging.getLogger(key).setLevel(value)
 
+
+def add_log_handler(handler: logging.Handler):
+    """Adds a handler to the loggers configured by `init_logging`.
+
+    Used to export the logs once telemetry is set up in the worker process.
+    """
+    with _listener_lock:
+        if _listener is not None:
+            _listener.handlers = (*_listener.handlers, handler)
+            return
+
+    for name in [None, "uvicorn", "uvicorn.access"]:
+        logger_ = logging.getLogger(name)
+        if handler not in logger_.handlers:
+            logger_.addHandler(handler)
+
+
+def attach_uvicorn_error_logger():
+    """Routes the `uvicorn.error` records through the log queue again.
+
+    Under gunicorn, `UvicornWorker` replaces the handlers of the logger with the
+    gunicorn error log handlers and stops its propagation, so the records would
+    be written synchronously on the event loop.
+    """
+    with _listener_lock:
+        if _listener is not None:
+            logging.getLogger("uvicorn.error").handlers = [_listener.queue_handler]
+
+
+def shutdown_logging():
+    """Writes the queued records and logs synchronously from now on."""
+    global _listener
+
+    with _listener_lock:
+        listener, _listener = _listener, None
+
+    if listener is not None:
+        _set_handlers(list(listener.handlers))
+        listener.stop()
+
+
+def _set_handlers(handlers: list[logging.Handler], level: int | None = None):
+    logging.basicConfig(force=True, level=level, handlers=handlers)
+
     # since uvicorn logging is configured before this function is called,
     # we need to overwrite the handlers.
     logging.getLogger("uvicorn").handlers = handlers
     logging.getLogger("uvicorn.access").handlers = handlers
 
+    # only has handlers of its own once attached by `attach_uvicorn_error_logger`
+    error_logger = logging.getLogger("uvicorn.error")
+    if error_logger.handlers:
+        error_logger.handlers = handlers
 
-class MaxLevelFilter(logging.Filter):
-    """Filters out messages with level < LEVEL"""
 
-    def __init__(self, level: int):
-        self.level = level
+def _start_listener(listener: "LogQueueListener"):
+    global _listener
+
+    shutdown_logging()
+
+    with _listener_lock:
+        _listener = listener
+        listener.start()
 
-    def filter(self, record):
-        return record.levelno < self.level
 
+def _restart_listener_after_fork():
+    # the listener thread doesn't survive the fork of a worker process and the
+    # queue may have been copied in a locked state
+    global _listener, _listener_lock
+
+    _listener_lock = threading.Lock()
+    if _listener is None:
+        return
+
+    queue_handler = _listener.queue_handler
+    queue_handler.queue = queue.Queue(queue_handler.queue.maxsize)
+    queue_handler.dropped_records = 0
+
+    _listener = LogQueueListener(queue_handler, *_listener.handlers)
+    _listener.start()
+
+
+os.register_at_fork(after_in_child=_restart_listener_after_fork)
+atexit.register(shutdown_logging)
+
+
+class BoundedQueueHandler(QueueHandler):
+    def __init__(self, queue: queue.Queue, block: bool = False):
+        """Queues records for a `LogQueueListener` in the same process.
 
-class UvicornLoggingFilter(logging.Filter):
-    def __init__(self, path: str, method: str | None = None):
-        """Filter out uvicorn log records for a specific endpoint.
-        Usage:
-            uvicorn_logger = logging.getLogger("uvicorn.access")
-            uvicorn_logger.addFilter(UvicornLoggingFilter(path="/health", method="GET"))
         Args:
-            path (str): The request path to filter.
-            method (str, optional): The request method to filter. Defaults to None.
+            queue (queue.Queue): The bounded queue.
+            block (bool, optional): Wait for room in a full queue instead of
+                dropping the record. Defaults to False.
         """
-        super().__init__()
-        self._path = path
-        self._method = method
+        super().__init__(queue)
+        self.block = block
+        self.dropped_records = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # the listener runs in the same process, so the record doesn't have to be
+        # formatted or made picklable here, only the span context must be kept
+        setattr(record, _SPAN_CONTEXT_ATTR, get_current_span().get_span_context())
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if self.block:
+            self.queue.put(record)
+            return
+
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped_records += 1
+            log_records_dropped.add(1)
+
+
+class LogQueueListener(QueueListener):
+    # minimum seconds between two warnings about dropped records
+    DROPPED_RECORDS_REPORT_INTERVAL = 10
+
+    def __init__(self, queue_handler: BoundedQueueHandler, *handlers: logging.Handler):
+        super().__init__(queue_handler.queue, *handlers, respect_handler_level=True)
+        self.queue_handler = queue_handler
+
+        self._reported_dropped_records = 0
+        self._reported_at = 0.0
+
+    def handle(self, record: logging.LogRecord):
+        span_context = record.__dict__.pop(_SPAN_CONTEXT_ATTR, INVALID_SPAN_CONTEXT)
 
-    def filter(self, record: logging.LogRecord) -> bool:
-        if record.args is None or len(record.args) < 3:
-            return True
+        # handlers like the Azure Monitor handler read the current span
+        token = attach(set_span_in_context(NonRecordingSpan(span_context)))
+        try:
+            super().handle(record)
+        finally:
+            detach(token)
 
-        # Record args are (remote_addr, method, path_with_query, http_version, status_code)
-        method: str = record.args[1]  # type: ignore
-        path_with_query: str = record.args[2]  # type: ignore
+        self._report_dropped_records()
 
-        if self._method is not None and method != self._method:
-            return True
+    def _report_dropped_records(self):
+        dropped = self.queue_handler.dropped_records
+        if dropped == self._reported_dropped_records:
+            return
 
-        path = path_with_query.split("?")[0].rstrip("/")
+        now = time.monotonic()
+        if now - self._reported_at < self.DROPPED_RECORDS_REPORT_INTERVAL:
+            return
 
-        if path == self._path:
-            return False
+        logger.warning(
+            "Dropped %d log records because the log queue was full",
+            dropped - self._reported_dropped_records,
+        )
+        self._reported_dropped_records = dropped
+        self._reported_at = now
 
-        return True
+
+class LogFormatter(logging.Formatter):
+    """Formats access log records as JSON and all other records as text."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        if record.name != ACCESS_LOGGER_NAME:
+            return super().format(record)
+
+        content = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc),
+            "level": record.levelname,
+            "logger": record.name,
+            "process": record.process,
+            "message": record.getMessage(),
+        }
+        for field in ACCESS_LOG_FIELDS:
+            content[field] = getattr(record, field, None)
+
+        return orjson.dumps(content).decode()
+
+
+class MaxLevelFilter(logging.Filter):
+    """Filters out messages with level < LEVEL"""
+
+    def __init__(self, level: int):
+        self.level = level
+
+    def filter(self, record):
+        return record.levelno < self.level
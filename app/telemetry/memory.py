@@ -0,0 +1,161 @@
+import logging
+import os
+import random
+import resource
+import signal
+import sys
+import threading
+from typing import Callable
+
+from opentelemetry.metrics import CallbackOptions, Observation
+
+from app.config import Settings
+from app.telemetry.metrics import meter
+
+logger = logging.getLogger(__name__)
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss() -> int:
+    """Returns the resident set size of the process in bytes."""
+    try:
+        with open("/proc/self/statm", "rb") as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except OSError:  # pragma: no cover
+        # not Linux, the peak is the best approximation without psutil
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def _recycle():
+    # the uvicorn server handles SIGTERM by finishing the running requests, the
+    # gunicorn arbiter then spawns a new worker
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+class MemoryWatchdog:
+    _watchdog: "MemoryWatchdog | None" = None
+
+    def __init__(
+        self,
+        soft_limit: int | None = None,
+        interval: float = 10.0,
+        recycle_jitter: float = 60.0,
+        recycle: Callable[[], None] = _recycle,
+    ) -> None:
+        """Reports the memory of the worker and recycles it above a soft limit.
+
+        A thread measures the resident set size every `interval` seconds for the
+        `app.worker.memory.rss` and `app.worker.memory.growth` gauges, the growth
+        being relative to the size when the watchdog started. Once the size exceeds
+        `soft_limit`, the worker shuts down gracefully after a random delay of up to
+        `recycle_jitter` seconds, so workers growing at the same rate don't restart
+        at the same moment.
+
+        Usage:
+            # in the gunicorn post_fork hook
+            watchdog = MemoryWatchdog(soft_limit=512 * 1024 * 1024)
+            watchdog.start()
+
+        Args:
+            soft_limit (int | None, optional): The resident set size in bytes above
+                which the worker is recycled, None only reports it. Defaults to None.
+            interval (float, optional): The seconds between two measurements.
+                Defaults to 10.0.
+            recycle_jitter (float, optional): The maximum seconds the recycling is
+                delayed. Defaults to 60.0.
+            recycle (Callable[[], None], optional): Shuts down the worker. Defaults
+                to sending SIGTERM to the process.
+        """
+        self.soft_limit = soft_limit
+        self.interval = interval
+        self.recycle_jitter = recycle_jitter
+        self.recycle = recycle
+
+        self.rss = 0
+        self.baseline = 0
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        self.rss = self.baseline = current_rss()
+        MemoryWatchdog._watchdog = self
+
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._watch, name="MemoryWatchdog", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+        if MemoryWatchdog._watchdog is self:
+            MemoryWatchdog._watchdog = None
+
+    def _watch(self):
+        while not self._stopped.wait(self.interval):
+            self.rss = current_rss()
+            if self.soft_limit is not None and self.rss > self.soft_limit:
+                break
+        else:
+            return
+
+        delay = random.uniform(0, self.recycle_jitter)
+        logger.warning(
+            "Worker %d uses %d MiB, more than the soft limit of %d MiB, "
+            "recycling it in %.0f seconds",
+            os.getpid(),
+            self.rss // 2**20,
+            self.soft_limit // 2**20,
+            delay,
+            extra={"rss": self.rss, "soft_limit": self.soft_limit},
+        )
+
+        if not self._stopped.wait(delay):
+            self.recycle()
+
+
+def _observe_rss(options: CallbackOptions) -> list[Observation]:
+    watchdog = MemoryWatchdog._watchdog
+    if watchdog is None:
+        return []
+    return [Observation(watchdog.rss, {"pid": os.getpid()})]
+
+
+def _observe_growth(options: CallbackOptions) -> list[Observation]:
+    watchdog = MemoryWatchdog._watchdog
+    if watchdog is None:
+        return []
+    return [Observation(watchdog.rss - watchdog.baseline, {"pid": os.getpid()})]
+
+
+meter.create_observable_gauge(
+    "app.worker.memory.rss",
+    callbacks=[_observe_rss],
+    unit="By",
+    description="Resident set size of the worker",
+)
+
+meter.create_observable_gauge(
+    "app.worker.memory.growth",
+    callbacks=[_observe_growth],
+    unit="By",
+    description="Growth of the resident set size since the worker started",
+)
+
+
+def create_memory_watchdog(settings: Settings) -> MemoryWatchdog:
+    return MemoryWatchdog(
+        soft_limit=(
+            settings.WORKER_MEMORY_SOFT_LIMIT_MB * 2**20
+            if settings.WORKER_MEMORY_SOFT_LIMIT_MB is not None
+            else None
+        ),
+        interval=settings.WORKER_MEMORY_CHECK_INTERVAL_S,
+        recycle_jitter=settings.WORKER_RECYCLE_JITTER_S,
+    )
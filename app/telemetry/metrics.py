@@ -0,0 +1,126 @@
+import time
+
+from opentelemetry import metrics
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import MetricReader, PeriodicExportingMetricReader
+from sqlalchemy import Engine, event
+
+from app.config import Settings
+from app.telemetry.prometheus import MultiprocessFileMetricExporter
+
+meter = metrics.get_meter("app")
+
+request_duration = meter.create_histogram(
+    "app.request.duration",
+    unit="ms",
+    description="Duration of HTTP requests by route, method and status code",
+)
+
+db_query_duration = meter.create_histogram(
+    "app.db.query.duration",
+    unit="ms",
+    description="Duration of database queries by operation",
+)
+
+event_loop_lag = meter.create_histogram(
+    "app.event_loop.lag",
+    unit="ms",
+    description="Delay of a periodic callback on the event loop",
+)
+
+event_loop_blocked = meter.create_counter(
+    "app.event_loop.blocked",
+    description="Times the event loop was blocked longer than the slow callback threshold",
+)
+
+telemetry_export_duration = meter.create_histogram(
+    "app.telemetry.export.duration",
+    unit="ms",
+    description="Duration of telemetry exports by signal and result",
+)
+
+telemetry_dropped = meter.create_counter(
+    "app.telemetry.dropped",
+    description="Telemetry items dropped because the export queue was full",
+)
+
+log_records_dropped = meter.create_counter(
+    "app.logs.dropped",
+    description="Log records dropped because the log queue was full",
+)
+
+jobs_enqueued = meter.create_counter(
+    "app.jobs.enqueued",
+    description="Jobs enqueued by job name and whether they were deduplicated",
+)
+
+job_duration = meter.create_histogram(
+    "app.jobs.duration",
+    unit="ms",
+    description="Duration of job attempts by job name and result",
+)
+
+job_latency = meter.create_histogram(
+    "app.jobs.latency",
+    unit="ms",
+    description="Time jobs waited in the queue after they became available",
+)
+
+_DB_OPERATIONS = frozenset(["SELECT", "INSERT", "UPDATE", "DELETE", "WITH"])
+
+
+def create_metric_readers(settings: Settings) -> list[MetricReader]:
+    """Returns the readers for the metrics that don't go to Azure Monitor."""
+    metric_readers: list[MetricReader] = []
+
+    if settings.METRICS_ENDPOINT_ENABLED:
+        metric_readers.append(
+            PeriodicExportingMetricReader(
+                MultiprocessFileMetricExporter(settings.METRICS_MULTIPROCESS_DIR),
+                export_interval_millis=settings.METRICS_EXPORT_INTERVAL_MS,
+            )
+        )
+
+    return metric_readers
+
+
+def init_metrics(metric_readers: list[MetricReader]):
+    metrics.set_meter_provider(MeterProvider(metric_readers=metric_readers))
+
+
+def has_meter_provider() -> bool:
+    return isinstance(metrics.get_meter_provider(), MeterProvider)
+
+
+def _db_operation(statement: str) -> str:
+    words = statement[:16].split(None, 1)
+    operation = words[0].upper() if words else ""
+    return operation if operation in _DB_OPERATIONS else "OTHER"
+
+
+def instrument_engine(engine: Engine):
+    """Records the duration of the queries executed by the engine."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        _record_query(conn, statement, error=False)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        if context.connection is not None and context.statement is not None:
+            _record_query(context.connection, context.statement, error=True)
+
+
+def _record_query(conn, statement: str, error: bool):
+    start_times = conn.info.get("query_start_time")
+    if not start_times:
+        return
+
+    duration = (time.perf_counter() - start_times.pop()) * 1000
+    db_query_duration.record(
+        duration, {"db.operation": _db_operation(statement), "error": error}
+    )
@@ -0,0 +1,216 @@
+"""Statistical wall-clock profiler based on `sys._current_frames`.
+
+A background thread periodically captures the Python stacks of the process, so
+the profiled code runs unmodified and the overhead only depends on the sampling
+interval. `profile_threads` samples every thread of the worker, `profile_request`
+samples a single asyncio request: the stack of the event loop thread while the
+request runs and the chain of awaited coroutines while it is suspended.
+
+Only one profiler runs per process at a time.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import lru_cache
+from types import CodeType, FrameType
+from typing import Any, Callable
+
+Stack = tuple[str, ...]
+
+PROFILE_STACKS_KEY = "profile.stacks"
+
+_active = threading.Lock()
+
+
+class ProfilerBusyException(Exception):
+    pass
+
+
+@dataclass
+class Profile:
+    name: str
+    interval: float
+    samples: Counter[Stack] = field(default_factory=Counter)
+    duration: float = 0.0
+
+    @property
+    def sample_count(self) -> int:
+        return sum(self.samples.values())
+
+    def collapsed(self, max_length: int | None = None) -> str:
+        """Returns the stacks in the collapsed format of `flamegraph.pl`.
+
+        With `max_length` only the most frequent stacks that fit are returned.
+        """
+        lines = []
+        length = 0
+        for stack, count in self.samples.most_common():
+            line = f"{';'.join(stack)} {count}"
+            length += len(line) + 1
+            if max_length is not None and length > max_length + 1:
+                break
+            lines.append(line)
+        return "\n".join(lines)
+
+    def speedscope(self) -> dict[str, Any]:
+        """Returns the profile in the sampled speedscope file format."""
+        frames: dict[str, int] = {}
+        samples = []
+        weights = []
+        interval_ms = self.interval * 1000
+
+        for stack, count in self.samples.most_common():
+            samples.append([frames.setdefault(label, len(frames)) for label in stack])
+            weights.append(count * interval_ms)
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": self.name,
+            "exporter": "app",
+            "shared": {"frames": [{"name": label} for label in frames]},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": self.name,
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": samples,
+                    "weights": weights,
+                }
+            ],
+        }
+
+
+class SamplingProfiler:
+    def __init__(
+        self, name: str, interval: float, sample: Callable[[], list[Stack]]
+    ) -> None:
+        """Collects the stacks returned by `sample` every `interval` seconds.
+
+        Raises:
+            ProfilerBusyException: Another profiler is running in the process.
+        """
+        if not _active.acquire(blocking=False):
+            raise ProfilerBusyException()
+
+        self.profile = Profile(name=name, interval=interval)
+        self._sample = sample
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="SamplingProfiler", daemon=True
+        )
+        self._start = time.perf_counter()
+        self._thread.start()
+
+    def _run(self):
+        try:
+            while not self._stopped.wait(self.profile.interval):
+                self.profile.samples.update(self._sample())
+        finally:
+            _active.release()
+
+    def stop(self) -> Profile:
+        self._stopped.set()
+        self._thread.join()
+        self.profile.duration = time.perf_counter() - self._start
+        return self.profile
+
+
+def profile_threads(interval: float) -> SamplingProfiler:
+    """Samples the stacks of all threads but the profiler thread."""
+
+    def sample() -> list[Stack]:
+        profiler_thread = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        return [
+            (names.get(thread_id, str(thread_id)), *_frame_stack(frame))
+            for thread_id, frame in sys._current_frames().items()
+            if thread_id != profiler_thread
+        ]
+
+    return SamplingProfiler(f"worker {os.getpid()}", interval, sample)
+
+
+def profile_request(name: str, interval: float) -> SamplingProfiler:
+    """Samples the calling coroutine and everything it awaits.
+
+    Must be called from the coroutine that handles the request.
+    """
+    task = asyncio.current_task()
+    request_frame = sys._getframe(1)
+    thread_id = threading.get_ident()
+
+    def sample() -> list[Stack]:
+        stack = _running_stack(sys._current_frames().get(thread_id), request_frame)
+        if stack is None and task is not None:
+            stack = _suspended_stack(task, request_frame)
+        return [stack] if stack else []
+
+    return SamplingProfiler(name, interval, sample)
+
+
+def _frame_stack(frame: FrameType | None) -> Stack:
+    labels = []
+    while frame is not None:
+        labels.append(_label(frame.f_code))
+        frame = frame.f_back
+    return tuple(reversed(labels))
+
+
+def _running_stack(frame: FrameType | None, root: FrameType) -> Stack | None:
+    # the stack of the thread from the root frame down, if the root is running
+    labels = []
+    while frame is not None:
+        labels.append(_label(frame.f_code))
+        if frame is root:
+            return tuple(reversed(labels))
+        frame = frame.f_back
+    return None
+
+
+def _suspended_stack(task: asyncio.Task, root: FrameType) -> Stack | None:
+    # follow the awaited coroutines of the suspended task from the root frame
+    labels = []
+    awaitable: Any = task.get_coro()
+    while awaitable is not None:
+        frame = (
+            getattr(awaitable, "cr_frame", None)
+            or getattr(awaitable, "gi_frame", None)
+            or getattr(awaitable, "ag_frame", None)
+        )
+        if frame is None:
+            if labels:
+                labels.append(f"<await {type(awaitable).__name__}>")
+            break
+
+        if frame is root or labels:
+            labels.append(_label(frame.f_code))
+
+        awaitable = (
+            getattr(awaitable, "cr_await", None)
+            or getattr(awaitable, "gi_yieldfrom", None)
+            or getattr(awaitable, "ag_await", None)
+        )
+
+    return tuple(labels) or None
+
+
+@lru_cache(maxsize=4096)
+def _label(code: CodeType) -> str:
+    label = (
+        f"{code.co_qualname} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+    )
+    # semicolons separate the frames of collapsed stacks
+    return label.replace(";", ",")
+
+
+def _short_path(path: str) -> str:
+    for prefix in sorted(sys.path, key=len, reverse=True):
+        if prefix and path.startswith(prefix + os.sep):
+            return os.path.relpath(path, prefix)
+    return path
@@ -0,0 +1,295 @@
+"""Prometheus text exposition of the OpenTelemetry metrics of all workers.
+
+Every worker process periodically writes a cumulative snapshot of its metrics to
+`<directory>/metrics-<pid>.json` with `MultiprocessFileMetricExporter`. The
+`/metrics` endpoint of any worker merges the snapshots of all processes with
+`collect` and renders them with `render`. When a worker exits, `mark_process_dead`
+drops its gauges and merges its counters and histograms into
+`<directory>/metrics-dead.json`, so there is one file per live worker.
+"""
+import logging
+import math
+import os
+import re
+from pathlib import Path
+from typing import Any
+
+import orjson
+from opentelemetry.sdk.metrics import (
+    Counter,
+    Histogram,
+    ObservableCounter,
+    ObservableGauge,
+    ObservableUpDownCounter,
+    UpDownCounter,
+)
+from opentelemetry.sdk.metrics.export import AggregationTemporality, Gauge
+from opentelemetry.sdk.metrics.export import Histogram as HistogramData
+from opentelemetry.sdk.metrics.export import (
+    MetricExporter,
+    MetricExportResult,
+    MetricsData,
+    Sum,
+)
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_FILE_PREFIX = "metrics-"
+
+# the merged counters and histograms of the exited processes
+_DEAD_FILE = f"{_FILE_PREFIX}dead.json"
+
+_INVALID_NAME_CHARACTERS = re.compile(r"[^a-zA-Z0-9_:]")
+
+# merged metric: name -> {"type", "description", "points": {attributes: point}}
+Metrics = dict[str, dict[str, Any]]
+
+
+class MultiprocessFileMetricExporter(MetricExporter):
+    def __init__(self, directory: str) -> None:
+        """Writes cumulative metric snapshots to a file per process."""
+        super().__init__(
+            preferred_temporality={
+                instrument: AggregationTemporality.CUMULATIVE
+                for instrument in (
+                    Counter,
+                    UpDownCounter,
+                    Histogram,
+                    ObservableCounter,
+                    ObservableUpDownCounter,
+                    ObservableGauge,
+                )
+            }
+        )
+        self.directory = Path(directory)
+
+    def export(
+        self,
+        metrics_data: MetricsData,
+        timeout_millis: float = 10_000,
+        **kwargs,
+    ) -> MetricExportResult:
+        snapshot = [
+            _metric_snapshot(metric)
+            for resource_metrics in metrics_data.resource_metrics
+            for scope_metrics in resource_metrics.scope_metrics
+            for metric in scope_metrics.metrics
+        ]
+
+        try:
+            _write(_process_file(self.directory, os.getpid()), snapshot)
+        except OSError:
+            logger.warning("Failed to write the metrics snapshot", exc_info=True)
+            return MetricExportResult.FAILURE
+
+        return MetricExportResult.SUCCESS
+
+    def force_flush(self, timeout_millis: float = 10_000) -> bool:
+        return True
+
+    def shutdown(self, timeout_millis: float = 30_000, **kwargs) -> None:
+        pass
+
+
+def _metric_snapshot(metric) -> dict[str, Any]:
+    data = metric.data
+
+    if isinstance(data, HistogramData):
+        metric_type = "histogram"
+        points = [
+            {
+                "attributes": dict(point.attributes or {}),
+                "bucket_counts": list(point.bucket_counts),
+                "explicit_bounds": list(point.explicit_bounds),
+                "sum": point.sum,
+                "count": point.count,
+            }
+            for point in data.data_points
+        ]
+    else:
+        if isinstance(data, Sum) and data.is_monotonic:
+            metric_type = "counter"
+        elif isinstance(data, (Sum, Gauge)):
+            metric_type = "gauge"
+        else:  # pragma: no cover
+            raise TypeError(f"Unsupported metric data {type(data).__name__}")
+        points = [
+            {"attributes": dict(point.attributes or {}), "value": point.value}
+            for point in data.data_points
+        ]
+
+    return {
+        "name": metric.name,
+        "description": metric.description or "",
+        "type": metric_type,
+        "points": points,
+    }
+
+
+def _process_file(directory: Path, pid: int) -> Path:
+    return directory / f"{_FILE_PREFIX}{pid}.json"
+
+
+def _write(path: Path, snapshot: list[dict[str, Any]]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # readers must never see a partially written file
+    temp_path = path.with_suffix(".tmp")
+    temp_path.write_bytes(orjson.dumps(snapshot))
+    os.replace(temp_path, path)
+
+
+def _read(path: Path) -> list[dict[str, Any]]:
+    try:
+        return orjson.loads(path.read_bytes())
+    except (OSError, orjson.JSONDecodeError):
+        # the file of an exited process was just replaced or removed
+        return []
+
+
+def clear(directory: str):
+    """Removes the snapshots of a previous run."""
+    for path in Path(directory).glob(f"{_FILE_PREFIX}*"):
+        path.unlink(missing_ok=True)
+
+
+def mark_process_dead(directory: str, pid: int):
+    """Merges the counters and histograms of an exited process into the dead
+    file and removes its snapshot, its gauges are dropped.
+
+    Only called by the gunicorn master, so the dead file has a single writer.
+    """
+    path = _process_file(Path(directory), pid)
+    if not path.exists():
+        return
+
+    dead_path = Path(directory) / _DEAD_FILE
+    merged = _merge([dead_path, path])
+    snapshot = [
+        {
+            "name": name,
+            "type": metric["type"],
+            "description": metric["description"],
+            "points": list(metric["points"].values()),
+        }
+        for name, metric in merged.items()
+        if metric["type"] != "gauge"
+    ]
+    _write(dead_path, snapshot)
+    path.unlink(missing_ok=True)
+
+
+def collect(directory: str) -> Metrics:
+    """Merges the snapshots of all processes by metric name and attributes."""
+    return _merge(sorted(Path(directory).glob(f"{_FILE_PREFIX}*.json")))
+
+
+def _merge(paths: list[Path]) -> Metrics:
+    merged: Metrics = {}
+
+    for path in paths:
+        for metric in _read(path):
+            target = merged.setdefault(
+                metric["name"],
+                {
+                    "type": metric["type"],
+                    "description": metric["description"],
+                    "points": {},
+                },
+            )
+            if target["type"] != metric["type"]:
+                continue
+
+            for point in metric["points"]:
+                key = tuple(sorted(point["attributes"].items()))
+                _merge_point(target["points"], key, point)
+
+    return merged
+
+
+def _merge_point(points: dict[tuple, dict[str, Any]], key: tuple, point: dict):
+    existing = points.get(key)
+    if existing is None:
+        points[key] = dict(point)
+        return
+
+    if "value" in point:
+        existing["value"] += point["value"]
+    elif existing["explicit_bounds"] == point["explicit_bounds"]:
+        existing["bucket_counts"] = [
+            a + b for a, b in zip(existing["bucket_counts"], point["bucket_counts"])
+        ]
+        existing["sum"] += point["sum"]
+        existing["count"] += point["count"]
+
+
+def render(merged: Metrics) -> str:
+    """Renders merged metrics in the Prometheus text exposition format."""
+    lines: list[str] = []
+
+    for name, metric in sorted(merged.items()):
+        name = _sanitize_name(name)
+        metric_type = metric["type"]
+        if metric_type == "counter" and not name.endswith("_total"):
+            name += "_total"
+
+        if metric["description"]:
+            lines.append(f"# HELP {name} {_escape_help(metric['description'])}")
+        lines.append(f"# TYPE {name} {metric_type}")
+
+        for key, point in metric["points"].items():
+            if metric_type == "histogram":
+                lines.extend(_histogram_lines(name, key, point))
+            else:
+                lines.append(f"{name}{_labels(key)} {_number(point['value'])}")
+
+    lines.append("")
+    return "\n".join(lines)
+
+
+def _histogram_lines(name: str, key: tuple, point: dict[str, Any]) -> list[str]:
+    lines = []
+
+    cumulative = 0
+    bounds = [*point["explicit_bounds"], math.inf]
+    for bound, count in zip(bounds, point["bucket_counts"]):
+        cumulative += count
+        labels = _labels((*key, ("le", _number(bound))))
+        lines.append(f"{name}_bucket{labels} {cumulative}")
+
+    lines.append(f"{name}_sum{_labels(key)} {_number(point['sum'])}")
+    lines.append(f"{name}_count{_labels(key)} {point['count']}")
+    return lines
+
+
+def _sanitize_name(name: str) -> str:
+    return _INVALID_NAME_CHARACTERS.sub("_", name)
+
+
+def _labels(key: tuple) -> str:
+    if not key:
+        return ""
+    labels = ",".join(
+        f'{_sanitize_name(name)}="{_escape_label(value)}"' for name, value in key
+    )
+    return f"{{{labels}}}"
+
+
+def _escape_label(value: Any) -> str:
+    if isinstance(value, bool):
+        value = "true" if value else "false"
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _escape_help(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
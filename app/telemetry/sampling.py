@@ -0,0 +1,291 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Sequence
+
+from opentelemetry.context import Context
+from opentelemetry.sdk.trace import ReadableSpan, Span, SpanProcessor
+from opentelemetry.sdk.trace.sampling import (
+    ALWAYS_OFF,
+    Decision,
+    ParentBased,
+    Sampler,
+    SamplingResult,
+    TraceIdRatioBased,
+)
+from opentelemetry.trace import (
+    Link,
+    SpanContext,
+    SpanKind,
+    StatusCode,
+    TraceFlags,
+    get_current_span,
+)
+from opentelemetry.trace.span import TraceState
+from opentelemetry.util.types import Attributes
+
+from app.config import Settings
+from app.telemetry.profiling import PROFILE_STACKS_KEY
+
+TAIL_SAMPLING_REASON_KEY = "tail_sampling.reason"
+
+
+class _TokenBucket:
+    def __init__(self, rate: float) -> None:
+        self.rate = rate
+        self.capacity = max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+
+            if self._tokens < 1:
+                return False
+
+            self._tokens -= 1
+            return True
+
+
+def _parent_trace_state(parent_context: Optional[Context]) -> TraceState | None:
+    return get_current_span(parent_context).get_span_context().trace_state
+
+
+class _RecordOnly(Sampler):
+    """Records the spans of unsampled traces for `TailSamplingSpanProcessor`."""
+
+    def should_sample(
+        self,
+        parent_context: Optional[Context],
+        trace_id: int,
+        name: str,
+        kind: SpanKind = None,
+        attributes: Attributes = None,
+        links: Sequence[Link] = None,
+        trace_state: TraceState = None,
+    ) -> SamplingResult:
+        return SamplingResult(
+            Decision.RECORD_ONLY, trace_state=_parent_trace_state(parent_context)
+        )
+
+    def get_description(self) -> str:
+        return "RecordOnly"
+
+
+class RouteSampler(Sampler):
+    def __init__(
+        self,
+        rate: float,
+        route_rates: dict[str, float] | None = None,
+        max_traces_per_second: float | None = None,
+        record_unsampled: bool = False,
+    ) -> None:
+        """Samples root spans by trace ID ratio, with a separate ratio per route.
+
+        The FastAPI instrumentation names server spans after the route template,
+        for example `/samples/{id}`, so the route of a request is its span name.
+
+        Args:
+            rate (float): The ratio of sampled traces for all other spans.
+            route_rates (dict[str, float], optional):
+                The ratio of sampled traces per route. Defaults to None.
+            max_traces_per_second (float, optional):
+                The maximum number of sampled traces per second, None to not limit
+                them. Defaults to None.
+            record_unsampled (bool, optional):
+                Record the spans that aren't sampled, without exporting them.
+                Defaults to False.
+        """
+        self._bound = TraceIdRatioBased.get_bound_for_rate(rate)
+        self._route_bounds = {
+            route: TraceIdRatioBased.get_bound_for_rate(route_rate)
+            for route, route_rate in (route_rates or {}).items()
+        }
+        self._bucket = (
+            _TokenBucket(max_traces_per_second)
+            if max_traces_per_second is not None
+            else None
+        )
+        self._unsampled = Decision.RECORD_ONLY if record_unsampled else Decision.DROP
+        self._description = (
+            f"RouteSampler{{rate={rate}, routes={route_rates or {}}, "
+            f"max_traces_per_second={max_traces_per_second}}}"
+        )
+
+    def should_sample(
+        self,
+        parent_context: Optional[Context],
+        trace_id: int,
+        name: str,
+        kind: SpanKind = None,
+        attributes: Attributes = None,
+        links: Sequence[Link] = None,
+        trace_state: TraceState = None,
+    ) -> SamplingResult:
+        bound = self._route_bounds.get(name, self._bound)
+
+        if trace_id & TraceIdRatioBased.TRACE_ID_LIMIT < bound and (
+            self._bucket is None or self._bucket.take()
+        ):
+            decision = Decision.RECORD_AND_SAMPLE
+        else:
+            decision = self._unsampled
+
+        return SamplingResult(decision, trace_state=_parent_trace_state(parent_context))
+
+    def get_description(self) -> str:
+        return self._description
+
+
+def create_sampler(settings: Settings) -> Sampler:
+    """Creates the sampler configured by the `TRACING_*` settings.
+
+    Traces continue the sampling decision of their parent span, only root spans
+    are sampled by `RouteSampler`.
+    """
+    record_unsampled = settings.TRACING_TAIL_SAMPLING_ENABLED
+    not_sampled = _RecordOnly() if record_unsampled else ALWAYS_OFF
+
+    return ParentBased(
+        root=RouteSampler(
+            float(settings.TRACING_SAMPLER_RATE),
+            route_rates={
+                route: float(rate)
+                for route, rate in settings.TRACING_ROUTE_SAMPLER_RATES.items()
+            },
+            max_traces_per_second=settings.TRACING_MAX_TRACES_PER_SECOND,
+            record_unsampled=record_unsampled,
+        ),
+        remote_parent_not_sampled=not_sampled,
+        local_parent_not_sampled=not_sampled,
+    )
+
+
+def _is_local_root(span: ReadableSpan) -> bool:
+    return span.parent is None or span.parent.is_remote
+
+
+def _sampled_copy(span: ReadableSpan, attributes: Attributes) -> ReadableSpan:
+    context = span.context
+    return ReadableSpan(
+        name=span.name,
+        context=SpanContext(
+            context.trace_id,
+            context.span_id,
+            is_remote=context.is_remote,
+            trace_flags=TraceFlags(context.trace_flags | TraceFlags.SAMPLED),
+            trace_state=context.trace_state,
+        ),
+        parent=span.parent,
+        resource=span.resource,
+        attributes=attributes,
+        events=span.events,
+        links=span.links,
+        kind=span.kind,
+        status=span.status,
+        start_time=span.start_time,
+        end_time=span.end_time,
+        instrumentation_scope=span.instrumentation_scope,
+    )
+
+
+class TailSamplingSpanProcessor(SpanProcessor):
+    def __init__(
+        self,
+        span_processor: SpanProcessor,
+        latency_threshold: float,
+        max_traces: int = 1000,
+        max_spans_per_trace: int = 512,
+    ) -> None:
+        """Keeps unsampled traces that failed, were slow or were profiled.
+
+        Sampled spans are passed to `span_processor` right away. The recorded spans
+        of unsampled traces are buffered from the start until the end of their
+        local root span. If one of them has an error status, the root span took
+        longer than `latency_threshold` or carries a request profile, the trace is
+        passed to `span_processor` as sampled, otherwise it is discarded. Spans ending after their root span are
+        dropped.
+
+        Args:
+            span_processor (SpanProcessor): The processor exporting the spans.
+            latency_threshold (float): The root span duration in seconds above
+                which a trace is kept.
+            max_traces (int, optional): The maximum number of buffered traces, the
+                oldest trace is dropped when exceeded. Defaults to 1000.
+            max_spans_per_trace (int, optional): The maximum number of buffered
+                spans per trace. Defaults to 512.
+        """
+        self._span_processor = span_processor
+        self._latency_threshold = int(latency_threshold * 1e9)
+        self._max_traces = max_traces
+        self._max_spans_per_trace = max_spans_per_trace
+
+        self._traces: OrderedDict[int, list[ReadableSpan]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.dropped_traces = 0
+
+    def on_start(self, span: Span, parent_context: Optional[Context] = None) -> None:
+        if not span.context.trace_flags.sampled and _is_local_root(span):
+            with self._lock:
+                if len(self._traces) >= self._max_traces:
+                    self._traces.popitem(last=False)
+                    self.dropped_traces += 1
+                self._traces[span.context.trace_id] = []
+
+        self._span_processor.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span: ReadableSpan) -> None:
+        if span.context.trace_flags.sampled:
+            self._span_processor.on_end(span)
+            return
+
+        trace_id = span.context.trace_id
+
+        with self._lock:
+            spans = self._traces.get(trace_id)
+            if spans is None:
+                # the trace was dropped or its root span already ended
+                return
+
+            is_local_root = _is_local_root(span)
+            if is_local_root or len(spans) < self._max_spans_per_trace:
+                spans.append(span)
+
+            if not is_local_root:
+                return
+
+            del self._traces[trace_id]
+
+        reason = self._keep_reason(span, spans)
+        if reason is None:
+            return
+
+        for buffered in spans:
+            attributes = dict(buffered.attributes)
+            if buffered is span:
+                attributes[TAIL_SAMPLING_REASON_KEY] = reason
+            self._span_processor.on_end(_sampled_copy(buffered, attributes))
+
+    def _keep_reason(self, root: ReadableSpan, spans: list[ReadableSpan]) -> str | None:
+        if any(span.status.status_code is StatusCode.ERROR for span in spans):
+            return "error"
+        if root.end_time - root.start_time >= self._latency_threshold:
+            return "latency"
+        if PROFILE_STACKS_KEY in root.attributes:
+            return "profile"
+        return None
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._traces.clear()
+        self._span_processor.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self._span_processor.force_flush(timeout_millis)
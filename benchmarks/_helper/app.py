@@ -0,0 +1,52 @@
+"""The app without Azure AD and Postgres, for benchmarks of the HTTP stack.
+
+Requests with the `Authorization: Bearer benchmark` header are authenticated as
+a static user and `GET /samples` returns in-memory samples. The rate limiter is
+disabled and the startup handlers that connect to Azure AD and Postgres are
+removed.
+
+Usage:
+    gunicorn -c gunicorn.conf.py benchmarks._helper.app:app
+"""
+from datetime import datetime
+
+from fastapi import HTTPException, Request, status
+
+from app.azure_scheme import AzureScheme
+from app.main import app, init_local_metrics
+from app.models.sample import Sample
+from app.packages.auth import User
+from app.services.sample_service import get_sample_service
+
+TOKEN = "benchmark"
+
+SAMPLES = [
+    Sample(id=i, name=f"sample{i}", description="A sample of the benchmark")
+    for i in range(20)
+]
+
+
+def authenticate(request: Request) -> User:
+    if request.headers.get("Authorization") != f"Bearer {TOKEN}":
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Invalid token")
+
+    claims = {"aud": "benchmark", "tid": "benchmark", "sub": "benchmark"}
+    user = User(**claims, claims=claims, scp="user_impersonation", access_token=TOKEN)
+    request.state.user = user
+    return user
+
+
+class SampleService:
+    async def get(
+        self,
+        created_after: datetime | None = None,
+        created_before: datetime | None = None,
+        fields: frozenset[str] | None = None,
+    ) -> list[Sample]:
+        return SAMPLES
+
+
+app.dependency_overrides[AzureScheme.instance()] = authenticate
+app.dependency_overrides[get_sample_service] = SampleService
+app.state.limiter.enabled = False
+app.router.on_startup = [init_local_metrics]
@@ -0,0 +1,30 @@
+import statistics
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(values: list[float]) -> dict[str, float]:
+    """Summary of latencies in milliseconds."""
+    return {
+        "count": len(values),
+        "mean": statistics.fmean(values) if values else float("nan"),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else float("nan"),
+    }
+
+
+def format_summary(name: str, values: list[float]) -> str:
+    summary = summarize(values)
+    return (
+        f"{name:<40} n={summary['count']:<6} "
+        f"mean={summary['mean']:8.2f}ms p50={summary['p50']:8.2f}ms "
+        f"p95={summary['p95']:8.2f}ms p99={summary['p99']:8.2f}ms"
+    )
@@ -0,0 +1,85 @@
+"""Payload size and encode/decode time of the negotiated response encodings.
+
+Encodes the documents the API produces (`GET /samples` pages, a single `Sample`,
+a `Greeting`) and the `POST /samples` request body with every available codec,
+then decodes them again, including the `SampleCreate` validation for request
+bodies.
+
+Usage:
+    python -m benchmarks.content_negotiation --iterations 2000
+"""
+import argparse
+import json
+import time
+from typing import Any, Callable
+
+from fastapi.encoders import jsonable_encoder
+
+from app.content_negotiation import JSON, MSGPACK, Codec
+from app.models.sample import Sample, SampleCreate
+
+try:
+    from app.content_negotiation import CBOR
+except ImportError:
+    CBOR = None
+
+
+def _documents() -> dict[str, Any]:
+    samples = [
+        Sample(
+            id=i,
+            name=f"sample{i}",
+            description="A sample with a description of moderate length",
+        )
+        for i in range(1000)
+    ]
+
+    # encoded the same way FastAPI hands them to the response class
+    return {
+        "GET /samples (100 items)": jsonable_encoder(samples[:100]),
+        "GET /samples (1000 items)": jsonable_encoder(samples),
+        "GET /samples/{id}": jsonable_encoder(samples[0]),
+        "GET /users/greet": {"greeting": "Hello John Doe!"},
+        "POST /samples": {"name": "sample", "description": "A new sample"},
+    }
+
+
+def measure(func: Callable[[], Any], iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=1000)
+    args = parser.parse_args()
+
+    # JSON bodies are parsed by Starlette's Request.json()
+    codecs = [Codec(JSON.media_type, JSON.encode, decode=json.loads), MSGPACK]
+    if CBOR is not None:
+        codecs.append(CBOR)
+
+    for name, content in _documents().items():
+        print(f"\n{name}")
+        for codec in codecs:
+            body = codec.encode(content)
+            encode = measure(lambda: codec.encode(content), args.iterations)
+
+            if name.startswith("POST"):
+                decode = measure(
+                    lambda: SampleCreate.parse_obj(codec.decode(body)),
+                    args.iterations,
+                )
+            else:
+                decode = measure(lambda: codec.decode(body), args.iterations)
+
+            print(
+                f"  {codec.media_type:<20} {len(body):8}B "
+                f"encode {encode:9.1f}µs decode {decode:9.1f}µs"
+            )
+
+
+if __name__ == "__main__":
+    main()
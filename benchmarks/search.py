@@ -0,0 +1,123 @@
+"""Search latency against a local Postgres.
+
+Tops the `sample` table up to each requested row count and measures
+`SampleRepository.search` for a mix of full-text, fuzzy and prefix queries,
+including the second page of each result set.
+
+Usage:
+    alembic upgrade head
+    python -m benchmarks.search --rows 1000000 10000000
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from sqlalchemy import String, bindparam, func, select, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.database.tables import SampleTable
+from app.repositories.sample_repository import SampleRepository
+from benchmarks._helper.stats import format_summary
+
+WORDS = [
+    "alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel",
+    "india", "juliett", "kilo", "lima", "mike", "november", "oscar", "papa",
+    "quebec", "romeo", "sierra", "tango", "uniform", "victor", "whiskey",
+    "xray", "yankee", "zulu", "sensor", "reading", "device", "station",
+]  # fmt: skip
+
+QUERIES = {
+    "full-text single term": "sensor",
+    "full-text phrase": '"sensor reading"',
+    "full-text boolean": "delta or echo -zulu",
+    "fuzzy name": "a1b2c3d4",
+    "prefix name": "ab",
+}
+
+SEED_BATCH_SIZE = 500_000
+
+
+async def seed(session: AsyncSession, rows: int):
+    current = await session.scalar(select(func.count()).select_from(SampleTable))
+
+    while current < rows:
+        batch = min(SEED_BATCH_SIZE, rows - current)
+        await session.execute(
+            text(
+                """
+                INSERT INTO sample (name, description, create_date)
+                SELECT
+                    left(md5(i::text), 10),
+                    words[1 + (random() * (cardinality(words) - 1))::int] || ' '
+                        || words[1 + (random() * (cardinality(words) - 1))::int] || ' '
+                        || words[1 + (random() * (cardinality(words) - 1))::int],
+                    now() - random() * interval '365 days'
+                FROM generate_series(:start, :stop) AS i, (SELECT :words AS words) w
+                """
+            ).bindparams(bindparam("words", type_=ARRAY(String))),
+            {"start": current, "stop": current + batch - 1, "words": WORDS},
+        )
+        await session.commit()
+        current += batch
+        print(f"seeded {current}/{rows} rows")
+
+    await session.execute(text("ANALYZE sample"))
+    await session.commit()
+
+
+async def measure(repo: SampleRepository, q: str, iterations: int, limit: int):
+    first_page: list[float] = []
+    second_page: list[float] = []
+
+    for _ in range(iterations):
+        start = time.perf_counter()
+        rows = await repo.search(q, limit=limit)
+        first_page.append((time.perf_counter() - start) * 1000)
+
+        if len(rows) == limit:
+            item, rank = rows[-1]
+            start = time.perf_counter()
+            await repo.search(q, limit=limit, after=(rank, item.id))
+            second_page.append((time.perf_counter() - start) * 1000)
+
+    return first_page, second_page
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--dsn",
+        default=os.environ.get("POSTGRES_CONNECTION_STRING"),
+        help="SQLAlchemy connection string. Defaults to $POSTGRES_CONNECTION_STRING",
+    )
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000])
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    if not args.dsn:
+        parser.error("--dsn or POSTGRES_CONNECTION_STRING is required")
+
+    engine = create_async_engine(args.dsn)
+
+    for rows in sorted(args.rows):
+        async with AsyncSession(engine) as session:
+            await seed(session, rows)
+
+            repo = SampleRepository(session)
+            print(f"\n{rows} rows")
+            for name, q in QUERIES.items():
+                first_page, second_page = await measure(
+                    repo, q, args.iterations, args.limit
+                )
+                print(format_summary(f"{name} (page 1)", first_page))
+                if second_page:
+                    print(format_summary(f"{name} (page 2)", second_page))
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
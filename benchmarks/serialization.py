@@ -0,0 +1,110 @@
+"""Response encoding time and throughput for every response shape of the API.
+
+Compares the previous default (`jsonable_encoder` + stdlib `json` through
+`JSONResponse`) with `ORJSONResponse`, both after FastAPI's response model
+validation, and orjson on the validated models directly.
+
+Usage:
+    python -m benchmarks.serialization --iterations 2000
+"""
+import argparse
+import asyncio
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Callable
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from pydantic import BaseModel
+
+from app.database.tables import SampleTable
+from app.models.sample import Sample, SampleSearchResult, SampleStats
+from app.responses import ORJSONResponse
+
+
+class Greeting(BaseModel):
+    """Same shape as `app.routers.users.Greeting`, which can't be imported without
+    an initialized `RateLimit`."""
+
+    greeting: str
+
+
+def _samples(count: int) -> list[SampleTable]:
+    return [
+        SampleTable(
+            id=i,
+            name=f"sample{i}",
+            description="A sample with a description of moderate length",
+            create_date=datetime(2022, 11, 12) + timedelta(minutes=i),
+        )
+        for i in range(count)
+    ]
+
+
+def _shapes() -> dict[str, tuple[Any, Any]]:
+    """Response model and endpoint return value per shape."""
+    stats = {
+        "total": {"value": 123_456, "exact": False},
+        "per_day": [
+            {"day": date(2022, 11, 12) + timedelta(days=i), "value": i, "exact": True}
+            for i in range(366)
+        ],
+    }
+
+    return {
+        "GET /samples (100 items)": (list[Sample], _samples(100)),
+        "GET /samples (1000 items)": (list[Sample], _samples(1000)),
+        "GET /samples/{id}": (Sample, _samples(1)[0]),
+        "GET /samples/search": (
+            SampleSearchResult,
+            {"items": _samples(20), "next_cursor": "WzAuNzUsIDJd"},
+        ),
+        "GET /samples/stats (366 days)": (SampleStats, stats),
+        "GET /users/greet": (Greeting, Greeting(greeting="Hello John Doe!")),
+        "401/404 detail": (None, {"detail": "Insufficient permissions"}),
+    }
+
+
+def measure(encode: Callable[[], bytes], iterations: int) -> tuple[float, int]:
+    size = len(encode())
+    start = time.perf_counter()
+    for _ in range(iterations):
+        encode()
+    return (time.perf_counter() - start) / iterations * 1_000_000, size
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=1000)
+    args = parser.parse_args()
+
+    for name, (model, content) in _shapes().items():
+        field = create_response_field(name="response", type_=model) if model else None
+
+        # what FastAPI hands to the response class
+        encoded = await serialize_response(field=field, response_content=content)
+        validated = (
+            field.validate(content, {}, loc=("response",))[0] if field else content
+        )
+
+        encoders: dict[str, Callable[[], bytes]] = {
+            "json": lambda: JSONResponse(encoded).body,
+            "orjson": lambda: ORJSONResponse(encoded).body,
+            "orjson (models)": lambda: ORJSONResponse(validated).body,
+        }
+
+        print(f"\n{name}")
+        for encoder, encode in encoders.items():
+            micros, size = measure(encode, args.iterations)
+            throughput = size / micros  # bytes per µs == MB/s
+            print(f"  {encoder:<16} {micros:10.1f}µs {throughput:8.1f}MB/s {size}B")
+
+        # jsonable_encoder runs before every response class, report it separately
+        micros, _ = measure(lambda: jsonable_encoder(validated), args.iterations)
+        print(f"  {'jsonable_encoder':<16} {micros:10.1f}µs")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+"""Per-request overhead of the telemetry pipeline with the NDJSON file exporter.
+
+Simulates requests creating a server span with three child spans and a log
+record, first without telemetry and then through the pipeline of
+`AzureMonitor.init` exporting to `TELEMETRY_EXPORT_DIR`. It reports the
+overhead per request, the dropped items and the export latency. Runs locally,
+without Application Insights.
+
+Usage:
+    python -m benchmarks.telemetry --requests 20000 --span-queue-size 2048
+"""
+import argparse
+import logging
+import tempfile
+import time
+
+from opentelemetry import trace
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+
+from app.telemetry.azure_monitor import AzureMonitor
+from app.telemetry.export import (
+    ExportOptions,
+    InstrumentedLogExporter,
+    InstrumentedMetricExporter,
+    InstrumentedSpanExporter,
+    NdjsonLogExporter,
+    NdjsonMetricExporter,
+    NdjsonSpanExporter,
+    TelemetryExporters,
+)
+
+logger = logging.getLogger("benchmarks.telemetry")
+
+
+def handle_requests(requests: int) -> float:
+    tracer = trace.get_tracer(__name__)
+
+    start = time.perf_counter()
+    for i in range(requests):
+        with tracer.start_as_current_span("GET /samples/{id}") as span:
+            span.set_attribute("http.status_code", 200)
+            for name in ["auth", "SELECT", "serialize"]:
+                with tracer.start_as_current_span(name):
+                    pass
+            logger.info("Handled request %d", i)
+    return (time.perf_counter() - start) / requests * 1_000_000
+
+
+def telemetry_metrics(reader: InMemoryMetricReader) -> dict[str, dict]:
+    values = {}
+    for resource_metrics in reader.get_metrics_data().resource_metrics:
+        for scope_metrics in resource_metrics.scope_metrics:
+            for metric in scope_metrics.metrics:
+                if not metric.name.startswith("app.telemetry."):
+                    continue
+                for point in metric.data.data_points:
+                    key = (metric.name, point.attributes["signal"])
+                    values[key] = point
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--span-queue-size", type=int, default=2048)
+    parser.add_argument("--log-queue-size", type=int, default=2048)
+    parser.add_argument("--directory", default=tempfile.mkdtemp())
+    args = parser.parse_args()
+
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    baseline = handle_requests(args.requests)
+
+    reader = InMemoryMetricReader()
+    AzureMonitor.init(
+        TelemetryExporters(
+            InstrumentedSpanExporter(NdjsonSpanExporter(args.directory)),
+            InstrumentedLogExporter(NdjsonLogExporter(args.directory)),
+            InstrumentedMetricExporter(NdjsonMetricExporter(args.directory)),
+        ),
+        metric_readers=[reader],
+        export_options=ExportOptions(
+            span_queue_max_size=args.span_queue_size,
+            log_queue_max_size=args.log_queue_size,
+        ),
+    )
+    logger.addHandler(AzureMonitor.azure_monitor_log_handler)
+
+    traced = handle_requests(args.requests)
+
+    trace.get_tracer_provider().force_flush()
+    AzureMonitor.azure_monitor_log_handler.flush()
+
+    print(f"requests:  {args.requests}, exported to {args.directory}")
+    print(f"baseline:  {baseline:9.1f}µs/request")
+    print(f"telemetry: {traced:9.1f}µs/request (+{traced - baseline:.1f}µs)")
+
+    values = telemetry_metrics(reader)
+    for signal in ["spans", "logs"]:
+        dropped = values.get(("app.telemetry.dropped", signal))
+        duration = values.get(("app.telemetry.export.duration", signal))
+        print(
+            f"{signal + ':':<10} dropped {dropped.value if dropped else 0:8}, "
+            f"{duration.count if duration else 0:5} exports "
+            f"{duration.sum / duration.count if duration else 0:8.1f}ms avg"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Throughput and latency of the uvicorn worker profiles.
+
+Starts gunicorn with `benchmarks._helper.app:app` once per `WORKER_PROFILE` and
+measures requests per second and latency percentiles of `GET /health` and an
+authenticated `GET /samples` with `--concurrency` keep-alive connections. The
+samples come from memory, so the numbers show the cost of the event loop, HTTP
+parser and middleware stack, not of Postgres. The load generator runs in this
+process, keep `--workers` below the number of cores to leave it one.
+
+Usage:
+    python -m benchmarks.worker_profiles --duration 10 --concurrency 64
+"""
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks._helper.stats import format_summary
+
+# the token accepted by benchmarks._helper.app
+ENDPOINTS = {
+    "GET /health": ("/health", {}),
+    "GET /samples": ("/samples/", {"Authorization": "Bearer benchmark"}),
+}
+
+ENV = {
+    "TENANT_ID": "00000000-0000-0000-0000-000000000000",
+    "OPENAPI_CLIENT_ID": "00000000-0000-0000-0000-000000000000",
+    "API_CLIENT_ID": "00000000-0000-0000-0000-000000000000",
+    "POSTGRES_CONNECTION_STRING": "postgresql://user@localhost:5432/main",
+    "ACCESS_LOG_ENABLED": "false",
+}
+
+
+def start_server(profile: str, workers: int, port: int) -> subprocess.Popen:
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "--config",
+            "gunicorn.conf.py",
+            "--bind",
+            f"127.0.0.1:{port}",
+            "benchmarks._helper.app:app",
+        ],
+        env={
+            **ENV,
+            **os.environ,
+            "WORKER_PROFILE": profile,
+            "WORKER_COUNT": str(workers),
+        },
+    )
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            response = await client.get("/health")
+            if response.status_code < 500:
+                return
+        except httpx.TransportError:
+            if time.monotonic() > deadline:
+                raise
+        await asyncio.sleep(0.1)
+
+
+async def load(
+    client: httpx.AsyncClient,
+    path: str,
+    headers: dict[str, str],
+    concurrency: int,
+    duration: float,
+) -> tuple[list[float], int]:
+    latencies: list[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def connection():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = await client.get(path, headers=headers)
+                if response.is_error:
+                    errors += 1
+            except httpx.TransportError:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(connection() for _ in range(concurrency)))
+    return latencies, errors
+
+
+async def benchmark(port: int, concurrency: int, duration: float, warmup: float):
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{port}",
+        limits=httpx.Limits(max_connections=concurrency),
+        timeout=30,
+    ) as client:
+        await wait_until_ready(client)
+
+        for name, (path, headers) in ENDPOINTS.items():
+            await load(client, path, headers, concurrency, warmup)
+            latencies, errors = await load(client, path, headers, concurrency, duration)
+            print(
+                f"  {format_summary(name, latencies)} "
+                f"rps={len(latencies) / duration:8.0f} errors={errors}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--profiles", nargs="+", default=["default", "throughput", "compat"]
+    )
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--warmup", type=float, default=2)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    for profile in args.profiles:
+        print(f"{profile} ({args.workers} workers):")
+        server = start_server(profile, args.workers, args.port)
+        try:
+            asyncio.run(
+                benchmark(args.port, args.concurrency, args.duration, args.warmup)
+            )
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
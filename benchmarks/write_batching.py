@@ -0,0 +1,93 @@
+"""Commit throughput and latency of sample creates with and without batching.
+
+Runs the same burst of concurrent creates once through `SampleRepository.create`
+(one transaction per item) and once through the `WriteBatcher` used when
+`SAMPLE_WRITE_BATCHING_ENABLED` is set.
+
+Usage:
+    alembic upgrade head
+    python -m benchmarks.write_batching --requests 20000 --concurrency 500
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.database.batching import WriteBatcher
+from app.database.tables import SampleTable
+from app.repositories.sample_repository import SampleRepository
+from benchmarks._helper.stats import format_summary
+
+
+async def run(create, requests: int, concurrency: int) -> tuple[list[float], float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def one(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            await create({"name": f"bench{i % 100000}", "description": "benchmark"})
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return latencies, time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--dsn",
+        default=os.environ.get("POSTGRES_CONNECTION_STRING"),
+        help="SQLAlchemy connection string. Defaults to $POSTGRES_CONNECTION_STRING",
+    )
+    parser.add_argument("--requests", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--max-delay-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    if not args.dsn:
+        parser.error("--dsn or POSTGRES_CONNECTION_STRING is required")
+
+    # same pool limits as app.database.session_factory
+    engine = create_async_engine(args.dsn, pool_size=5, max_overflow=10)
+    create_session = async_sessionmaker(engine, expire_on_commit=False)
+
+    commits = 0
+
+    @event.listens_for(engine.sync_engine, "commit")
+    def count_commit(conn):
+        nonlocal commits
+        commits += 1
+
+    async def create_single(values: dict):
+        async with create_session() as session:
+            return await SampleRepository(session).create(SampleTable(**values))
+
+    async def flush(batch: list[dict]):
+        async with create_session() as session:
+            return await SampleRepository(session).create_many(batch)
+
+    batcher = WriteBatcher(
+        flush, max_batch_size=args.batch_size, max_delay=args.max_delay_ms / 1000
+    )
+
+    for name, create in [("unbatched", create_single), ("batched", batcher.submit)]:
+        commits = 0
+        latencies, elapsed = await run(create, args.requests, args.concurrency)
+        print(
+            f"\n{name}: {args.requests / elapsed:.0f} creates/s, "
+            f"{commits} commits ({commits / elapsed:.0f}/s)"
+        )
+        print(format_summary(f"{name} create latency", latencies))
+
+    await batcher.close()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
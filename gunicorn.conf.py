@@ -1,6 +1,11 @@
+from typing import TYPE_CHECKING
+
 from app.config import get_settings
-from app.telemetry.azure_monitor import AzureMonitor
-from app.telemetry.otel import patch_otel
+
+# the telemetry modules pull in the OpenTelemetry SDK and the exporters, they are
+# imported by the hooks using them so loading the config stays cheap
+if TYPE_CHECKING:
+    from app.telemetry.memory import MemoryWatchdog
 
 # https://docs.gunicorn.org/en/stable/settings.html
 
@@ -8,25 +13,85 @@ settings = get_settings()
 
 loglevel = settings.GUNICORN_LOG_LEVEL.lower()
 errorlog = "-"  # stderr
-accesslog = "-"  # stdout
 
 workers = settings.WORKER_COUNT
 worker_class = "app.gunicorn_worker.HeadlessUvicornWorker"
 preload_app = True
 
-timeout = 30
-keepalive = 24 * 60 * 60  # 1 day because the app is deployed behind a load balancer
+# the jitter keeps the workers from restarting at the same moment
+max_requests = settings.WORKER_MAX_REQUESTS
+max_requests_jitter = settings.WORKER_MAX_REQUESTS_JITTER
+
+# the event loop and HTTP parser are set by the WORKER_PROFILE of the worker class
+backlog = settings.WORKER_BACKLOG
+timeout = settings.WORKER_TIMEOUT_S
+graceful_timeout = settings.WORKER_GRACEFUL_TIMEOUT_S
+keepalive = settings.WORKER_KEEPALIVE_S
+
+# started in each worker by post_fork
+memory_watchdog: "MemoryWatchdog | None" = None
+
+
+def on_starting(server):
+    from app.telemetry import prometheus
+
+    if settings.METRICS_ENDPOINT_ENABLED:
+        prometheus.clear(settings.METRICS_MULTIPROCESS_DIR)
 
 
 def post_fork(server, worker):
+    from app.telemetry.azure_monitor import AzureMonitor
+    from app.telemetry.export import ExportOptions, create_exporters
+    from app.telemetry.memory import create_memory_watchdog
+    from app.telemetry.metrics import create_metric_readers, init_metrics
+    from app.telemetry.otel import patch_otel
+    from app.telemetry.sampling import create_sampler
+
     server.log.info("Worker spawned with PID: %s", worker.pid)
 
     patch_otel(enable_system_metrics=settings.SYSTEM_METRICS_ENABLED)
     server.log.info("Applied OpenTelemetry Instrumentation")
 
-    if settings.APPLICATIONINSIGHTS_CONNECTION_STRING is not None:
+    metric_readers = create_metric_readers(settings)
+    exporters = create_exporters(settings)
+
+    if exporters is not None:
         AzureMonitor.init(
-            settings.APPLICATIONINSIGHTS_CONNECTION_STRING,
-            tracing_sampler_rate=settings.TRACING_SAMPLER_RATE,
+            exporters,
+            sampler=create_sampler(settings),
+            tail_sampling_latency_threshold=(
+                settings.TRACING_TAIL_LATENCY_THRESHOLD_MS / 1000
+                if settings.TRACING_TAIL_SAMPLING_ENABLED
+                else None
+            ),
+            tail_sampling_max_traces=settings.TRACING_TAIL_BUFFER_MAX_TRACES,
+            metric_readers=metric_readers,
+            export_options=ExportOptions.from_settings(settings),
         )
-        server.log.info("Initialized Azure Monitor Exporter")
+        server.log.info(
+            "Initialized %s telemetry exporter", settings.TELEMETRY_EXPORTER
+        )
+    elif metric_readers:
+        init_metrics(metric_readers)
+        server.log.info("Initialized local metrics")
+
+    global memory_watchdog
+    memory_watchdog = create_memory_watchdog(settings)
+    memory_watchdog.start()
+
+
+def worker_exit(server, worker):
+    from app.telemetry.logging import shutdown_logging
+
+    if memory_watchdog is not None:
+        memory_watchdog.stop()
+
+    # write the records still queued by the app
+    shutdown_logging()
+
+
+def child_exit(server, worker):
+    from app.telemetry import prometheus
+
+    if settings.METRICS_ENDPOINT_ENABLED:
+        prometheus.mark_process_dead(settings.METRICS_MULTIPROCESS_DIR, worker.pid)
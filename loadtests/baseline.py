@@ -0,0 +1,50 @@
+"""Comparison of load test results with the stored baseline."""
+import json
+from pathlib import Path
+
+Results = dict[str, dict[str, float]]
+
+
+def load(path: Path) -> dict | None:
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def save(path: Path, results: Results, options: dict):
+    path.write_text(
+        json.dumps({"options": options, "routes": results}, indent=2, sort_keys=True)
+        + "\n"
+    )
+
+
+def compare(results: Results, baseline: Results, threshold: float) -> list[str]:
+    """Returns the regressions of more than `threshold`, e.g. 0.2 for 20%.
+
+    Latency percentiles may not grow and the throughput may not drop by more than
+    the threshold, and routes without errors in the baseline must stay so.
+    """
+    regressions = []
+
+    for route, expected in baseline.items():
+        actual = results.get(route)
+        if actual is None or not actual["requests"]:
+            regressions.append(f"{route}: no requests")
+            continue
+
+        for percentile in ["p50", "p95", "p99"]:
+            if actual[percentile] > expected[percentile] * (1 + threshold):
+                regressions.append(
+                    f"{route}: {percentile} {actual[percentile]:.1f}ms > "
+                    f"{expected[percentile]:.1f}ms baseline"
+                )
+
+        if actual["rps"] < expected["rps"] * (1 - threshold):
+            regressions.append(
+                f"{route}: {actual['rps']:.0f} rps < {expected['rps']:.0f} rps baseline"
+            )
+
+        if actual["errors"] and not expected["errors"]:
+            regressions.append(f"{route}: {actual['errors']} errors")
+
+    return regressions
@@ -0,0 +1,119 @@
+"""A local OpenID Connect provider that signs RS256 access tokens.
+
+Serves the discovery document and the JSON Web Key Set the app loads from
+`OIDC_CONFIG_URL`, so tokens issued by `OidcStandIn.issue_token` pass the full
+`OidcAuthorizationCodeBearer` validation without Azure AD.
+"""
+import json
+import threading
+import time
+import uuid
+
+import jwt
+import uvicorn
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+SCOPE = "user_impersonation"
+
+
+class OidcStandIn:
+    def __init__(self, issuer: str, audience: str, tenant_id: str) -> None:
+        """Identity provider for load tests, its key pair is generated per instance.
+
+        Args:
+            issuer (str): The base URL the provider is served on, also the `iss`
+                claim.
+            audience (str): The `aud` claim, the `API_CLIENT_ID` of the app.
+            tenant_id (str): The `tid` claim.
+        """
+        self.issuer = issuer.rstrip("/")
+        self.audience = audience
+        self.tenant_id = tenant_id
+        self.key_id = uuid.uuid4().hex
+        self._private_key = rsa.generate_private_key(
+            public_exponent=65537, key_size=2048
+        )
+        self._server: uvicorn.Server | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def config_url(self) -> str:
+        return f"{self.issuer}/.well-known/openid-configuration"
+
+    def openid_configuration(self) -> dict:
+        return {
+            "issuer": self.issuer,
+            "authorization_endpoint": f"{self.issuer}/authorize",
+            "token_endpoint": f"{self.issuer}/token",
+            "jwks_uri": f"{self.issuer}/keys",
+            "id_token_signing_alg_values_supported": ["RS256"],
+        }
+
+    def jwks(self) -> dict:
+        jwk = json.loads(RSAAlgorithm.to_jwk(self._private_key.public_key()))
+        return {"keys": [{**jwk, "kid": self.key_id, "use": "sig", "alg": "RS256"}]}
+
+    def issue_token(
+        self,
+        subject: str,
+        name: str | None = None,
+        roles: list[str] | None = None,
+        lifetime: int = 3600,
+    ) -> str:
+        now = int(time.time())
+        claims = {
+            "iss": self.issuer,
+            "aud": self.audience,
+            "tid": self.tenant_id,
+            "sub": subject,
+            "oid": subject,
+            "name": name or subject,
+            "scp": SCOPE,
+            "roles": roles or [],
+            "iat": now,
+            "nbf": now,
+            "exp": now + lifetime,
+        }
+        return jwt.encode(
+            claims, self._private_key, algorithm="RS256", headers={"kid": self.key_id}
+        )
+
+    def create_app(self) -> Starlette:
+        async def openid_configuration(request: Request):
+            return JSONResponse(self.openid_configuration())
+
+        async def keys(request: Request):
+            return JSONResponse(self.jwks())
+
+        return Starlette(
+            routes=[
+                Route("/.well-known/openid-configuration", openid_configuration),
+                Route("/keys", keys),
+            ]
+        )
+
+    def start(self, host: str, port: int):
+        """Serves the provider on a background thread."""
+        self._server = uvicorn.Server(
+            uvicorn.Config(self.create_app(), host=host, port=port, log_level="warning")
+        )
+        self._thread = threading.Thread(
+            target=self._server.run, name="OidcStandIn", daemon=True
+        )
+        self._thread.start()
+
+        while not self._server.started:
+            if not self._thread.is_alive():
+                raise RuntimeError(f"The OIDC stand-in failed to start on port {port}")
+            time.sleep(0.05)
+
+    def stop(self):
+        if self._server is not None:
+            self._server.should_exit = True
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,157 @@
+"""The mixed read/write workload of the load tests.
+
+Each of the `concurrency` connections repeatedly picks an operation by weight
+and a virtual user. Every virtual user has its own token and client address
+(`X-Forwarded-For`), so the per-user rate limits behave like in production.
+"""
+import asyncio
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable
+
+import httpx
+
+from benchmarks._helper.stats import summarize
+
+
+@dataclass
+class VirtualUser:
+    token: str
+    address: str
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.token}",
+            "X-Forwarded-For": self.address,
+        }
+
+
+@dataclass
+class RouteResult:
+    latencies: list[float] = field(default_factory=list)
+    statuses: Counter = field(default_factory=Counter)
+
+    def summary(self, duration: float) -> dict[str, float]:
+        summary = summarize(self.latencies)
+        return {
+            "requests": len(self.latencies),
+            "rps": len(self.latencies) / duration,
+            "p50": summary["p50"],
+            "p95": summary["p95"],
+            "p99": summary["p99"],
+            # 0 is a transport error
+            "errors": sum(
+                count
+                for status, count in self.statuses.items()
+                if status >= 500 or status == 0
+            ),
+            "rate_limited": self.statuses[429],
+        }
+
+
+Operation = Callable[[httpx.AsyncClient, VirtualUser], Awaitable[httpx.Response]]
+
+
+class Workload:
+    def __init__(self, users: list[VirtualUser]) -> None:
+        self.users = users
+        self.sample_ids: list[int] = []
+
+        # route: (weight, operation)
+        self.operations: dict[str, tuple[int, Operation]] = {
+            "GET /samples/": (15, self.list_samples),
+            "GET /samples/{id}": (30, self.get_sample),
+            "GET /samples/search": (10, self.search_samples),
+            "GET /samples/stats": (5, self.get_stats),
+            "POST /samples/": (15, self.create_sample),
+            "PATCH /samples/{id}": (10, self.update_sample),
+            "DELETE /samples/{id}": (3, self.delete_sample),
+            "GET /users/greet": (12, self.greet),
+        }
+
+    async def list_samples(self, client: httpx.AsyncClient, user: VirtualUser):
+        created_after = datetime.now(timezone.utc) - timedelta(minutes=1)
+        return await client.get(
+            "/samples/",
+            params={"created_after": created_after.isoformat()},
+            headers=user.headers,
+        )
+
+    async def get_sample(self, client: httpx.AsyncClient, user: VirtualUser):
+        return await client.get(
+            f"/samples/{random.choice(self.sample_ids)}", headers=user.headers
+        )
+
+    async def search_samples(self, client: httpx.AsyncClient, user: VirtualUser):
+        return await client.get(
+            "/samples/search",
+            params={"q": random.choice(["load", "test", "sample"])},
+            headers=user.headers,
+        )
+
+    async def get_stats(self, client: httpx.AsyncClient, user: VirtualUser):
+        return await client.get(
+            "/samples/stats", params={"days": 7}, headers=user.headers
+        )
+
+    async def create_sample(self, client: httpx.AsyncClient, user: VirtualUser):
+        response = await client.post(
+            "/samples/",
+            json={
+                "name": f"lt{random.randrange(10**8):08d}",
+                "description": "load test sample",
+            },
+            headers=user.headers,
+        )
+        if response.status_code == 200:
+            self.sample_ids.append(response.json()["id"])
+        return response
+
+    async def update_sample(self, client: httpx.AsyncClient, user: VirtualUser):
+        return await client.patch(
+            f"/samples/{random.choice(self.sample_ids)}",
+            json={"description": f"load test sample updated {time.time()}"},
+            headers=user.headers,
+        )
+
+    async def delete_sample(self, client: httpx.AsyncClient, user: VirtualUser):
+        # keep the seeded samples for the reads
+        sample_id = self.sample_ids.pop() if len(self.sample_ids) > 1 else 0
+        return await client.delete(f"/samples/{sample_id}", headers=user.headers)
+
+    async def greet(self, client: httpx.AsyncClient, user: VirtualUser):
+        return await client.get("/users/greet", headers=user.headers)
+
+    async def seed(self, client: httpx.AsyncClient, samples: int):
+        for _ in range(samples):
+            response = await self.create_sample(client, random.choice(self.users))
+            response.raise_for_status()
+
+    async def run(
+        self, client: httpx.AsyncClient, concurrency: int, duration: float
+    ) -> dict[str, RouteResult]:
+        results = {route: RouteResult() for route in self.operations}
+        routes = list(self.operations)
+        weights = [weight for weight, _ in self.operations.values()]
+        deadline = time.perf_counter() + duration
+
+        async def connection():
+            while time.perf_counter() < deadline:
+                (route,) = random.choices(routes, weights)
+                _, operation = self.operations[route]
+
+                start = time.perf_counter()
+                try:
+                    response = await operation(client, random.choice(self.users))
+                    status = response.status_code
+                except httpx.TransportError:
+                    status = 0
+                results[route].latencies.append((time.perf_counter() - start) * 1000)
+                results[route].statuses[status] += 1
+
+        await asyncio.gather(*(connection() for _ in range(concurrency)))
+        return results
@@ -0,0 +1,55 @@
+"""Add Sample Search Indexes
+
+Revision ID: 5f2d8a1c3b7e
+Revises: c0bb98f10032
+Create Date: 2026-10-19 09:12:41.503117
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "5f2d8a1c3b7e"
+down_revision = "c0bb98f10032"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    op.add_column(
+        "sample",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+                "setweight(to_tsvector('english', coalesce(description, '')), 'B')",
+                persisted=True,
+            ),
+            nullable=False,
+        ),
+    )
+    op.create_index(
+        "ix_sample_search_vector",
+        "sample",
+        ["search_vector"],
+        unique=False,
+        postgresql_using="gin",
+    )
+    op.create_index(
+        "ix_sample_name_trgm",
+        "sample",
+        ["name"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_sample_name_trgm", table_name="sample")
+    op.drop_index("ix_sample_search_vector", table_name="sample")
+    op.drop_column("sample", "search_vector")
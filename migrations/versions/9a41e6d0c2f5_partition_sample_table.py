@@ -0,0 +1,147 @@
+"""Partition Sample Table
+
+Revision ID: 9a41e6d0c2f5
+Revises: 5f2d8a1c3b7e
+Create Date: 2026-10-19 10:02:17.731946
+
+Converts `sample` into a table range partitioned by month on `create_date`.
+Partitions are created for the months covered by existing rows and the
+upcoming months. `python -m app.database.maintenance` keeps them up to date.
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "9a41e6d0c2f5"
+down_revision = "5f2d8a1c3b7e"
+branch_labels = None
+depends_on = None
+
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+)
+
+PREMAKE_MONTHS = 3
+
+
+def _sample_columns():
+    return [
+        sa.Column(
+            "id",
+            sa.Integer(),
+            server_default=sa.text("nextval('sample_id_seq'::regclass)"),
+            nullable=False,
+        ),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("description", sa.String(), nullable=True),
+        sa.Column("create_date", sa.DateTime(), nullable=False),
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(SEARCH_VECTOR, persisted=True),
+            nullable=False,
+        ),
+    ]
+
+
+def _create_indexes():
+    op.create_index(op.f("ix_sample_id"), "sample", ["id"], unique=False)
+    op.create_index(
+        "ix_sample_search_vector",
+        "sample",
+        ["search_vector"],
+        unique=False,
+        postgresql_using="gin",
+    )
+    op.create_index(
+        "ix_sample_name_trgm",
+        "sample",
+        ["name"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    )
+
+
+def _drop_indexes():
+    op.drop_index("ix_sample_name_trgm", table_name="sample")
+    op.drop_index("ix_sample_search_vector", table_name="sample")
+    op.drop_index(op.f("ix_sample_id"), table_name="sample")
+
+
+def upgrade() -> None:
+    _drop_indexes()
+    op.rename_table("sample", "sample_unpartitioned")
+    op.execute(
+        "ALTER TABLE sample_unpartitioned "
+        "RENAME CONSTRAINT sample_pkey TO sample_unpartitioned_pkey"
+    )
+
+    op.create_table(
+        "sample",
+        *_sample_columns(),
+        sa.PrimaryKeyConstraint("id", "create_date"),
+        postgresql_partition_by="RANGE (create_date)",
+    )
+    op.execute("ALTER SEQUENCE sample_id_seq OWNED BY sample.id")
+
+    # rows outside of all monthly partitions end up here instead of failing, the
+    # partition maintenance moves them to their monthly partition once it exists
+    op.execute("CREATE TABLE sample_default PARTITION OF sample DEFAULT")
+    op.execute(
+        f"""
+        DO $$
+        DECLARE
+            partition_month date := date_trunc(
+                'month', coalesce((SELECT min(create_date) FROM sample_unpartitioned), now())
+            );
+            last_month date := date_trunc('month', now()) + interval '{PREMAKE_MONTHS} months';
+        BEGIN
+            WHILE partition_month <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF sample FOR VALUES FROM (%L) TO (%L)',
+                    'sample_p' || to_char(partition_month, 'YYYY_MM'),
+                    partition_month,
+                    partition_month + interval '1 month'
+                );
+                partition_month := partition_month + interval '1 month';
+            END LOOP;
+        END $$;
+        """
+    )
+
+    op.execute(
+        "INSERT INTO sample (id, name, description, create_date) "
+        "SELECT id, name, description, create_date FROM sample_unpartitioned"
+    )
+    op.drop_table("sample_unpartitioned")
+
+    _create_indexes()
+
+
+def downgrade() -> None:
+    _drop_indexes()
+    op.rename_table("sample", "sample_partitioned")
+    op.execute(
+        "ALTER TABLE sample_partitioned "
+        "RENAME CONSTRAINT sample_pkey TO sample_partitioned_pkey"
+    )
+
+    op.create_table(
+        "sample",
+        *_sample_columns(),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.execute("ALTER SEQUENCE sample_id_seq OWNED BY sample.id")
+
+    op.execute(
+        "INSERT INTO sample (id, name, description, create_date) "
+        "SELECT id, name, description, create_date FROM sample_partitioned"
+    )
+    # drops the attached partitions, detached ones are left untouched
+    op.drop_table("sample_partitioned")
+
+    _create_indexes()
@@ -0,0 +1,91 @@
+"""Add Sample Change Feed
+
+Revision ID: e3b8c4f1a6d2
+Revises: 9a41e6d0c2f5
+Create Date: 2026-10-19 14:37:52.184305
+
+Records every insert, update and delete of `sample` in `sample_change` and
+notifies the `sample_change` channel with the new row, from a trigger so all
+writers are covered. The trigger is cloned to all partitions of `sample`.
+`python -m app.database.maintenance` expires old changes.
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "e3b8c4f1a6d2"
+down_revision = "9a41e6d0c2f5"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "sample_change",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column("operation", sa.String(length=6), nullable=False),
+        sa.Column("sample_id", sa.Integer(), nullable=False),
+        sa.Column("sample", postgresql.JSONB(), nullable=True),
+        sa.Column(
+            "change_date", sa.DateTime(), server_default=sa.func.now(), nullable=False
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_sample_change_change_date"),
+        "sample_change",
+        ["change_date"],
+        unique=False,
+    )
+
+    # the payload stays far below the 8000 bytes limit of NOTIFY because name and
+    # description are bounded by the API
+    op.execute(
+        """
+        CREATE FUNCTION sample_change_notify() RETURNS trigger AS $$
+        DECLARE
+            change sample_change;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                INSERT INTO sample_change (operation, sample_id)
+                VALUES ('delete', OLD.id)
+                RETURNING * INTO change;
+            ELSE
+                INSERT INTO sample_change (operation, sample_id, sample)
+                VALUES (
+                    lower(TG_OP),
+                    NEW.id,
+                    jsonb_build_object(
+                        'id', NEW.id, 'name', NEW.name, 'description', NEW.description
+                    )
+                )
+                RETURNING * INTO change;
+            END IF;
+
+            PERFORM pg_notify(
+                'sample_change',
+                jsonb_build_object(
+                    'id', change.id,
+                    'operation', change.operation,
+                    'sample_id', change.sample_id,
+                    'sample', change.sample
+                )::text
+            );
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        "CREATE TRIGGER sample_change AFTER INSERT OR UPDATE OR DELETE ON sample "
+        "FOR EACH ROW EXECUTE FUNCTION sample_change_notify()"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER sample_change ON sample")
+    op.execute("DROP FUNCTION sample_change_notify()")
+    op.drop_index(op.f("ix_sample_change_change_date"), table_name="sample_change")
+    op.drop_table("sample_change")
@@ -3,18 +3,26 @@ from unittest.mock import patch
 
 from fastapi.testclient import TestClient
 
+from app.config import get_settings
 from tests._helper.security import MockSecurity
 from tests._helper.settings import base_mock_settings
 
 
+def get_mock_settings():
+    return base_mock_settings
+
+
 def setup_test_client(
     dependency_overrides: dict[Callable[..., Any], Callable[..., Any]] = {}
 ):
-    with patch("app.config.get_settings", return_value=base_mock_settings), patch(
+    with patch("app.config.get_settings", new=get_mock_settings), patch(
         "app.azure_scheme.AzureScheme",
         MockSecurity,
     ):
         from app.main import app
 
-        app.dependency_overrides = dependency_overrides
+        app.dependency_overrides = {
+            get_settings: get_mock_settings,
+            **dependency_overrides,
+        }
         return TestClient(app)
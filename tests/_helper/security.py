@@ -7,7 +7,7 @@ from app.packages.auth.user import User
 
 class MockSecurity:
     @classmethod
-    def init(cls, tenant_id: str, client_id: str):
+    def init(cls, tenant_id: str, client_id: str, config_url: str | None = None):
         pass
 
     @classmethod
@@ -6,4 +6,5 @@ base_mock_settings = Settings(
     OPENAPI_CLIENT_ID="00000000-0000-0000-0000-000000000000",
     API_CLIENT_ID="00000000-0000-0000-0000-000000000000",
     POSTGRES_CONNECTION_STRING="postgresql://user@example.com:5432/main",
+    PROFILING_ENABLED=True,
 )
@@ -0,0 +1,71 @@
+import json
+import logging
+import unittest
+from unittest.mock import patch
+
+from app.middleware import AccessLogFilter
+from app.telemetry.logging import ACCESS_LOGGER_NAME, LOG_FORMAT, LogFormatter
+from tests._helper.client import setup_test_client
+
+
+class TestAccessLogFilter(unittest.TestCase):
+    def test_is_excluded(self):
+        access_log_filter = AccessLogFilter(["GET /health", "/oauth2-redirect/"])
+
+        self.assertTrue(access_log_filter.is_excluded("GET", "/health"))
+        self.assertTrue(access_log_filter.is_excluded("GET", "/health/"))
+        self.assertFalse(access_log_filter.is_excluded("POST", "/health"))
+        self.assertTrue(access_log_filter.is_excluded("GET", "/oauth2-redirect"))
+        self.assertTrue(access_log_filter.is_excluded("POST", "/oauth2-redirect"))
+        self.assertFalse(access_log_filter.is_excluded("GET", "/samples"))
+
+    def test_should_log(self):
+        access_log_filter = AccessLogFilter(
+            success_sample_rate=0, slow_request_threshold=1
+        )
+
+        self.assertFalse(access_log_filter.should_log(200, 0.1))
+        self.assertFalse(access_log_filter.should_log(307, 0.1))
+        self.assertTrue(access_log_filter.should_log(200, 1.5))
+        self.assertTrue(access_log_filter.should_log(404, 0.1))
+        self.assertTrue(access_log_filter.should_log(500, 0.1))
+
+    def test_samples_successful_requests(self):
+        access_log_filter = AccessLogFilter(success_sample_rate=0.25)
+
+        with patch("app.middleware.access_log.random.random", side_effect=[0.2, 0.3]):
+            self.assertTrue(access_log_filter.should_log(200, 0.1))
+            self.assertFalse(access_log_filter.should_log(200, 0.1))
+
+
+class TestAccessLogMiddleware(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.client = setup_test_client()
+
+    def test_logs_requests(self):
+        with self.assertLogs(ACCESS_LOGGER_NAME, logging.INFO) as logs:
+            self.client.get("/health")
+            self.client.get("/error")
+
+        (record,) = logs.records
+        self.assertEqual(record.getMessage()[:15], "GET /error 500 ")
+        self.assertEqual(record.method, "GET")
+        self.assertEqual(record.path, "/error")
+        self.assertEqual(record.status_code, 500)
+        self.assertGreater(record.duration_ms, 0)
+
+    def test_formats_access_log_as_json(self):
+        formatter = LogFormatter(LOG_FORMAT)
+        record = logging.LogRecord(
+            ACCESS_LOGGER_NAME, logging.INFO, __file__, 1, "GET / 200", None, None
+        )
+        record.method = "GET"
+        record.duration_ms = 1.5
+
+        content = json.loads(formatter.format(record))
+
+        self.assertEqual(content["message"], "GET / 200")
+        self.assertEqual(content["method"], "GET")
+        self.assertEqual(content["duration_ms"], 1.5)
+        self.assertIsNone(content["trace_id"])
@@ -22,3 +22,15 @@ class TestApp(unittest.TestCase):
     def test_get_health(self):
         response = self.client.get("/health")
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_get_error_response_bytes(self):
+        response = self.client.get("/error")
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertEqual(response.content, b"Internal Server Error")
+        self.assertEqual(response.headers["content-type"], "text/plain; charset=utf-8")
+
+    def test_unauthorized_response_bytes(self):
+        response = self.client.get("/users/admin")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.content, b'{"detail":"Insufficient permissions"}')
+        self.assertEqual(response.headers["content-type"], "application/json")
@@ -0,0 +1,175 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi import status
+from fastapi.security import SecurityScopes
+from slowapi import Limiter
+from starlette.requests import Request
+
+from app.config import get_settings
+from app.database.tables.sample_table import SampleTable
+from app.limiter import _key_func
+from app.packages.auth import OidcAuthorizationCodeBearer, User
+from app.repositories import get_repository
+from app.repositories.sample_repository import SampleRepository
+from tests._helper.client import get_mock_settings, setup_test_client
+from tests._helper.settings import base_mock_settings
+
+
+class TestBatch(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.mock_sample_repository = AsyncMock(SampleRepository)
+        settings = base_mock_settings.copy(
+            update={"BATCH_MAX_REQUESTS": 3, "BATCH_MAX_CONCURRENCY": 2}
+        )
+        cls.client = setup_test_client(
+            {
+                get_repository(SampleRepository): lambda: cls.mock_sample_repository,
+                # the routes depend on either, depending on the import order
+                get_settings: lambda: settings,
+                get_mock_settings: lambda: settings,
+            }
+        )
+
+    def tearDown(self):
+        self.mock_sample_repository.reset_mock(return_value=True, side_effect=True)
+
+    def post_batch(self, *requests: dict):
+        return self.client.post("/batch", json={"requests": list(requests)})
+
+    def test_batch(self):
+        # Arrange
+        self.mock_sample_repository.get_by_id.side_effect = lambda id, fields: (
+            SampleTable(id=id, name="test1") if id == 1 else None
+        )
+        self.mock_sample_repository.create.return_value = SampleTable(
+            id=3, name="test3"
+        )
+
+        # Act
+        response = self.post_batch(
+            {"path": "/samples/1"},
+            {"path": "/samples/2?fields=name"},
+            {"method": "POST", "path": "/samples/", "body": {"name": "test3"}},
+        )
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json()["responses"],
+            [
+                {
+                    "status": 200,
+                    "body": {"id": 1, "name": "test1", "description": None},
+                },
+                {"status": 404, "body": {"detail": "Item not found"}},
+                {
+                    "status": 200,
+                    "body": {"id": 3, "name": "test3", "description": None},
+                },
+            ],
+        )
+        self.mock_sample_repository.get_by_id.assert_any_call(
+            2, fields=frozenset({"id", "name"})
+        )
+
+    def test_limits_batch_size(self):
+        # Act
+        response = self.post_batch(*[{"path": f"/samples/{id}"} for id in range(4)])
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {"detail": "At most 3 requests per batch"})
+        self.mock_sample_repository.get_by_id.assert_not_called()
+
+    def test_rejects_nested_batch(self):
+        # Act
+        response = self.post_batch(
+            {
+                "method": "POST",
+                "path": "/batch",
+                "body": {"requests": [{"path": "/samples/1"}]},
+            }
+        )
+
+        # Assert
+        (item,) = response.json()["responses"]
+        self.assertEqual(item["status"], status.HTTP_400_BAD_REQUEST)
+
+    def test_unexpected_error(self):
+        # Arrange
+        self.mock_sample_repository.get_by_id.side_effect = RuntimeError()
+
+        # Act
+        with self.assertLogs("app.batch", "ERROR"):
+            response = self.post_batch({"path": "/samples/1"})
+
+        # Assert
+        (item,) = response.json()["responses"]
+        self.assertEqual(
+            item, {"status": 500, "body": {"detail": "Internal Server Error"}}
+        )
+
+    def test_charges_rate_limit_per_request(self):
+        # Arrange
+        self.mock_sample_repository.get_by_id.return_value = SampleTable(
+            id=1, name="test1"
+        )
+        limiter = Limiter(key_func=_key_func, default_limits=["2/minute"])
+
+        # Act
+        with patch.object(self.client.app.state, "limiter", limiter):
+            response = self.post_batch(*[{"path": "/samples/1"}] * 3)
+
+        # Assert
+        self.assertEqual(
+            [item["status"] for item in response.json()["responses"]],
+            [200, 200, 429],
+        )
+        self.assertEqual(self.mock_sample_repository.get_by_id.await_count, 2)
+
+    def test_limits_concurrency(self):
+        # Arrange
+        running = 0
+        max_running = 0
+
+        async def get_by_id(id, fields):
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return SampleTable(id=id, name="test")
+
+        self.mock_sample_repository.get_by_id.side_effect = get_by_id
+
+        # Act
+        response = self.post_batch(*[{"path": f"/samples/{id}"} for id in range(3)])
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(max_running, 2)
+
+
+class TestReuseAuthentication(unittest.IsolatedAsyncioTestCase):
+    async def test_skips_verification_of_authenticated_token(self):
+        # Arrange
+        scheme = OidcAuthorizationCodeBearer("https://example.com", "client_id")
+        scheme.openid_config.load_config = AsyncMock()
+        scheme._oauth = AsyncMock(return_value="token")
+        scheme._verify = MagicMock()
+
+        claims = {"aud": "aud", "tid": "tid", "scp": "user_impersonation"}
+        request = Request({"type": "http", "headers": []})
+        request.state.user = User(**claims, claims=claims, access_token="token")
+
+        # Act
+        user = await scheme._authenticate(
+            request, SecurityScopes(["user_impersonation"])
+        )
+
+        # Assert
+        self.assertEqual(user.claims, claims)
+        scheme._verify.assert_not_called()
@@ -0,0 +1,94 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.database.batching import WriteBatcher
+from app.database.tables.sample_table import SampleTable
+from app.repositories.sample_repository import SampleRepository
+
+
+class TestWriteBatcher(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.batches: list[list[int]] = []
+
+    async def flush(self, items: list[int]) -> list[int]:
+        self.batches.append(items)
+        if any(item < 0 for item in items):
+            raise ValueError("negative item")
+        return [item * 2 for item in items]
+
+    async def test_flushes_full_batch_without_waiting(self):
+        batcher = WriteBatcher(self.flush, max_batch_size=3, max_delay=60)
+
+        results = await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(i) for i in range(3))), timeout=1
+        )
+
+        self.assertEqual(results, [0, 2, 4])
+        self.assertEqual(self.batches, [[0, 1, 2]])
+
+    async def test_flushes_partial_batch_after_delay(self):
+        batcher = WriteBatcher(self.flush, max_batch_size=100, max_delay=0.01)
+
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+
+        self.assertEqual(results, [0, 2, 4, 6, 8])
+        self.assertEqual(self.batches, [[0, 1, 2, 3, 4]])
+
+    async def test_failed_batch_isolates_errors(self):
+        batcher = WriteBatcher(self.flush, max_batch_size=3, max_delay=60)
+
+        results = await asyncio.gather(
+            batcher.submit(1),
+            batcher.submit(-1),
+            batcher.submit(3),
+            return_exceptions=True,
+        )
+
+        self.assertEqual(results[0], 2)
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual(results[2], 6)
+        self.assertEqual(self.batches, [[1, -1, 3], [1], [-1], [3]])
+
+    async def test_close_flushes_pending_items(self):
+        batcher = WriteBatcher(self.flush, max_batch_size=100, max_delay=60)
+
+        pending = asyncio.ensure_future(batcher.submit(1))
+        await asyncio.sleep(0)
+        await batcher.close()
+
+        self.assertEqual(await pending, 2)
+
+    async def test_close_all(self):
+        batcher = WriteBatcher(self.flush, max_batch_size=100, max_delay=60)
+
+        pending = asyncio.ensure_future(batcher.submit(1))
+        await asyncio.sleep(0)
+        await WriteBatcher.close_all()
+
+        self.assertEqual(await pending, 2)
+
+
+class TestCreateMany(unittest.IsolatedAsyncioTestCase):
+    async def test_matches_rows_by_id(self):
+        # Arrange
+        db = AsyncMock()
+        ids, rows = MagicMock(), MagicMock()
+        ids.all.return_value = [11, 12]
+        # RETURNING doesn't keep the order of the VALUES
+        rows.all.return_value = [
+            SampleTable(id=12, name="second"),
+            SampleTable(id=11, name="first"),
+        ]
+        db.scalars.side_effect = [ids, rows]
+
+        # Act
+        items = await SampleRepository(db).create_many(
+            [{"name": "first"}, {"name": "second"}]
+        )
+
+        # Assert
+        self.assertEqual(
+            [(item.id, item.name) for item in items], [(11, "first"), (12, "second")]
+        )
+        db.commit.assert_awaited_once()
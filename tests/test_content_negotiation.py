@@ -0,0 +1,46 @@
+import unittest
+from datetime import date
+
+import msgpack
+
+from app.content_negotiation import JSON, MSGPACK, negotiate
+from app.models.sample import SampleStats
+
+try:
+    import cbor2
+
+    from app.content_negotiation import CBOR
+except ModuleNotFoundError:  # pragma: no cover
+    cbor2 = None
+
+
+STATS = SampleStats(
+    total={"value": 1, "exact": True},
+    per_day=[{"day": date(2022, 11, 12), "value": 1, "exact": True}],
+)
+
+
+class TestNegotiate(unittest.TestCase):
+    def test_negotiate(self):
+        self.assertIs(negotiate(None), JSON)
+        self.assertIs(negotiate("*/*"), JSON)
+        self.assertIs(negotiate("text/html"), JSON)
+        self.assertIs(negotiate("application/msgpack"), MSGPACK)
+        self.assertIs(negotiate("application/x-msgpack"), MSGPACK)
+        self.assertIs(negotiate("*/*, application/msgpack"), MSGPACK)
+        self.assertIs(negotiate("application/msgpack;q=0.5, application/json"), JSON)
+        self.assertIs(negotiate("application/json;q=0, application/msgpack"), MSGPACK)
+        self.assertIs(negotiate("application/msgpack;q=0"), JSON)
+        self.assertIs(negotiate("application/msgpack;q=invalid"), JSON)
+
+    def test_msgpack_round_trip(self):
+        content = msgpack.unpackb(MSGPACK.encode(STATS))
+        self.assertEqual(content["per_day"][0]["day"], "2022-11-12")
+        self.assertEqual(SampleStats.parse_obj(content), STATS)
+
+    @unittest.skipIf(cbor2 is None, "cbor2 is not installed")
+    def test_cbor(self):
+        self.assertIs(negotiate("application/cbor"), CBOR)
+        content = cbor2.loads(CBOR.encode(STATS))
+        self.assertEqual(content["per_day"][0]["day"], "2022-11-12")
+        self.assertEqual(SampleStats.parse_obj(content), STATS)
@@ -0,0 +1,70 @@
+import asyncio
+import logging
+import time
+import unittest
+from unittest.mock import patch
+
+from app.telemetry.event_loop import EventLoopMonitor, create_event_loop_monitor
+from tests._helper.settings import base_mock_settings
+
+
+def block_event_loop(seconds: float):
+    time.sleep(seconds)
+
+
+async def run_monitored(monitor: EventLoopMonitor):
+    monitor.start()
+    try:
+        await asyncio.sleep(0.05)
+        block_event_loop(0.2)
+        await asyncio.sleep(0.05)
+        block_event_loop(0.2)
+        await asyncio.sleep(0.05)
+    finally:
+        monitor.stop()
+
+
+@patch("app.telemetry.event_loop.event_loop_blocked")
+@patch("app.telemetry.event_loop.event_loop_lag")
+class TestEventLoopMonitor(unittest.TestCase):
+    def test_records_lag_and_blocking_callbacks(
+        self, event_loop_lag, event_loop_blocked
+    ):
+        # Arrange
+        monitor = EventLoopMonitor(
+            interval=0.01, slow_callback_threshold=0.05, stack_report_interval=10
+        )
+
+        # Act
+        with self.assertLogs("app.telemetry.event_loop", logging.WARNING) as logs:
+            asyncio.run(run_monitored(monitor))
+
+        # Assert
+        lags = [call.args[0] for call in event_loop_lag.record.call_args_list]
+        self.assertGreater(len(lags), 2)
+        self.assertGreater(max(lags), 150)
+
+        self.assertEqual(event_loop_blocked.add.call_count, 2)
+
+        # the second stack is rate limited
+        (record,) = logs.records
+        self.assertIn("The event loop is blocked for", record.getMessage())
+        self.assertIn("in block_event_loop", record.getMessage())
+
+    def test_samples_stacks(self, event_loop_lag, event_loop_blocked):
+        # Arrange
+        monitor = EventLoopMonitor(
+            interval=0.01, slow_callback_threshold=0.05, stack_sample_rate=0
+        )
+
+        # Act
+        with self.assertNoLogs("app.telemetry.event_loop", logging.WARNING):
+            asyncio.run(run_monitored(monitor))
+
+        # Assert
+        self.assertEqual(event_loop_blocked.add.call_count, 2)
+
+    def test_disabled(self, event_loop_lag, event_loop_blocked):
+        settings = base_mock_settings.copy(update={"EVENT_LOOP_MONITOR_ENABLED": False})
+
+        self.assertIsNone(create_event_loop_monitor(settings))
@@ -0,0 +1,134 @@
+import json
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from opentelemetry.sdk._logs.export import LogExporter, LogExportResult
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import (
+    SimpleSpanProcessor,
+    SpanExporter,
+    SpanExportResult,
+)
+
+from app.telemetry.export import (
+    BoundedBatchLogRecordProcessor,
+    InstrumentedSpanExporter,
+    NdjsonSpanExporter,
+    ObservableBatchSpanProcessor,
+    create_exporters,
+)
+from tests._helper.settings import base_mock_settings
+
+
+class BlockingExporter(SpanExporter, LogExporter):
+    """Blocks the export thread of a batch processor in its first export."""
+
+    def __init__(self, result):
+        self.result = result
+        self.exporting = threading.Event()
+        self.released = threading.Event()
+
+    def export(self, batch):
+        self.exporting.set()
+        self.released.wait(5)
+        return self.result
+
+    def shutdown(self):
+        pass
+
+
+class TestExporters(unittest.TestCase):
+    def test_create_exporters(self):
+        # Arrange
+        directory = tempfile.mkdtemp()
+        settings = base_mock_settings.copy(
+            update={"TELEMETRY_EXPORTER": "file", "TELEMETRY_EXPORT_DIR": directory}
+        )
+
+        # Act
+        exporters = create_exporters(settings)
+
+        # Assert
+        self.assertIsInstance(exporters.span_exporter, InstrumentedSpanExporter)
+        self.assertIsInstance(exporters.span_exporter.exporter, NdjsonSpanExporter)
+        self.assertIsNone(create_exporters(base_mock_settings))
+
+    @patch("app.telemetry.export.telemetry_export_duration")
+    def test_ndjson_span_exporter(self, telemetry_export_duration):
+        # Arrange
+        directory = tempfile.mkdtemp()
+        provider = TracerProvider()
+        provider.add_span_processor(
+            SimpleSpanProcessor(InstrumentedSpanExporter(NdjsonSpanExporter(directory)))
+        )
+        tracer = provider.get_tracer(__name__)
+
+        # Act
+        for name in ["/samples", "/users/greet"]:
+            with tracer.start_as_current_span(name):
+                pass
+
+        # Assert
+        (path,) = Path(directory).iterdir()
+        self.assertRegex(path.name, r"^spans-\d+\.ndjson$")
+        lines = path.read_text().splitlines()
+        self.assertEqual(
+            [json.loads(line)["name"] for line in lines], ["/samples", "/users/greet"]
+        )
+
+        self.assertEqual(telemetry_export_duration.record.call_count, 2)
+        _, attributes = telemetry_export_duration.record.call_args.args
+        self.assertEqual(attributes, {"signal": "spans", "success": True})
+
+
+@patch("app.telemetry.export.telemetry_dropped")
+class TestBatchProcessors(unittest.TestCase):
+    def test_span_processor_counts_dropped_spans(self, telemetry_dropped):
+        # Arrange
+        exporter = BlockingExporter(SpanExportResult.SUCCESS)
+        processor = ObservableBatchSpanProcessor(
+            exporter, max_queue_size=2, max_export_batch_size=2
+        )
+        provider = TracerProvider()
+        provider.add_span_processor(processor)
+        tracer = provider.get_tracer(__name__)
+
+        # Act
+        for _ in range(2):
+            tracer.start_span("exported").end()
+        exporter.exporting.wait(5)
+
+        for _ in range(3):
+            tracer.start_span("queued").end()
+
+        # Assert
+        telemetry_dropped.add.assert_called_once_with(1, {"signal": "spans"})
+        self.assertEqual(len(processor.queue), 2)
+
+        exporter.released.set()
+        processor.shutdown()
+
+    def test_log_processor_is_bounded(self, telemetry_dropped):
+        # Arrange
+        exporter = BlockingExporter(LogExportResult.SUCCESS)
+        processor = BoundedBatchLogRecordProcessor(
+            exporter, max_queue_size=2, max_export_batch_size=2
+        )
+
+        # Act
+        for _ in range(2):
+            processor.emit(MagicMock())
+        exporter.exporting.wait(5)
+
+        for _ in range(3):
+            processor.emit(MagicMock())
+
+        # Assert
+        telemetry_dropped.add.assert_called_once_with(1, {"signal": "logs"})
+        self.assertEqual(len(processor._queue), 2)
+
+        exporter.released.set()
+        processor.shutdown()
@@ -0,0 +1,93 @@
+import unittest
+from unittest.mock import MagicMock
+
+import orjson
+from fastapi import HTTPException
+from sqlalchemy.dialects import postgresql
+
+from app.database.tables import SampleTable
+from app.fieldsets import Fieldset, partial_model, sparse_response
+from app.models.sample import Sample
+from app.repositories import fields_result, select_fields
+
+
+class TestFieldset(unittest.TestCase):
+    def test_all_fields_without_parameter(self):
+        self.assertIsNone(Fieldset(Sample)(None))
+
+    def test_selected_and_required_fields(self):
+        # Act
+        fields = Fieldset(Sample)(" name, description ,")
+
+        # Assert
+        self.assertEqual(fields, {"id", "name", "description"})
+
+    def test_unknown_fields(self):
+        # Act
+        with self.assertRaises(HTTPException) as context:
+            Fieldset(Sample)("name,create_date,search_vector")
+
+        # Assert
+        self.assertEqual(context.exception.status_code, 400)
+        self.assertEqual(
+            context.exception.detail, "Unknown fields: create_date, search_vector"
+        )
+
+    def test_partial_model(self):
+        # Act
+        model = partial_model(Sample)
+        item = model.parse_obj({"id": 1, "name": "test1"})
+
+        # Assert
+        self.assertIs(partial_model(Sample), model)
+        self.assertEqual(item.dict(exclude_unset=True), {"id": 1, "name": "test1"})
+        self.assertEqual(
+            model.from_orm(SampleTable(id=1, name="test1")).dict(exclude_unset=True),
+            {"id": 1, "name": "test1", "description": None},
+        )
+
+    def test_sparse_response(self):
+        # Act
+        response = sparse_response(Sample, [{"id": "1", "name": "test1"}])
+
+        # Assert
+        self.assertEqual(orjson.loads(response.body), [{"id": 1, "name": "test1"}])
+
+
+class TestSelectFields(unittest.TestCase):
+    def compile(self, query) -> str:
+        return str(query.compile(dialect=postgresql.dialect()))
+
+    def test_selects_only_the_fields(self):
+        # Act
+        first = select_fields(SampleTable, ["name", "id"])
+        second = select_fields(SampleTable, {"id", "name"})
+
+        # Assert
+        self.assertEqual(
+            self.compile(first), "SELECT sample.id, sample.name \nFROM sample"
+        )
+        self.assertEqual(self.compile(first), self.compile(second))
+
+    def test_selects_entity_without_fields(self):
+        # Act
+        query = select_fields(SampleTable)
+
+        # Assert
+        self.assertIn("sample.create_date", self.compile(query))
+
+    def test_unknown_columns(self):
+        with self.assertRaises(ValueError):
+            select_fields(SampleTable, ["id", "secret"])
+
+    def test_fields_result(self):
+        # Arrange
+        result = MagicMock()
+        result.mappings.return_value = [{"id": 1, "name": "test1"}]
+
+        # Act
+        rows = fields_result(result, {"id", "name"})
+
+        # Assert
+        self.assertEqual(rows, [{"id": 1, "name": "test1"}])
+        result.scalars.assert_not_called()
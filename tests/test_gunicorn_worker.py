@@ -0,0 +1,40 @@
+import unittest
+
+from app.gunicorn_worker import worker_config_kwargs
+from tests._helper.settings import base_mock_settings
+
+
+class TestWorkerConfig(unittest.TestCase):
+    def test_profiles(self):
+        for profile, loop, http in [
+            ("default", "auto", "auto"),
+            ("throughput", "uvloop", "httptools"),
+            ("compat", "asyncio", "h11"),
+        ]:
+            with self.subTest(profile):
+                # Arrange
+                settings = base_mock_settings.copy(update={"WORKER_PROFILE": profile})
+
+                # Act
+                config_kwargs = worker_config_kwargs(settings)
+
+                # Assert
+                self.assertEqual(config_kwargs, {"loop": loop, "http": http})
+
+    def test_overrides(self):
+        # Arrange
+        settings = base_mock_settings.copy(
+            update={
+                "WORKER_PROFILE": "compat",
+                "WORKER_LIMIT_CONCURRENCY": 1000,
+                "WORKER_H11_MAX_INCOMPLETE_EVENT_SIZE": 65536,
+            }
+        )
+
+        # Act
+        config_kwargs = worker_config_kwargs(settings)
+
+        # Assert
+        self.assertEqual(config_kwargs["loop"], "asyncio")
+        self.assertEqual(config_kwargs["limit_concurrency"], 1000)
+        self.assertEqual(config_kwargs["h11_max_incomplete_event_size"], 65536)
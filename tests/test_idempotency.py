@@ -0,0 +1,201 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock
+
+from fastapi import HTTPException, status
+from starlette.requests import Request
+
+from app.config import get_settings
+from app.database.tables.sample_table import SampleTable
+from app.idempotency import (
+    Idempotency,
+    IdempotentReplayException,
+    MemoryIdempotencyStore,
+    Record,
+    RedisIdempotencyStore,
+    StoredResponse,
+    get_idempotency_store,
+)
+from app.packages.auth import User
+from app.repositories import get_repository
+from app.repositories.sample_repository import SampleRepository
+from tests._helper.client import get_mock_settings, setup_test_client
+from tests._helper.settings import base_mock_settings
+from tests.test_jobs import create_redis
+
+
+def create_request(body: bytes = b"{}", oid: str = "oid") -> Request:
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    request = Request(
+        {"type": "http", "method": "POST", "path": "/samples/", "headers": []},
+        receive,
+    )
+    claims = {"aud": "aud", "tid": "tid", "oid": oid}
+    request.state.user = User(**claims, claims=claims, access_token="token")
+    return request
+
+
+class TestRedisIdempotencyStore(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.redis = create_redis()
+        self.store = RedisIdempotencyStore(self.redis)
+
+    async def asyncTearDown(self):
+        await self.redis.flushdb()
+        await self.redis.close()
+
+    async def test_claims_once(self):
+        # Act
+        claimed = await self.store.claim("key", "fingerprint", 60)
+        record = await self.store.claim("key", "other", 60)
+
+        # Assert
+        self.assertIsNone(claimed)
+        self.assertEqual(record, Record("fingerprint"))
+        self.assertGreater(await self.redis.pttl("key"), 0)
+
+    async def test_complete_and_release(self):
+        # Arrange
+        response = StoredResponse(201, [("content-type", "text/plain")], b"\x00body")
+        await self.store.claim("key", "fingerprint", 60)
+
+        # Act
+        await self.store.complete("key", Record("fingerprint", response), 3600)
+        completed = await self.store.claim("key", "fingerprint", 60)
+        await self.store.release("key")
+        released = await self.store.claim("key", "fingerprint", 60)
+
+        # Assert
+        self.assertEqual(completed, Record("fingerprint", response))
+        self.assertIsNone(released)
+
+
+class TestIdempotencyDependency(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.store = MemoryIdempotencyStore()
+        self.settings = base_mock_settings.copy(
+            update={"IDEMPOTENCY_WAIT_TIMEOUT_S": 1}
+        )
+        self.dependency = Idempotency(poll_interval=0.01)
+
+    async def call(self, request: Request, key: str = "key"):
+        await self.dependency(request, key, self.settings, self.store)
+
+    async def test_duplicate_waits_for_original(self):
+        # Arrange
+        original = create_request()
+        await self.call(original)
+
+        # Act
+        duplicate = asyncio.create_task(self.call(create_request()))
+        await asyncio.sleep(0.05)
+        self.assertFalse(duplicate.done())
+        await original.state.idempotency.complete(StoredResponse(200, [], b"{}"))
+
+        # Assert
+        with self.assertRaises(IdempotentReplayException) as context:
+            await duplicate
+        self.assertEqual(context.exception.response.body, b"{}")
+
+    async def test_times_out_waiting(self):
+        # Arrange
+        self.settings = self.settings.copy(update={"IDEMPOTENCY_WAIT_TIMEOUT_S": 0})
+        await self.call(create_request())
+
+        # Act
+        with self.assertRaises(HTTPException) as context:
+            await self.call(create_request())
+
+        # Assert
+        self.assertEqual(context.exception.status_code, status.HTTP_409_CONFLICT)
+
+    async def test_scoped_to_user(self):
+        # Arrange
+        await self.call(create_request(oid="first"))
+        request = create_request(oid="second")
+
+        # Act
+        await self.call(request)
+
+        # Assert
+        self.assertEqual(request.state.idempotency.key, "idempotency:second:key")
+
+
+class TestIdempotencyEndpoint(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.mock_sample_repository = AsyncMock(SampleRepository)
+        settings = base_mock_settings.copy(update={"IDEMPOTENCY_WAIT_TIMEOUT_S": 0})
+        cls.client = setup_test_client(
+            {
+                get_repository(SampleRepository): lambda: cls.mock_sample_repository,
+                get_idempotency_store: lambda: cls.store,
+                # the routes depend on either, depending on the import order
+                get_settings: lambda: settings,
+                get_mock_settings: lambda: settings,
+            }
+        )
+
+    def setUp(self):
+        type(self).store = MemoryIdempotencyStore()
+        self.mock_sample_repository.create.return_value = SampleTable(id=1, name="test")
+
+    def tearDown(self):
+        self.mock_sample_repository.reset_mock(return_value=True, side_effect=True)
+
+    def post(self, body: dict, key: str | None = "key"):
+        headers = {"Idempotency-Key": key} if key is not None else {}
+        return self.client.post("/samples/", json=body, headers=headers)
+
+    def test_replays_response(self):
+        # Act
+        first = self.post({"name": "test"})
+        second = self.post({"name": "test"})
+
+        # Assert
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertNotIn("idempotent-replayed", first.headers)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second.headers["idempotent-replayed"], "true")
+        self.assertEqual(second.headers["content-type"], first.headers["content-type"])
+        self.mock_sample_repository.create.assert_awaited_once()
+
+    def test_rejects_different_body(self):
+        # Arrange
+        self.post({"name": "test"})
+
+        # Act
+        response = self.post({"name": "other"})
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.mock_sample_repository.create.assert_awaited_once()
+
+    def test_without_key(self):
+        # Act
+        self.post({"name": "test"}, key=None)
+        self.post({"name": "test"}, key=None)
+
+        # Assert
+        self.assertEqual(self.mock_sample_repository.create.await_count, 2)
+
+    def test_releases_key_on_error(self):
+        # Arrange
+        self.mock_sample_repository.create.side_effect = [
+            RuntimeError(),
+            SampleTable(id=1, name="test"),
+        ]
+
+        # Act
+        with self.assertLogs("app.middleware.uncaught_exception_handler"):
+            failed = self.post({"name": "test"})
+        response = self.post({"name": "test"})
+
+        # Assert
+        self.assertEqual(failed.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("idempotent-replayed", response.headers)
+        self.assertEqual(self.mock_sample_repository.create.await_count, 2)
@@ -0,0 +1,355 @@
+import asyncio
+import json
+import os
+import time
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from redis.asyncio import Redis
+
+from app.database.tables.sample_table import SampleTable
+from app.jobs.queue import JobQueue, get_job_queue
+from app.jobs.registry import JobRegistry
+from app.jobs.worker import JobWorker, create_job_worker
+from app.models.sample import SampleCreate
+from app.services.sample_service import SampleService
+from tests._helper.settings import base_mock_settings
+
+
+def create_redis() -> Redis:
+    # TEST_REDIS_CONNECTION_STRING runs the tests against a Redis server
+    connection_string = os.environ.get("TEST_REDIS_CONNECTION_STRING")
+    if connection_string is not None:
+        return Redis.from_url(connection_string)
+
+    from fakeredis.aioredis import FakeRedis
+
+    return FakeRedis()
+
+
+class TestJobQueue(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.redis = create_redis()
+        self.queue = JobQueue(self.redis, name="test")
+
+    async def asyncTearDown(self):
+        await self.redis.flushdb()
+        await self.redis.close()
+
+    async def test_enqueue_and_dequeue(self):
+        # Arrange
+        job_id = await self.queue.enqueue("samples.created", {"id": 1})
+
+        # Act
+        (job,) = await self.queue.dequeue(10, lease=60)
+
+        # Assert
+        self.assertEqual(job.id, job_id)
+        self.assertEqual(
+            (job.name, job.args, job.attempts), ("samples.created", {"id": 1}, 1)
+        )
+        self.assertEqual(await self.queue.size(), 0)
+        self.assertEqual(await self.queue.dequeue(10, lease=60), [])
+
+    async def test_deduplicates_queued_jobs(self):
+        # Act
+        first = await self.queue.enqueue("samples.created", dedupe_key="sample:1")
+        second = await self.queue.enqueue("samples.created", dedupe_key="sample:1")
+
+        # Assert
+        self.assertEqual(first, "sample:1")
+        self.assertIsNone(second)
+        self.assertEqual(await self.queue.size(), 1)
+
+    async def test_enqueues_again_after_completion(self):
+        # Arrange
+        await self.queue.enqueue("samples.created", dedupe_key="sample:1")
+        (job,) = await self.queue.dequeue(1, lease=60)
+
+        # Act
+        await self.queue.complete(job)
+        job_id = await self.queue.enqueue("samples.created", dedupe_key="sample:1")
+
+        # Assert
+        self.assertEqual(job_id, "sample:1")
+
+    async def test_delayed_job(self):
+        # Arrange
+        await self.queue.enqueue("samples.created", delay=0.1)
+
+        # Act
+        before = await self.queue.dequeue(1, lease=60)
+        await asyncio.sleep(0.15)
+        after = await self.queue.dequeue(1, lease=60)
+
+        # Assert
+        self.assertEqual(before, [])
+        self.assertEqual(len(after), 1)
+
+    async def test_requeues_jobs_with_expired_lease(self):
+        # Arrange
+        await self.queue.enqueue("samples.created")
+        (job,) = await self.queue.dequeue(1, lease=0.05)
+
+        # Act
+        await asyncio.sleep(0.1)
+        (requeued,) = await self.queue.dequeue(1, lease=60)
+
+        # Assert
+        self.assertEqual(requeued.id, job.id)
+        self.assertEqual(requeued.attempts, 2)
+
+    async def test_skips_completed_jobs_with_expired_lease(self):
+        # Arrange
+        await self.queue.enqueue("samples.created", dedupe_key="sample:1")
+        (job,) = await self.queue.dequeue(1, lease=0.05)
+        await asyncio.sleep(0.1)
+        (requeued,) = await self.queue.dequeue(1, lease=0.05)
+        await asyncio.sleep(0.1)
+
+        # Act
+        # the first worker finishes after the second one took over
+        await self.queue.complete(job)
+        dequeued = await self.queue.dequeue(1, lease=60)
+
+        # Assert
+        self.assertEqual(dequeued, [])
+        self.assertFalse(await self.redis.exists(self.queue.job_key(job.id)))
+        self.assertEqual(await self.redis.zcard(self.queue.running_key), 0)
+        self.assertEqual(
+            await self.queue.enqueue("samples.created", dedupe_key="sample:1"),
+            "sample:1",
+        )
+
+    async def test_fail_keeps_dead_job(self):
+        # Arrange
+        await self.queue.enqueue("samples.created", {"id": 1})
+        (job,) = await self.queue.dequeue(1, lease=60)
+
+        # Act
+        await self.queue.fail(job, "ValueError()")
+
+        # Assert
+        (dead_job,) = await self.redis.lrange(self.queue.dead_key, 0, -1)
+        dead_job = json.loads(dead_job)
+        self.assertEqual(dead_job["args"], {"id": 1})
+        self.assertEqual(dead_job["error"], "ValueError()")
+        self.assertFalse(await self.redis.exists(self.queue.job_key(job.id)))
+        self.assertEqual(await self.redis.zcard(self.queue.running_key), 0)
+
+
+class TestJobWorker(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.redis = create_redis()
+        self.queue = JobQueue(self.redis, name="test")
+        self.registry = JobRegistry()
+
+    async def asyncTearDown(self):
+        await self.redis.flushdb()
+        await self.redis.close()
+
+    async def run_worker(self, worker: JobWorker, until) -> None:
+        task = asyncio.create_task(worker.run())
+        try:
+            await asyncio.wait_for(until(), timeout=2)
+        finally:
+            worker.stop()
+            await task
+
+    async def test_runs_jobs(self):
+        # Arrange
+        handled = asyncio.Event()
+        handler = AsyncMock(side_effect=lambda id: handled.set())
+        self.registry.job("samples.created")(handler)
+        worker = JobWorker(self.queue, self.registry, poll_interval=0.01)
+        await self.queue.enqueue("samples.created", {"id": 1})
+
+        # Act
+        await self.run_worker(worker, handled.wait)
+
+        # Assert
+        handler.assert_awaited_once_with(id=1)
+        self.assertEqual(await self.redis.zcard(self.queue.running_key), 0)
+
+    async def test_leases_for_longest_timeout(self):
+        # Arrange
+        self.registry.job("samples.created")(AsyncMock())
+        self.registry.job("slow", timeout=600)(AsyncMock())
+        worker = JobWorker(self.queue, self.registry, timeout=60)
+        await self.queue.enqueue("samples.created")
+
+        # Act
+        await worker._dequeue(1)
+
+        # Assert
+        ((_, lease_end),) = await self.redis.zrange(
+            self.queue.running_key, 0, -1, withscores=True
+        )
+        self.assertGreater(lease_end, time.time() + 1199)
+
+    async def test_retries_then_fails_job(self):
+        # Arrange
+        handler = AsyncMock(side_effect=ValueError("Unavailable"))
+        self.registry.job("samples.created", max_attempts=3)(handler)
+        worker = JobWorker(
+            self.queue, self.registry, poll_interval=0.01, retry_backoff=0.01
+        )
+        await self.queue.enqueue("samples.created")
+
+        async def dead():
+            while not await self.redis.llen(self.queue.dead_key):
+                await asyncio.sleep(0.01)
+
+        # Act
+        with self.assertLogs("app.jobs.worker") as logs:
+            await self.run_worker(worker, dead)
+
+        # Assert
+        self.assertEqual(handler.await_count, 3)
+        self.assertEqual(
+            [record.levelname for record in logs.records],
+            ["WARNING", "WARNING", "ERROR"],
+        )
+        (dead_job,) = await self.redis.lrange(self.queue.dead_key, 0, -1)
+        self.assertEqual(json.loads(dead_job)["attempts"], 3)
+
+    async def test_limits_concurrency(self):
+        # Arrange
+        running = 0
+        max_running = 0
+        done = 0
+
+        async def handler():
+            nonlocal running, max_running, done
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.02)
+            running -= 1
+            done += 1
+
+        self.registry.job("slow")(handler)
+        worker = JobWorker(self.queue, self.registry, concurrency=2, poll_interval=0.01)
+        for _ in range(6):
+            await self.queue.enqueue("slow")
+
+        async def finished():
+            while done < 6:
+                await asyncio.sleep(0.01)
+
+        # Act
+        await self.run_worker(worker, finished)
+
+        # Assert
+        self.assertEqual(max_running, 2)
+
+    async def test_fails_unknown_job(self):
+        # Arrange
+        worker = JobWorker(self.queue, self.registry, poll_interval=0.01)
+        await self.queue.enqueue("unknown")
+
+        async def dead():
+            while not await self.redis.llen(self.queue.dead_key):
+                await asyncio.sleep(0.01)
+
+        # Act
+        with self.assertLogs("app.jobs.worker", "ERROR"):
+            await self.run_worker(worker, dead)
+
+    def test_backoff(self):
+        # Arrange
+        worker = JobWorker(
+            self.queue, self.registry, retry_backoff=1, retry_backoff_max=10
+        )
+
+        # Act
+        delays = [worker._backoff(attempts) for attempts in [1, 3, 10]]
+
+        # Assert
+        self.assertTrue(0.5 <= delays[0] <= 1)
+        self.assertTrue(2 <= delays[1] <= 4)
+        self.assertTrue(5 <= delays[2] <= 10)
+
+    def test_create_job_worker(self):
+        # Arrange
+        settings = base_mock_settings.copy(
+            update={"JOB_WORKER_CONCURRENCY": 4, "JOB_WORKER_POLL_INTERVAL_MS": 250}
+        )
+
+        # Act
+        worker = create_job_worker(settings, self.queue)
+
+        # Assert
+        self.assertEqual(worker.concurrency, 4)
+        self.assertEqual(worker.poll_interval, 0.25)
+        self.assertIsNotNone(worker.registry.get("samples.created"))
+
+
+class TestSampleCreatedJob(unittest.IsolatedAsyncioTestCase):
+    def test_get_job_queue(self):
+        # Arrange
+        settings = base_mock_settings.copy(
+            update={
+                "REDIS_CONNECTION_STRING": "redis://localhost:6379",
+                "JOBS_ENABLED": True,
+            }
+        )
+        disabled = settings.copy(update={"JOBS_ENABLED": False})
+
+        # Act
+        queue = get_job_queue(settings)
+
+        # Assert
+        self.assertIs(get_job_queue(settings), queue)
+        self.assertIsNone(get_job_queue(disabled))
+        self.assertIsNone(get_job_queue(base_mock_settings))
+
+    async def test_create_sample_enqueues_job(self):
+        # Arrange
+        repo = AsyncMock()
+        repo.create.return_value = SampleTable(id=7, name="test")
+        queue = AsyncMock(JobQueue)
+        service = SampleService(repo, base_mock_settings, job_queue=queue)
+
+        # Act
+        item = await service.create(SampleCreate(name="test"))
+
+        # Assert
+        self.assertEqual(item.id, 7)
+        queue.enqueue.assert_awaited_once_with(
+            "samples.created", {"id": 7}, dedupe_key="samples.created:7"
+        )
+
+    async def test_create_sample_when_enqueue_fails(self):
+        # Arrange
+        repo = AsyncMock()
+        repo.create.return_value = SampleTable(id=7, name="test")
+        queue = AsyncMock(JobQueue)
+        queue.enqueue.side_effect = ConnectionError()
+        service = SampleService(repo, base_mock_settings, job_queue=queue)
+
+        # Act
+        with self.assertLogs("app.services.sample_service", "ERROR"):
+            item = await service.create(SampleCreate(name="test"))
+
+        # Assert
+        self.assertEqual(item.id, 7)
+
+    async def test_sample_created_handler(self):
+        # Arrange
+        from app.jobs.handlers import sample_created
+
+        repo = AsyncMock()
+        repo.get_by_id.return_value = SampleTable(id=7, name="test")
+
+        # Act
+        with patch(
+            "app.jobs.handlers.get_settings", return_value=base_mock_settings
+        ), patch("app.jobs.handlers.session_factory"), patch(
+            "app.jobs.handlers.SampleRepository", return_value=repo
+        ), self.assertLogs(
+            "app.jobs.handlers"
+        ):
+            await sample_created(id=7)
+
+        # Assert
+        repo.get_by_id.assert_awaited_once_with(7)
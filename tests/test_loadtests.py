@@ -0,0 +1,94 @@
+import asyncio
+import socket
+import unittest
+
+from app.packages.auth import OidcAuthorizationCodeBearer
+from loadtests import baseline
+from loadtests.oidc import OidcStandIn
+
+CLIENT_ID = "00000000-0000-0000-0000-000000000000"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class TestOidcStandIn(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        port = free_port()
+        cls.oidc = OidcStandIn(
+            f"http://127.0.0.1:{port}", audience=CLIENT_ID, tenant_id=CLIENT_ID
+        )
+        cls.oidc.start("127.0.0.1", port)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.oidc.stop()
+
+    def test_tokens_pass_the_validation(self):
+        # Arrange
+        scheme = OidcAuthorizationCodeBearer(
+            config_url=self.oidc.config_url, client_id=CLIENT_ID
+        )
+        asyncio.run(scheme.load_config())
+        token = self.oidc.issue_token("user-1", roles=["admin"])
+
+        # Act
+        claims = scheme._verify(token)
+
+        # Assert
+        self.assertEqual(claims["sub"], "user-1")
+        self.assertEqual(claims["roles"], ["admin"])
+        self.assertEqual(claims["iss"], self.oidc.issuer)
+
+
+class TestBaseline(unittest.TestCase):
+    def test_compare(self):
+        # Arrange
+        expected = {
+            "GET /samples/{id}": {
+                "requests": 1000,
+                "rps": 100,
+                "p50": 5,
+                "p95": 10,
+                "p99": 20,
+                "errors": 0,
+            },
+            "POST /samples/": {
+                "requests": 500,
+                "rps": 50,
+                "p50": 10,
+                "p95": 20,
+                "p99": 40,
+                "errors": 0,
+            },
+        }
+        results = {
+            "GET /samples/{id}": {
+                **expected["GET /samples/{id}"],
+                "p99": 23,
+                "rps": 85,
+            },
+            "POST /samples/": {
+                **expected["POST /samples/"],
+                "p95": 30,
+                "rps": 30,
+                "errors": 2,
+            },
+        }
+
+        # Act
+        regressions = baseline.compare(results, expected, threshold=0.2)
+
+        # Assert
+        self.assertEqual(
+            regressions,
+            [
+                "POST /samples/: p95 30.0ms > 20.0ms baseline",
+                "POST /samples/: 30 rps < 50 rps baseline",
+                "POST /samples/: 2 errors",
+            ],
+        )
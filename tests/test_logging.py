@@ -0,0 +1,98 @@
+import logging
+import queue
+import unittest
+from unittest.mock import patch
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.trace import get_current_span
+
+from app.telemetry.logging import (
+    BoundedQueueHandler,
+    LogQueueListener,
+    attach_uvicorn_error_logger,
+)
+
+
+class CaptureHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records: list[tuple[str, int]] = []
+
+    def emit(self, record: logging.LogRecord):
+        span_id = get_current_span().get_span_context().span_id
+        self.records.append((self.format(record), span_id))
+
+
+class TestLogQueue(unittest.TestCase):
+    def setUp(self):
+        self.handler = CaptureHandler()
+        self.logger = logging.getLogger(f"{__name__}.{self.id()}")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+
+    def tearDown(self):
+        self.logger.handlers.clear()
+
+    def test_records_are_handled_by_listener(self):
+        queue_handler = BoundedQueueHandler(queue.Queue(10))
+        listener = LogQueueListener(queue_handler, self.handler)
+        self.logger.addHandler(queue_handler)
+
+        tracer = TracerProvider().get_tracer(__name__)
+        listener.start()
+        with tracer.start_as_current_span("request") as span:
+            self.logger.info("Hello %s", "World")
+        listener.stop()
+
+        self.assertEqual(
+            self.handler.records, [("Hello World", span.get_span_context().span_id)]
+        )
+
+    @patch("app.telemetry.logging.log_records_dropped")
+    def test_drops_records_when_full(self, log_records_dropped):
+        queue_handler = BoundedQueueHandler(queue.Queue(2))
+        listener = LogQueueListener(queue_handler, self.handler)
+        self.logger.addHandler(queue_handler)
+
+        for i in range(5):
+            self.logger.info("record %d", i)
+
+        listener.start()
+        listener.stop()
+
+        self.assertEqual(queue_handler.dropped_records, 3)
+        self.assertEqual(log_records_dropped.add.call_count, 3)
+        self.assertEqual(
+            [message for message, _ in self.handler.records],
+            ["record 0", "record 1"],
+        )
+
+    def test_respects_handler_level(self):
+        queue_handler = BoundedQueueHandler(queue.Queue(10))
+        self.handler.setLevel(logging.WARNING)
+        listener = LogQueueListener(queue_handler, self.handler)
+        self.logger.addHandler(queue_handler)
+
+        listener.start()
+        self.logger.info("info")
+        self.logger.warning("warning")
+        listener.stop()
+
+        self.assertEqual([message for message, _ in self.handler.records], ["warning"])
+
+    def test_attaches_uvicorn_error_logger(self):
+        # Arrange
+        queue_handler = BoundedQueueHandler(queue.Queue(10))
+        listener = LogQueueListener(queue_handler, self.handler)
+        error_logger = logging.getLogger("uvicorn.error")
+        # what UvicornWorker.__init__ does
+        gunicorn_handler = logging.StreamHandler()
+        self.addCleanup(setattr, error_logger, "handlers", error_logger.handlers)
+        error_logger.handlers = [gunicorn_handler]
+
+        # Act
+        with patch("app.telemetry.logging._listener", listener):
+            attach_uvicorn_error_logger()
+
+        # Assert
+        self.assertEqual(error_logger.handlers, [queue_handler])
@@ -0,0 +1,79 @@
+import threading
+import unittest
+
+from app.telemetry.memory import (
+    MemoryWatchdog,
+    _observe_growth,
+    _observe_rss,
+    create_memory_watchdog,
+    current_rss,
+)
+from tests._helper.settings import base_mock_settings
+
+
+class TestMemoryWatchdog(unittest.TestCase):
+    def test_current_rss(self):
+        self.assertGreater(current_rss(), 1024 * 1024)
+
+    def test_recycles_above_soft_limit(self):
+        # Arrange
+        recycled = threading.Event()
+        watchdog = MemoryWatchdog(
+            soft_limit=1024, interval=0.01, recycle_jitter=0.05, recycle=recycled.set
+        )
+
+        # Act
+        with self.assertLogs("app.telemetry.memory") as logs:
+            watchdog.start()
+            self.assertTrue(recycled.wait(1))
+        watchdog.stop()
+
+        # Assert
+        (record,) = logs.records
+        self.assertIn("more than the soft limit", record.getMessage())
+        self.assertGreater(record.rss, 1024)
+
+    def test_does_not_recycle_below_soft_limit(self):
+        # Arrange
+        recycled = threading.Event()
+        watchdog = MemoryWatchdog(
+            soft_limit=2**50, interval=0.01, recycle_jitter=0, recycle=recycled.set
+        )
+
+        # Act
+        watchdog.start()
+        recycled.wait(0.1)
+        watchdog.stop()
+
+        # Assert
+        self.assertFalse(recycled.is_set())
+
+    def test_reports_memory_growth(self):
+        # Arrange
+        watchdog = MemoryWatchdog(interval=60)
+
+        # Act
+        watchdog.start()
+        watchdog.rss = watchdog.baseline + 4096
+        (rss,) = _observe_rss(None)
+        (growth,) = _observe_growth(None)
+        watchdog.stop()
+
+        # Assert
+        self.assertEqual(rss.value, watchdog.rss)
+        self.assertEqual(growth.value, 4096)
+        self.assertEqual(_observe_growth(None), [])
+
+    def test_create_memory_watchdog(self):
+        # Arrange
+        settings = base_mock_settings.copy(
+            update={"WORKER_MEMORY_SOFT_LIMIT_MB": 512, "WORKER_RECYCLE_JITTER_S": 30}
+        )
+
+        # Act
+        watchdog = create_memory_watchdog(settings)
+
+        # Assert
+        self.assertEqual(watchdog.soft_limit, 512 * 1024 * 1024)
+        self.assertEqual(watchdog.recycle_jitter, 30)
+        self.assertIsNone(create_memory_watchdog(base_mock_settings).soft_limit)
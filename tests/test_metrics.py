@@ -0,0 +1,153 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+
+from app.telemetry import prometheus
+from app.telemetry.metrics import has_meter_provider, init_metrics
+from tests._helper.client import setup_test_client
+
+
+def export_metrics(directory: str, pid: int, requests: int, active: int):
+    reader = InMemoryMetricReader()
+    meter = MeterProvider(metric_readers=[reader]).get_meter("test")
+
+    counter = meter.create_counter("requests", description="Requests")
+    gauge = meter.create_up_down_counter("active")
+    histogram = meter.create_histogram("duration", unit="ms")
+
+    for _ in range(requests):
+        counter.add(1, {"route": "/samples"})
+        histogram.record(7, {"route": "/samples"})
+    gauge.add(active)
+
+    exporter = prometheus.MultiprocessFileMetricExporter(directory)
+    with patch("app.telemetry.prometheus.os.getpid", return_value=pid):
+        exporter.export(reader.get_metrics_data())
+
+
+class TestPrometheus(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def test_merges_processes(self):
+        export_metrics(self.directory, pid=1, requests=2, active=1)
+        export_metrics(self.directory, pid=2, requests=3, active=4)
+
+        content = prometheus.render(prometheus.collect(self.directory))
+
+        self.assertIn("# HELP requests_total Requests\n", content)
+        self.assertIn("# TYPE requests_total counter\n", content)
+        self.assertIn('requests_total{route="/samples"} 5\n', content)
+        self.assertIn("active 5\n", content)
+        self.assertIn("# TYPE duration histogram\n", content)
+        self.assertIn('duration_bucket{route="/samples",le="5.0"} 0\n', content)
+        self.assertIn('duration_bucket{route="/samples",le="10.0"} 5\n', content)
+        self.assertIn('duration_bucket{route="/samples",le="+Inf"} 5\n', content)
+        self.assertIn('duration_sum{route="/samples"} 35\n', content)
+        self.assertIn('duration_count{route="/samples"} 5\n', content)
+
+    def test_mark_process_dead_keeps_counters(self):
+        export_metrics(self.directory, pid=1, requests=2, active=1)
+        export_metrics(self.directory, pid=2, requests=3, active=4)
+
+        prometheus.mark_process_dead(self.directory, 1)
+        content = prometheus.render(prometheus.collect(self.directory))
+
+        self.assertIn('requests_total{route="/samples"} 5\n', content)
+        self.assertIn("active 4\n", content)
+
+    def test_mark_process_dead_merges_files(self):
+        export_metrics(self.directory, pid=1, requests=2, active=1)
+        export_metrics(self.directory, pid=2, requests=3, active=4)
+
+        prometheus.mark_process_dead(self.directory, 1)
+        prometheus.mark_process_dead(self.directory, 2)
+        content = prometheus.render(prometheus.collect(self.directory))
+
+        self.assertEqual(
+            sorted(path.name for path in Path(self.directory).iterdir()),
+            ["metrics-dead.json"],
+        )
+        self.assertIn('requests_total{route="/samples"} 5\n', content)
+        self.assertIn('duration_count{route="/samples"} 5\n', content)
+        self.assertNotIn("active", content)
+
+    def test_clear(self):
+        export_metrics(self.directory, pid=1, requests=2, active=1)
+
+        prometheus.clear(self.directory)
+
+        self.assertEqual(list(Path(self.directory).iterdir()), [])
+        self.assertEqual(prometheus.render(prometheus.collect(self.directory)), "")
+
+    def test_escapes_labels(self):
+        content = prometheus.render(
+            {
+                "app.errors": {
+                    "type": "gauge",
+                    "description": "",
+                    "points": {(("message", 'a "b"\n'), ("ok", False)): {"value": 1}},
+                }
+            }
+        )
+
+        self.assertEqual(
+            content,
+            "# TYPE app_errors gauge\n"
+            'app_errors{message="a \\"b\\"\\n",ok="false"} 1\n',
+        )
+
+
+class TestRequestMetrics(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # the global meter provider can only be set once per process
+        cls.reader = InMemoryMetricReader()
+        if not has_meter_provider():
+            init_metrics([cls.reader])
+
+        cls.client = setup_test_client()
+
+    def request_counts(self) -> dict[tuple, int]:
+        counts = {}
+        for resource_metrics in self.reader.get_metrics_data().resource_metrics:
+            for scope_metrics in resource_metrics.scope_metrics:
+                for metric in scope_metrics.metrics:
+                    if metric.name != "app.request.duration":
+                        continue
+                    for point in metric.data.data_points:
+                        counts[tuple(sorted(point.attributes.items()))] = point.count
+        return counts
+
+    def test_records_route_template(self):
+        self.client.get("/users/greet")
+        self.client.get("/error")
+        self.client.get("/does-not-exist")
+
+        counts = self.request_counts()
+
+        self.assertEqual(
+            counts[
+                (
+                    ("http.method", "GET"),
+                    ("http.route", "/users/greet"),
+                    ("http.status_code", 200),
+                )
+            ],
+            1,
+        )
+        self.assertEqual(
+            counts[
+                (
+                    ("http.method", "GET"),
+                    ("http.route", "/error"),
+                    ("http.status_code", 500),
+                )
+            ],
+            1,
+        )
+        self.assertEqual(counts[(("http.method", "GET"), ("http.status_code", 404))], 1)
@@ -0,0 +1,156 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+from urllib.parse import parse_qs
+
+import httpx
+
+from app.http_client import HttpClient
+from app.packages.auth import OnBehalfOfTokenProvider, User
+from app.packages.auth.exceptions import OnBehalfOfException
+from tests._helper.settings import base_mock_settings
+
+TOKEN_ENDPOINT = "https://login.example.com/token"
+
+
+def create_user(oid: str) -> User:
+    claims = {"aud": "api", "tid": "tenant", "oid": oid}
+    return User(**claims, claims=claims, access_token=f"token-of-{oid}")
+
+
+class TokenEndpoint:
+    def __init__(self, expires_in: int = 3600, status_code: int = 200):
+        self.expires_in = expires_in
+        self.status_code = status_code
+        self.requests: list[dict[str, list[str]]] = []
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        form = parse_qs(request.content.decode())
+        self.requests.append(form)
+        # let concurrent requests for the same token pile up
+        await asyncio.sleep(0.01)
+
+        if self.status_code != 200:
+            return httpx.Response(self.status_code, json={"error": "invalid_grant"})
+        return httpx.Response(
+            200,
+            json={
+                "access_token": f"{form['assertion'][0]}:{form['scope'][0]}",
+                "expires_in": self.expires_in,
+            },
+        )
+
+
+def create_provider(endpoint: TokenEndpoint, **kwargs) -> OnBehalfOfTokenProvider:
+    openid_config = MagicMock(token_endpoint=TOKEN_ENDPOINT, load_config=AsyncMock())
+    return OnBehalfOfTokenProvider(
+        httpx.AsyncClient(transport=httpx.MockTransport(endpoint)),
+        openid_config,
+        client_id="client",
+        client_secret="secret",
+        **kwargs,
+    )
+
+
+class TestOnBehalfOfTokenProvider(unittest.TestCase):
+    def test_exchanges_token(self):
+        # Arrange
+        endpoint = TokenEndpoint()
+        provider = create_provider(endpoint)
+
+        # Act
+        token = asyncio.run(provider.get_token(create_user("a"), ["User.Read"]))
+
+        # Assert
+        self.assertEqual(token, "token-of-a:User.Read")
+        (form,) = endpoint.requests
+        self.assertEqual(
+            form["grant_type"], ["urn:ietf:params:oauth:grant-type:jwt-bearer"]
+        )
+        self.assertEqual(form["requested_token_use"], ["on_behalf_of"])
+        self.assertEqual(form["client_secret"], ["secret"])
+
+    def test_caches_tokens_per_user_and_scope(self):
+        # Arrange
+        endpoint = TokenEndpoint()
+        provider = create_provider(endpoint)
+        user_a, user_b = create_user("a"), create_user("b")
+
+        async def get_tokens():
+            return await asyncio.gather(
+                *(provider.get_token(user_a, ["User.Read"]) for _ in range(5)),
+                provider.get_token(user_a, ["Mail.Read", "User.Read"]),
+                provider.get_token(user_a, ["User.Read", "Mail.Read"]),
+                provider.get_token(user_b, ["User.Read"]),
+            )
+
+        # Act
+        tokens = asyncio.run(get_tokens())
+
+        # Assert
+        self.assertEqual(len(endpoint.requests), 3)
+        self.assertEqual(set(tokens[:5]), {"token-of-a:User.Read"})
+        self.assertEqual(tokens[5], tokens[6])
+        self.assertEqual(tokens[7], "token-of-b:User.Read")
+
+    def test_refreshes_tokens_before_expiry(self):
+        # Arrange
+        endpoint = TokenEndpoint(expires_in=200)
+        provider = create_provider(endpoint, refresh_margin=300)
+        user = create_user("a")
+
+        async def get_tokens():
+            await provider.get_token(user, ["User.Read"])
+            await provider.get_token(user, ["User.Read"])
+
+        # Act
+        asyncio.run(get_tokens())
+
+        # Assert
+        self.assertEqual(len(endpoint.requests), 2)
+
+    def test_evicts_least_recently_used_tokens(self):
+        # Arrange
+        endpoint = TokenEndpoint()
+        provider = create_provider(endpoint, maxsize=1)
+
+        async def get_tokens():
+            await provider.get_token(create_user("a"), ["User.Read"])
+            await provider.get_token(create_user("b"), ["User.Read"])
+            await provider.get_token(create_user("a"), ["User.Read"])
+
+        # Act
+        asyncio.run(get_tokens())
+
+        # Assert
+        self.assertEqual(len(endpoint.requests), 3)
+
+    def test_failed_exchange(self):
+        # Arrange
+        provider = create_provider(TokenEndpoint(status_code=400))
+
+        # Act
+        with self.assertRaises(OnBehalfOfException) as context, self.assertLogs(
+            "app.packages.auth.on_behalf_of"
+        ):
+            asyncio.run(provider.get_token(create_user("a"), ["User.Read"]))
+
+        # Assert
+        self.assertEqual(context.exception.status_code, 502)
+        self.assertIn("invalid_grant", context.exception.detail)
+
+
+class TestHttpClient(unittest.TestCase):
+    def test_init(self):
+        # Arrange
+        settings = base_mock_settings.copy(update={"HTTP_CLIENT_TIMEOUT_S": 5})
+
+        # Act
+        with patch.object(HttpClient, "_client"):
+            client = HttpClient.init(settings)
+            self.assertIs(HttpClient.instance(), client)
+            asyncio.run(HttpClient.close())
+
+        # Assert
+        self.assertEqual(client.timeout.read, 5)
+        self.assertTrue(client.is_closed)
@@ -0,0 +1,173 @@
+import unittest
+from datetime import date
+from unittest.mock import MagicMock
+
+from sqlalchemy.dialects import postgresql
+
+from app.database.partitioning import (
+    add_months,
+    create_partitions,
+    expire_partitions,
+    partition_name,
+)
+
+
+class FakeConnection:
+    def __init__(
+        self,
+        partitions: list[str],
+        default: bool = False,
+        default_months: list[date] = [],
+    ):
+        self.dialect = postgresql.dialect()
+        self.partitions = partitions
+        self.default = default
+        # the months of the rows in the default partition
+        self.default_months = default_months
+        self.statements: list[str] = []
+        self.fail_move = False
+
+    async def execute(self, statement, parameters=None):
+        sql = str(statement)
+        result = MagicMock()
+        if "pg_inherits" in sql:
+            result.all.return_value = [(name,) for name in self.partitions]
+            return result
+        if "pg_partitioned_table" in sql:
+            default = ("sample_default", "create_date") if self.default else None
+            result.first.return_value = default
+            return result
+        if "attgenerated" in sql:
+            result.all.return_value = [
+                ("id",),
+                ("name",),
+                ("description",),
+                ("create_date",),
+            ]
+            return result
+        if sql.startswith("SELECT DISTINCT"):
+            result.all.return_value = [
+                (month,)
+                for month in self.default_months
+                if month < parameters["before"]
+            ]
+            return result
+
+        self.statements.append(sql)
+        if sql.startswith("WITH moved") and self.fail_move:
+            raise RuntimeError("move failed")
+        if sql.startswith("CREATE TABLE"):
+            self.partitions.append(sql.split()[2])
+        return result
+
+    async def scalar(self, statement, parameters):
+        return any(
+            parameters["start"] <= month < parameters["end"]
+            for month in self.default_months
+        )
+
+
+class TestPartitioning(unittest.IsolatedAsyncioTestCase):
+    def test_add_months(self):
+        self.assertEqual(add_months(date(2026, 11, 1), 2), date(2027, 1, 1))
+        self.assertEqual(add_months(date(2026, 1, 1), -1), date(2025, 12, 1))
+
+    def test_partition_name(self):
+        self.assertEqual(partition_name("sample", date(2026, 3, 1)), "sample_p2026_03")
+
+    async def test_create_partitions_skips_existing(self):
+        conn = FakeConnection(["sample_p2026_10", "sample_default"])
+
+        created = await create_partitions(conn, "sample", date(2026, 10, 19), 3)
+
+        self.assertEqual(created, ["sample_p2026_11", "sample_p2026_12"])
+        self.assertEqual(
+            conn.statements[0],
+            "CREATE TABLE sample_p2026_11 PARTITION OF sample "
+            "FOR VALUES FROM ('2026-11-01') TO ('2026-12-01')",
+        )
+
+    async def test_expire_partitions(self):
+        conn = FakeConnection(
+            ["sample_p2025_09", "sample_p2025_10", "sample_p2025_08", "sample_default"]
+        )
+
+        expired = await expire_partitions(conn, "sample", date(2025, 10, 1))
+
+        self.assertEqual(expired, ["sample_p2025_08", "sample_p2025_09"])
+        self.assertEqual(
+            conn.statements,
+            [
+                "ALTER TABLE sample DETACH PARTITION sample_p2025_08",
+                "ALTER TABLE sample DETACH PARTITION sample_p2025_09",
+            ],
+        )
+
+    async def test_expire_partitions_drop(self):
+        conn = FakeConnection(["sample_p2025_09"])
+
+        await expire_partitions(conn, "sample", date(2025, 10, 1), action="drop")
+
+        self.assertEqual(conn.statements, ["DROP TABLE sample_p2025_09"])
+
+    async def test_create_partitions_moves_default_rows(self):
+        conn = FakeConnection(
+            ["sample_p2026_10"], default=True, default_months=[date(2026, 11, 1)]
+        )
+
+        await create_partitions(conn, "sample", date(2026, 10, 19), 2)
+
+        self.assertEqual(
+            [statement.split(" (")[0] for statement in conn.statements],
+            [
+                "ALTER TABLE sample DETACH PARTITION sample_default",
+                "CREATE TABLE sample_p2026_11 PARTITION OF sample FOR VALUES FROM",
+                "ALTER TABLE sample_p2026_11 DISABLE TRIGGER USER",
+                "WITH moved AS",
+                "ALTER TABLE sample_p2026_11 ENABLE TRIGGER USER",
+                "ALTER TABLE sample ATTACH PARTITION sample_default DEFAULT",
+            ],
+        )
+        self.assertEqual(
+            conn.statements[3],
+            "WITH moved AS (DELETE FROM sample_default "
+            "WHERE create_date >= :start AND create_date < :end "
+            "RETURNING id, name, description, create_date) "
+            "INSERT INTO sample_p2026_11 (id, name, description, create_date) "
+            "SELECT id, name, description, create_date FROM moved",
+        )
+
+    async def test_move_enables_triggers_on_error(self):
+        conn = FakeConnection(
+            ["sample_p2026_10"], default=True, default_months=[date(2026, 11, 1)]
+        )
+        conn.fail_move = True
+
+        with self.assertRaises(RuntimeError):
+            await create_partitions(conn, "sample", date(2026, 10, 19), 2)
+
+        self.assertEqual(
+            conn.statements[-1], "ALTER TABLE sample_p2026_11 ENABLE TRIGGER USER"
+        )
+
+    async def test_create_partitions_keeps_empty_default(self):
+        conn = FakeConnection(["sample_p2026_10"], default=True)
+
+        await create_partitions(conn, "sample", date(2026, 10, 19), 2)
+
+        self.assertEqual(len(conn.statements), 1)
+        self.assertTrue(conn.statements[0].startswith("CREATE TABLE sample_p2026_11"))
+
+    async def test_expire_partitions_of_default_rows(self):
+        conn = FakeConnection(
+            ["sample_p2025_10"],
+            default=True,
+            default_months=[date(2025, 8, 1), date(2025, 10, 1)],
+        )
+
+        expired = await expire_partitions(conn, "sample", date(2025, 10, 1))
+
+        self.assertEqual(expired, ["sample_p2025_08"])
+        self.assertIn(
+            "ALTER TABLE sample DETACH PARTITION sample_p2025_08", conn.statements
+        )
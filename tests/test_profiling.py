@@ -0,0 +1,158 @@
+import asyncio
+import time
+import unittest
+from collections import Counter
+
+from fastapi import status
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.middleware import RequestProfilingMiddleware
+from app.telemetry.profiling import (
+    PROFILE_STACKS_KEY,
+    Profile,
+    ProfilerBusyException,
+    profile_threads,
+)
+from tests._helper.client import setup_test_client
+
+
+def busy(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class TestProfiler(unittest.TestCase):
+    def test_profile_threads(self):
+        # Arrange
+        profiler = profile_threads(0.001)
+
+        # Act
+        busy(0.05)
+        profile = profiler.stop()
+
+        # Assert
+        self.assertGreater(profile.sample_count, 0)
+        self.assertIn("busy", profile.collapsed())
+        self.assertNotIn("SamplingProfiler", [stack[0] for stack in profile.samples])
+
+    def test_one_profiler_at_a_time(self):
+        # Arrange
+        profiler = profile_threads(0.001)
+
+        # Act / Assert
+        with self.assertRaises(ProfilerBusyException):
+            profile_threads(0.001)
+
+        profiler.stop()
+        profile_threads(0.001).stop()
+
+    def test_formats(self):
+        # Arrange
+        profile = Profile(
+            name="test",
+            interval=0.002,
+            samples=Counter({("main", "a", "b"): 3, ("main", "a"): 1}),
+        )
+
+        # Act
+        collapsed = profile.collapsed()
+        speedscope = profile.speedscope()
+
+        # Assert
+        self.assertEqual(collapsed, "main;a;b 3\nmain;a 1")
+        self.assertEqual(profile.collapsed(max_length=10), "main;a;b 3")
+        self.assertEqual(
+            speedscope["shared"]["frames"],
+            [{"name": "main"}, {"name": "a"}, {"name": "b"}],
+        )
+        self.assertEqual(speedscope["profiles"][0]["samples"], [[0, 1, 2], [0, 1]])
+        self.assertEqual(speedscope["profiles"][0]["weights"], [6, 2])
+
+
+async def handle_request(request):
+    busy(0.02)
+    await asyncio.sleep(0.02)
+    return PlainTextResponse("ok")
+
+
+class TestRequestProfilingMiddleware(unittest.TestCase):
+    def setUp(self):
+        self.tracer = TracerProvider().get_tracer(__name__)
+        self.spans = []
+
+        self.headers = []
+
+        async def handle(request):
+            self.headers.append(dict(request.headers))
+            return await handle_request(request)
+
+        profiled_app = RequestProfilingMiddleware(
+            Starlette(routes=[Route("/", handle)]), token="secret", interval=0.001
+        )
+
+        async def app(scope, receive, send):
+            with self.tracer.start_as_current_span("request") as span:
+                self.spans.append(span)
+                await profiled_app(scope, receive, send)
+
+        self.client = TestClient(app)
+
+    def test_attaches_profile_to_span(self):
+        # Act
+        response = self.client.get("/", headers={"X-Profile": "secret"})
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        (span,) = self.spans
+        stacks = span.attributes[PROFILE_STACKS_KEY]
+        self.assertRegex(stacks, r"handle_request \(.*\);busy ")
+        self.assertRegex(stacks, r"handle_request \(.*\);sleep \(.*;<await ")
+        self.assertGreater(span.attributes["profile.samples"], 0)
+
+    def test_ignores_header_without_token(self):
+        # Act
+        self.client.get("/", headers={"X-Profile": "true"})
+
+        # Assert
+        (span,) = self.spans
+        self.assertNotIn(PROFILE_STACKS_KEY, span.attributes)
+        self.assertNotIn("x-profile", self.headers[0])
+
+    def test_ignores_requests_without_header(self):
+        # Act
+        self.client.get("/")
+
+        # Assert
+        (span,) = self.spans
+        self.assertNotIn(PROFILE_STACKS_KEY, span.attributes)
+
+    def test_outside_of_span(self):
+        # Act
+        with trace.use_span(trace.INVALID_SPAN):
+            response = TestClient(
+                RequestProfilingMiddleware(
+                    Starlette(routes=[Route("/", handle_request)]), token="secret"
+                )
+            ).get("/", headers={"X-Profile": "secret"})
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class TestDiagnosticsRouter(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.client = setup_test_client()
+
+    def test_requires_admin_role(self):
+        # Act
+        response = self.client.get("/diagnostics/profile", params={"seconds": 0.01})
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
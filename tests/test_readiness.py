@@ -0,0 +1,141 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from fastapi import status
+
+from app.limiter import RateLimit
+from app.readiness import Readiness
+from tests._helper.client import setup_test_client
+
+
+class TestReadiness(unittest.TestCase):
+    def test_prewarm(self):
+        # Arrange
+        readiness = Readiness()
+        check = AsyncMock()
+        prewarm = AsyncMock()
+        readiness.add_check("database", check, prewarm=prewarm)
+
+        # Act
+        results = asyncio.run(readiness.prewarm())
+
+        # Assert
+        self.assertTrue(readiness.prewarmed)
+        self.assertTrue(results["database"].ok)
+        prewarm.assert_awaited_once()
+        check.assert_not_awaited()
+
+    def test_retries_failed_prewarm(self):
+        # Arrange
+        readiness = Readiness(check_ttl=0)
+        check = AsyncMock()
+        prewarm = AsyncMock(side_effect=[OSError(), None])
+        readiness.add_check("database", check, prewarm=prewarm)
+
+        # Act
+        with self.assertLogs("app.readiness"):
+            asyncio.run(readiness.prewarm())
+        prewarmed = readiness.prewarmed
+        results = asyncio.run(readiness.check())
+
+        # Assert
+        self.assertFalse(prewarmed)
+        self.assertTrue(results["database"].ok)
+        self.assertTrue(readiness.prewarmed)
+        self.assertEqual(prewarm.await_count, 2)
+        check.assert_not_awaited()
+
+    def test_caches_check_results(self):
+        # Arrange
+        readiness = Readiness(check_ttl=60)
+        check = AsyncMock()
+        readiness.add_check("database", check)
+
+        async def check_twice():
+            await readiness.check()
+            return await readiness.check()
+
+        # Act
+        results = asyncio.run(check_twice())
+
+        # Assert
+        self.assertTrue(results["database"].ok)
+        check.assert_awaited_once()
+
+    def test_failed_and_slow_checks(self):
+        # Arrange
+        readiness = Readiness(check_ttl=0, check_timeout=0.01)
+        readiness.add_check("auth", AsyncMock(side_effect=RuntimeError("Unavailable")))
+        readiness.add_check("database", lambda: asyncio.sleep(1))
+
+        # Act
+        with self.assertLogs("app.readiness"):
+            results = asyncio.run(readiness.check())
+
+        # Assert
+        self.assertFalse(results["auth"].ok)
+        self.assertEqual(results["auth"].error, "RuntimeError('Unavailable')")
+        self.assertFalse(results["database"].ok)
+        self.assertIn("TimeoutError", results["database"].error)
+
+    def test_check_rate_limit_storage(self):
+        with patch.object(RateLimit, "_limiter"):
+            # Arrange
+            RateLimit.init(None)
+
+            # Act
+            asyncio.run(RateLimit.check_storage())
+
+
+class TestReadyEndpoint(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.client = setup_test_client()
+
+    def get_ready(self, readiness: Readiness):
+        with patch.object(Readiness, "instance", return_value=readiness):
+            return self.client.get("/ready")
+
+    def test_not_ready_before_prewarm(self):
+        # Arrange
+        readiness = Readiness()
+        readiness.add_check("database", AsyncMock())
+
+        # Act
+        response = self.get_ready(readiness)
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertFalse(response.json()["ready"])
+
+    def test_ready(self):
+        # Arrange
+        readiness = Readiness()
+        readiness.add_check("database", AsyncMock())
+        readiness.add_check("auth", AsyncMock())
+        asyncio.run(readiness.prewarm())
+
+        # Act
+        response = self.get_ready(readiness)
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.json()
+        self.assertTrue(body["ready"])
+        self.assertEqual(set(body["checks"]), {"database", "auth"})
+        self.assertTrue(body["checks"]["database"]["ok"])
+
+    def test_not_ready_with_failed_check(self):
+        # Arrange
+        readiness = Readiness(check_ttl=0)
+        readiness.add_check("database", AsyncMock(side_effect=OSError()))
+        readiness.prewarmed = True
+
+        # Act
+        with self.assertLogs("app.readiness"):
+            response = self.get_ready(readiness)
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertFalse(response.json()["checks"]["database"]["ok"])
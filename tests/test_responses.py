@@ -0,0 +1,38 @@
+import json
+import unittest
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.models.sample import Sample, SampleStats
+from app.responses import ORJSONResponse
+
+
+class TestORJSONResponse(unittest.TestCase):
+    def assertSameBytes(self, content):
+        self.assertEqual(
+            ORJSONResponse(content).body,
+            JSONResponse(jsonable_encoder(content)).body,
+        )
+
+    def test_matches_json_response(self):
+        self.assertSameBytes([Sample(id=1, name="test", description="äöü €")])
+        self.assertSameBytes({"detail": "Insufficient permissions"})
+        self.assertSameBytes(
+            SampleStats(
+                total={"value": 1, "exact": True},
+                per_day=[{"day": date(2022, 11, 12), "value": 1, "exact": True}],
+            )
+        )
+        self.assertSameBytes(
+            {
+                "naive": datetime(2022, 11, 12, 11, 21, 24, 288392),
+                "aware": datetime(2022, 11, 12, 11, 21, tzinfo=timezone.utc),
+            }
+        )
+
+    def test_decimal(self):
+        body = ORJSONResponse({"rate": Decimal("0.25")}).body
+        self.assertEqual(json.loads(body), {"rate": 0.25})
@@ -0,0 +1,257 @@
+import asyncio
+import json
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi import status
+
+from app.config import get_settings
+from app.database.notifications import NotificationHub
+from app.database.tables import SampleChangeTable
+from app.repositories import get_repository
+from app.repositories.sample_repository import SampleRepository
+from app.services.sample_service import SampleService, get_sample_change_hub
+from tests._helper.client import setup_test_client
+from tests._helper.settings import base_mock_settings
+
+
+def create_hub(buffer_size: int = 10) -> NotificationHub:
+    hub = NotificationHub("postgresql+asyncpg://localhost/main", "test", buffer_size)
+    # listening without a database
+    hub._connection = MagicMock()
+    return hub
+
+
+def change_row(id: int, seconds: float = 0, **kwargs) -> SampleChangeTable:
+    change_date = datetime(2026, 10, 19) + timedelta(seconds=seconds)
+    return SampleChangeTable(**change(id, **kwargs), change_date=change_date)
+
+
+def notify(hub: NotificationHub, payload: dict):
+    hub._on_notification(None, 1, hub.channel, json.dumps(payload))
+
+
+def change(id: int, sample_id: int = 1, operation: str = "insert") -> dict:
+    return {
+        "id": id,
+        "operation": operation,
+        "sample_id": sample_id,
+        "sample": {"id": sample_id, "name": "test", "description": None},
+    }
+
+
+class TestNotificationHub(unittest.IsolatedAsyncioTestCase):
+    async def test_fans_out_notifications(self):
+        # Arrange
+        hub = create_hub()
+        first = await hub.subscribe()
+        second = await hub.subscribe()
+
+        # Act
+        notify(hub, change(1))
+
+        # Assert
+        self.assertEqual((await first.get(1))["id"], 1)
+        self.assertEqual((await second.get(1))["id"], 1)
+        self.assertEqual(hub.subscribers, 2)
+
+    async def test_drops_slow_subscribers(self):
+        # Arrange
+        hub = create_hub(buffer_size=2)
+        slow = await hub.subscribe()
+        fast = await hub.subscribe()
+
+        # Act
+        notify(hub, change(1))
+        notify(hub, change(2))
+        self.assertEqual((await fast.get(1))["id"], 1)
+        with self.assertLogs("app.database.notifications"):
+            notify(hub, change(3))
+
+        # Assert
+        self.assertTrue(slow.dropped)
+        self.assertEqual([(await slow.get(1))["id"] for _ in range(2)], [1, 2])
+        self.assertIsNone(await slow.get(1))
+        self.assertFalse(fast.dropped)
+        self.assertEqual(hub.subscribers, 1)
+
+    async def test_closes_subscriptions_without_connection(self):
+        # Arrange
+        hub = create_hub()
+        connection = hub._connection
+        subscription = await hub.subscribe()
+        waiting = asyncio.create_task(subscription.get())
+
+        # Act
+        with self.assertLogs("app.database.notifications", "WARNING"):
+            hub._on_termination(connection)
+
+        # Assert
+        self.assertIsNone(await waiting)
+        self.assertIsNone(hub._connection)
+        self.assertEqual(hub.subscribers, 0)
+
+    async def test_subscription_timeout(self):
+        # Arrange
+        hub = create_hub()
+
+        # Act
+        async with await hub.subscribe() as subscription:
+            with self.assertRaises(asyncio.TimeoutError):
+                await subscription.get(0.01)
+
+        # Assert
+        self.assertTrue(subscription.closed)
+        self.assertEqual(hub.subscribers, 0)
+
+    async def test_listens_once(self):
+        # Arrange
+        hub = NotificationHub("postgresql+asyncpg://user:pw@localhost/main", "test")
+        connection = AsyncMock()
+        connection.add_termination_listener = MagicMock()
+
+        # Act
+        with patch("asyncpg.connect", return_value=connection) as connect:
+            await asyncio.gather(hub.subscribe(), hub.subscribe())
+
+        # Assert
+        connect.assert_awaited_once_with("postgresql://user:pw@localhost/main")
+        connection.add_listener.assert_awaited_once_with("test", hub._on_notification)
+
+
+class TestSampleServiceChanges(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.repo = AsyncMock(SampleRepository)
+        self.hub = create_hub()
+        self.settings = base_mock_settings.copy(
+            update={
+                "SAMPLE_CHANGES_HEARTBEAT_S": 0.01,
+                "SAMPLE_CHANGES_MAX_DURATION_S": 1,
+            }
+        )
+        self.service = SampleService(self.repo, self.settings, change_hub=self.hub)
+
+    async def test_replays_then_streams_changes(self):
+        # Arrange
+        self.repo.get_changes.return_value = [
+            change_row(2),
+            change_row(3, operation="update"),
+        ]
+
+        # Act
+        changes = await self.service.changes(last_event_id=1)
+        # notified during the replay
+        notify(self.hub, change(3, operation="update"))
+        notify(self.hub, change(4, operation="delete") | {"sample": None})
+        received = [await anext(changes) for _ in range(3)]
+        await changes.aclose()
+
+        # Assert
+        self.assertEqual([item.id for item in received], [2, 3, 4])
+        self.assertEqual(received[1].operation, "update")
+        self.assertIsNone(received[2].sample)
+        self.repo.get_changes.assert_awaited_once_with(
+            1, limit=500, margin=timedelta(seconds=60)
+        )
+        self.repo.release.assert_awaited_once()
+        self.assertEqual(self.hub.subscribers, 0)
+
+    async def test_streams_changes_committed_out_of_order(self):
+        # Arrange
+        self.repo.get_changes.return_value = [change_row(5, seconds=120)]
+
+        # Act
+        changes = await self.service.changes(last_event_id=4)
+        # 5 was notified during the replay, 3 committed later than 5
+        notify(self.hub, change(5))
+        notify(self.hub, change(3))
+        received = [await anext(changes) for _ in range(2)]
+        await changes.aclose()
+
+        # Assert
+        self.assertEqual([item.id for item in received], [5, 3])
+
+    async def test_pages_replay_from_highest_id(self):
+        # Arrange
+        page = [change_row(id, seconds=id) for id in range(10, 510)]
+        # recorded before the Last-Event-ID, but committed after it
+        page[0] = change_row(3, seconds=9)
+        self.repo.get_changes.side_effect = [sorted(page, key=lambda c: c.id), []]
+
+        # Act
+        changes = await self.service.changes(last_event_id=9)
+        received = [await anext(changes) for _ in range(501)]
+        await changes.aclose()
+
+        # Assert
+        self.assertEqual(received[0].id, 3)
+        # the heartbeat after the replay
+        self.assertIsNone(received[-1])
+        self.assertEqual(self.repo.get_changes.await_args_list[1].args, (509,))
+        self.assertIsNone(self.repo.get_changes.await_args_list[1].kwargs["margin"])
+
+    async def test_heartbeat_without_changes(self):
+        # Act
+        changes = await self.service.changes()
+        heartbeat = await anext(changes)
+        await changes.aclose()
+
+        # Assert
+        self.assertIsNone(heartbeat)
+        self.repo.get_changes.assert_not_awaited()
+
+    async def test_ends_when_dropped(self):
+        # Arrange
+        hub = create_hub(buffer_size=1)
+        service = SampleService(self.repo, self.settings, change_hub=hub)
+        changes = await service.changes()
+
+        # Act
+        notify(hub, change(1))
+        with self.assertLogs("app.database.notifications"):
+            notify(hub, change(2))
+        received = [item async for item in changes]
+
+        # Assert
+        self.assertEqual([item.id for item in received], [1])
+
+
+class TestSampleChangesEndpoint(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.mock_sample_repository = AsyncMock(SampleRepository)
+        cls.hub = create_hub()
+        # ends the stream, the test client waits for the whole response
+        settings = base_mock_settings.copy(
+            update={"SAMPLE_CHANGES_MAX_DURATION_S": 0.05}
+        )
+        cls.client = setup_test_client(
+            {
+                get_repository(SampleRepository): lambda: cls.mock_sample_repository,
+                get_sample_change_hub: lambda: cls.hub,
+                get_settings: lambda: settings,
+            }
+        )
+
+    def test_streams_changes(self):
+        # Arrange
+        self.mock_sample_repository.get_changes.return_value = [
+            change_row(8, sample_id=5)
+        ]
+
+        # Act
+        response = self.client.get("/samples/changes", headers={"Last-Event-ID": "7"})
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(
+            response.headers["content-type"].startswith("text/event-stream")
+        )
+        lines = response.text.splitlines()
+        self.assertEqual(lines[:4], ["retry: 3000", "", "id: 8", "event: sample"])
+        self.assertEqual(json.loads(lines[4].removeprefix("data: ")), change(8, 5))
+        self.assertEqual(self.hub.subscribers, 0)
+        self.mock_sample_repository.get_changes.assert_awaited_once_with(
+            7, limit=500, margin=timedelta(seconds=60)
+        )
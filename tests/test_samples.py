@@ -1,11 +1,14 @@
 import unittest
+from datetime import date, datetime
 from unittest.mock import AsyncMock
 
+import msgpack
 from fastapi import status
 
 from app.database.tables.sample_table import SampleTable
 from app.repositories import get_repository
 from app.repositories.sample_repository import SampleRepository
+from app.services.sample_service import _stats_cache
 from tests._helper.client import setup_test_client
 
 
@@ -21,6 +24,7 @@ class TestSamples(unittest.TestCase):
 
     def tearDown(self):
         self.mock_sample_repository.reset_mock()
+        _stats_cache.clear()
 
     def test_get_samples(self):
         # Arrange
@@ -38,6 +42,83 @@ class TestSamples(unittest.TestCase):
         )
         self.mock_sample_repository.get.assert_called_once()
 
+    def test_get_samples_by_create_date(self):
+        # Arrange
+        self.mock_sample_repository.get.return_value = []
+
+        # Act
+        response = self.client.get(
+            "/samples",
+            params={"created_after": "2022-11-01T00:00:00"},
+        )
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.mock_sample_repository.get.assert_called_once_with(
+            created_after=datetime(2022, 11, 1), created_before=None, fields=None
+        )
+
+    def test_get_samples_msgpack(self):
+        # Arrange
+        self.mock_sample_repository.get.return_value = [
+            SampleTable(id=1, name="test1"),
+        ]
+
+        # Act
+        response = self.client.get(
+            "/samples", headers={"Accept": "application/msgpack"}
+        )
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.headers["content-type"], "application/msgpack")
+        self.assertEqual(response.headers["vary"], "Accept")
+        self.assertEqual(
+            msgpack.unpackb(response.content),
+            [{"id": 1, "name": "test1", "description": None}],
+        )
+
+    def test_create_sample_msgpack(self):
+        # Arrange
+        self.mock_sample_repository.create.return_value = SampleTable(
+            id=1, name="test1", description="äöü"
+        )
+
+        # Act
+        response = self.client.post(
+            "/samples/",
+            data=msgpack.packb({"name": "test1", "description": "äöü"}),
+            headers={"Content-Type": "application/msgpack"},
+        )
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.headers["content-type"], "application/json")
+        self.assertEqual(
+            response.json(), {"id": 1, "name": "test1", "description": "äöü"}
+        )
+        (created,) = self.mock_sample_repository.create.call_args.args
+        self.assertEqual((created.name, created.description), ("test1", "äöü"))
+
+    def test_create_sample_msgpack_validation_error(self):
+        # Act
+        too_long = self.client.post(
+            "/samples/",
+            data=msgpack.packb({"name": "a name that is too long"}),
+            headers={"Content-Type": "application/msgpack"},
+        )
+        invalid = self.client.post(
+            "/samples/",
+            data=b"\xc1",
+            headers={"Content-Type": "application/msgpack"},
+        )
+
+        # Assert
+        self.assertEqual(too_long.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(too_long.json()["detail"][0]["loc"], ["body", "name"])
+        self.assertEqual(invalid.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.mock_sample_repository.create.assert_not_called()
+
     def test_get_sample_by_id(self):
         # Arrange
         self.mock_sample_repository.get_by_id.return_value = SampleTable(
@@ -52,4 +133,135 @@ class TestSamples(unittest.TestCase):
         self.assertEqual(
             response.json(), {"id": 1, "name": "test1", "description": None}
         )
-        self.mock_sample_repository.get_by_id.assert_called_once_with(1)
+        self.mock_sample_repository.get_by_id.assert_called_once_with(1, fields=None)
+
+    def test_get_samples_with_fields(self):
+        # Arrange
+        self.mock_sample_repository.get.return_value = [{"id": 1, "name": "test1"}]
+
+        # Act
+        response = self.client.get("/samples", params={"fields": "name"})
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), [{"id": 1, "name": "test1"}])
+        self.mock_sample_repository.get.assert_called_once_with(
+            created_after=None, created_before=None, fields=frozenset({"id", "name"})
+        )
+
+    def test_get_sample_by_id_with_fields_as_msgpack(self):
+        # Arrange
+        self.mock_sample_repository.get_by_id.return_value = {"id": 1, "name": "t"}
+
+        # Act
+        response = self.client.get(
+            "/samples/1",
+            params={"fields": "name"},
+            headers={"Accept": "application/msgpack"},
+        )
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.headers["content-type"], "application/msgpack")
+        self.assertEqual(msgpack.unpackb(response.content), {"id": 1, "name": "t"})
+
+    def test_get_sample_by_id_with_unknown_fields(self):
+        # Act
+        response = self.client.get("/samples/1", params={"fields": "name,secret"})
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {"detail": "Unknown fields: secret"})
+        self.mock_sample_repository.get_by_id.assert_not_called()
+
+    def test_search_samples(self):
+        # Arrange
+        self.mock_sample_repository.search.return_value = [
+            (SampleTable(id=2, name="test2"), 0.75),
+            (SampleTable(id=1, name="test1"), 0.5),
+        ]
+
+        # Act
+        response = self.client.get("/samples/search?q=test&limit=1")
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.json()
+        self.assertEqual(
+            body["items"], [{"id": 2, "name": "test2", "description": None}]
+        )
+        self.assertIsNotNone(body["next_cursor"])
+        self.mock_sample_repository.search.assert_called_once_with(
+            "test", limit=2, after=None
+        )
+
+        # Act
+        self.mock_sample_repository.search.reset_mock()
+        self.mock_sample_repository.search.return_value = []
+        response = self.client.get(
+            "/samples/search", params={"q": "test", "cursor": body["next_cursor"]}
+        )
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {"items": [], "next_cursor": None})
+        self.mock_sample_repository.search.assert_called_once_with(
+            "test", limit=21, after=(0.75, 2)
+        )
+
+    def test_search_samples_validation_error(self):
+        response = self.client.get("/samples/search")
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(
+            response.content,
+            b'{"detail":[{"loc":["query","q"],"msg":"field required",'
+            b'"type":"value_error.missing"}]}',
+        )
+
+    def test_search_samples_invalid_cursor(self):
+        # Act
+        response = self.client.get("/samples/search?q=test&cursor=invalid")
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.mock_sample_repository.search.assert_not_called()
+
+    def test_get_sample_stats_exact(self):
+        # Arrange
+        self.mock_sample_repository.count_estimate.return_value = None
+        self.mock_sample_repository.count.return_value = 42
+        self.mock_sample_repository.count_per_day.return_value = [
+            (date(2022, 11, 12), 42)
+        ]
+
+        # Act
+        response = self.client.get("/samples/stats")
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json(),
+            {
+                "total": {"value": 42, "exact": True},
+                "per_day": [{"day": "2022-11-12", "value": 42, "exact": True}],
+            },
+        )
+        self.mock_sample_repository.count.assert_called_once()
+
+    def test_get_sample_stats_estimated_and_cached(self):
+        # Arrange
+        self.mock_sample_repository.count_estimate.return_value = 10_000_000
+        self.mock_sample_repository.count_per_day.return_value = []
+
+        # Act
+        self.client.get("/samples/stats")
+        response = self.client.get("/samples/stats")
+
+        # Assert
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json()["total"], {"value": 10_000_000, "exact": False}
+        )
+        self.mock_sample_repository.count.assert_not_called()
+        self.mock_sample_repository.count_estimate.assert_called_once()
+        self.mock_sample_repository.count_per_day.assert_called_once()
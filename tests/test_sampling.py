@@ -0,0 +1,153 @@
+import unittest
+
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import (
+    NonRecordingSpan,
+    SpanContext,
+    Status,
+    StatusCode,
+    TraceFlags,
+)
+
+from app.telemetry.profiling import PROFILE_STACKS_KEY
+from app.telemetry.sampling import (
+    TAIL_SAMPLING_REASON_KEY,
+    TailSamplingSpanProcessor,
+    create_sampler,
+)
+from tests._helper.settings import base_mock_settings
+
+SPANS = 10_000
+
+
+class TestSampling(unittest.TestCase):
+    def setUp(self):
+        self.exporter = InMemorySpanExporter()
+
+    def tracer(self, **settings) -> trace.Tracer:
+        settings = base_mock_settings.copy(update=settings)
+        provider = TracerProvider(sampler=create_sampler(settings))
+
+        self.processor = SimpleSpanProcessor(self.exporter)
+        if settings.TRACING_TAIL_SAMPLING_ENABLED:
+            self.processor = TailSamplingSpanProcessor(
+                self.processor,
+                latency_threshold=settings.TRACING_TAIL_LATENCY_THRESHOLD_MS / 1000,
+                max_traces=settings.TRACING_TAIL_BUFFER_MAX_TRACES,
+            )
+        provider.add_span_processor(self.processor)
+
+        return provider.get_tracer(__name__)
+
+    def exported_names(self) -> list[str]:
+        return [span.name for span in self.exporter.get_finished_spans()]
+
+    def test_route_rates(self):
+        tracer = self.tracer(
+            TRACING_SAMPLER_RATE=0.25,
+            TRACING_ROUTE_SAMPLER_RATES={"/health": 0, "/samples/{id}": 1},
+        )
+
+        for _ in range(SPANS):
+            for route in ["/samples", "/health", "/samples/{id}"]:
+                with tracer.start_as_current_span(route):
+                    with tracer.start_as_current_span("SELECT"):
+                        pass
+
+        names = self.exported_names()
+        self.assertAlmostEqual(names.count("/samples") / SPANS, 0.25, delta=0.03)
+        self.assertEqual(names.count("/health"), 0)
+        self.assertEqual(names.count("/samples/{id}"), SPANS)
+        # child spans follow the decision of their parent
+        self.assertEqual(names.count("SELECT"), SPANS + names.count("/samples"))
+
+    def test_max_traces_per_second(self):
+        tracer = self.tracer(TRACING_MAX_TRACES_PER_SECOND=10)
+
+        for _ in range(SPANS):
+            with tracer.start_as_current_span("/samples"):
+                pass
+
+        # the burst capacity plus the tokens refilled while the loop runs
+        self.assertGreaterEqual(len(self.exported_names()), 10)
+        self.assertLess(len(self.exported_names()), 50)
+
+    def test_remote_parent(self):
+        tracer = self.tracer(TRACING_SAMPLER_RATE=0)
+
+        for flags in [TraceFlags.SAMPLED, TraceFlags.DEFAULT]:
+            parent = NonRecordingSpan(
+                SpanContext(
+                    trace_id=flags + 1,
+                    span_id=1,
+                    is_remote=True,
+                    trace_flags=TraceFlags(flags),
+                )
+            )
+            with trace.use_span(parent):
+                with tracer.start_as_current_span(f"/samples {flags}"):
+                    pass
+
+        self.assertEqual(self.exported_names(), [f"/samples {TraceFlags.SAMPLED}"])
+
+    def test_tail_sampling_keeps_errors_and_slow_traces(self):
+        tracer = self.tracer(
+            TRACING_SAMPLER_RATE=0, TRACING_TAIL_LATENCY_THRESHOLD_MS=1000
+        )
+
+        with tracer.start_as_current_span("/fast"):
+            with tracer.start_as_current_span("SELECT fast"):
+                pass
+
+        with tracer.start_as_current_span("/error"):
+            with tracer.start_as_current_span("SELECT error") as span:
+                span.set_status(Status(StatusCode.ERROR))
+
+        root = tracer.start_span("/slow", start_time=0)
+        with trace.use_span(root, end_on_exit=False):
+            with tracer.start_as_current_span("SELECT slow"):
+                pass
+        root.end(end_time=2_000_000_000)
+
+        spans = self.exporter.get_finished_spans()
+        self.assertEqual(
+            [span.name for span in spans],
+            ["SELECT error", "/error", "SELECT slow", "/slow"],
+        )
+        self.assertTrue(all(span.context.trace_flags.sampled for span in spans))
+        self.assertEqual(spans[1].attributes[TAIL_SAMPLING_REASON_KEY], "error")
+        self.assertEqual(spans[3].attributes[TAIL_SAMPLING_REASON_KEY], "latency")
+
+    def test_tail_sampling_keeps_profiled_traces(self):
+        tracer = self.tracer(TRACING_SAMPLER_RATE=0)
+
+        with tracer.start_as_current_span("/samples") as span:
+            span.set_attribute(PROFILE_STACKS_KEY, "main;handler 1")
+
+        (span,) = self.exporter.get_finished_spans()
+        self.assertEqual(span.attributes[TAIL_SAMPLING_REASON_KEY], "profile")
+
+    def test_tail_sampling_disabled(self):
+        tracer = self.tracer(
+            TRACING_SAMPLER_RATE=0, TRACING_TAIL_SAMPLING_ENABLED=False
+        )
+
+        with tracer.start_as_current_span("/error") as span:
+            self.assertFalse(span.is_recording())
+            span.set_status(Status(StatusCode.ERROR))
+
+        self.assertEqual(self.exported_names(), [])
+
+    def test_tail_sampling_buffer_is_bounded(self):
+        tracer = self.tracer(TRACING_SAMPLER_RATE=0, TRACING_TAIL_BUFFER_MAX_TRACES=2)
+
+        roots = [tracer.start_span(f"/samples {i}") for i in range(3)]
+        for root in roots:
+            root.set_status(Status(StatusCode.ERROR))
+            root.end()
+
+        self.assertEqual(self.processor.dropped_traces, 1)
+        self.assertEqual(self.exported_names(), ["/samples 1", "/samples 2"])
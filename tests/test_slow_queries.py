@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import unittest
+from unittest.mock import MagicMock, patch
+
+from opentelemetry.sdk.trace import TracerProvider
+from sqlalchemy import create_engine, text
+
+from app.database.slow_queries import (
+    OTHER_STATEMENTS,
+    QueryMonitor,
+    fingerprint,
+    parameter_shape,
+)
+
+
+class TestFingerprint(unittest.TestCase):
+    def test_fingerprint(self):
+        self.assertEqual(
+            fingerprint(
+                "SELECT sample.id, sample.name\n  FROM sample_2023_01 AS sample\n"
+                "WHERE sample.id IN ($1, $2, $3) AND name = 'it''s' LIMIT 10 "
+                "/*traceparent='00-abc-def-01'*/"
+            ),
+            "SELECT sample.id, sample.name FROM sample_2023_01 AS sample "
+            "WHERE sample.id IN (...) AND name = ? LIMIT ?",
+        )
+        self.assertEqual(
+            fingerprint("UPDATE sample SET name=%s WHERE id = %(id)s"),
+            "UPDATE sample SET name=? WHERE id = ?",
+        )
+
+    def test_parameter_shape(self):
+        self.assertEqual(parameter_shape((1, "a", None)), "(int, str, NoneType)")
+        self.assertEqual(parameter_shape({"id": 1}), "(id: int)")
+        self.assertEqual(parameter_shape([(1, "a"), (2, "b")], True), "2 x (int, str)")
+        self.assertEqual(parameter_shape(None), "()")
+
+
+class TestQueryMonitor(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+
+    def execute(self, *statements: str):
+        with self.engine.connect() as conn:
+            for statement in statements:
+                conn.execute(text(statement), {"id": 1})
+
+    def test_aggregates_statements(self):
+        # Arrange
+        monitor = QueryMonitor(slow_query_threshold=60, max_statements=1)
+        monitor.instrument(self.engine)
+
+        # Act
+        self.execute(
+            "SELECT 1 WHERE 1 = :id",
+            "SELECT 2 WHERE 2 = :id",
+            "SELECT :id + 1",
+            "SELECT :id + 2",
+        )
+
+        # Assert
+        (first, other) = monitor.top(order_by="calls")
+        self.assertEqual(first.fingerprint, "SELECT ? WHERE ? = ?")
+        self.assertEqual(first.calls, 2)
+        self.assertEqual(first.slow_calls, 0)
+        self.assertGreater(first.total_ms, 0)
+        self.assertEqual(other.fingerprint, OTHER_STATEMENTS)
+        self.assertEqual(other.calls, 2)
+
+        monitor.reset()
+        self.assertEqual(monitor.top(), [])
+
+    def test_reports_slow_queries(self):
+        # Arrange
+        monitor = QueryMonitor(slow_query_threshold=0)
+        monitor.instrument(self.engine)
+        tracer = TracerProvider().get_tracer(__name__)
+
+        # Act
+        with self.assertLogs(
+            "app.database.slow_queries", logging.WARNING
+        ) as logs, tracer.start_as_current_span("request") as span:
+            self.execute("SELECT 1 WHERE 1 = :id", "CREATE TABLE sample (id INT)")
+
+        # Assert
+        self.assertEqual(
+            [record.statement for record in logs.records],
+            ["SELECT ? WHERE ? = ?", "CREATE TABLE sample (id INT)"],
+        )
+        self.assertEqual(logs.records[0].parameters, "(int)")
+
+        event = span.events[0]
+        self.assertEqual(event.name, "slow_query")
+        self.assertEqual(event.attributes["db.statement"], "SELECT ? WHERE ? = ?")
+
+    def test_instrument_engine_without_monitor(self):
+        # Arrange
+        QueryMonitor.instrument_engine(self.engine)
+        monitor = QueryMonitor(slow_query_threshold=60)
+
+        # Act
+        with patch.object(QueryMonitor, "_monitor", None):
+            self.execute("SELECT 1 WHERE 1 = :id")
+        with patch.object(QueryMonitor, "_monitor", monitor):
+            self.execute("SELECT 2 WHERE 2 = :id")
+
+        # Assert
+        (stats,) = monitor.top()
+        self.assertEqual(stats.calls, 1)
+
+
+class TestExplain(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        self.monitor = QueryMonitor(slow_query_threshold=0, explain_sample_rate=1)
+        self.monitor.instrument(self.engine)
+
+    def execute(self, statement: str):
+        with self.engine.connect() as conn:
+            conn.execute(text(statement), {"id": 1})
+
+    async def test_explains_in_background(self):
+        # Arrange
+        explained = asyncio.Event()
+
+        async def explain(engine, statement, parameters):
+            await explained.wait()
+            return "Seq Scan on sample"
+
+        tracer = TracerProvider().get_tracer(__name__)
+
+        # Act
+        with patch.object(
+            self.monitor, "_explain", side_effect=explain
+        ), self.assertLogs("app.database.slow_queries", logging.INFO) as logs:
+            with tracer.start_as_current_span("request") as span:
+                self.execute("SELECT 1 WHERE 1 = :id")
+                # the slow query doesn't wait for the plan
+                self.assertEqual(len(self.monitor._explaining), 1)
+                explained.set()
+                await asyncio.gather(*self.monitor._explaining)
+
+        # Assert
+        self.assertEqual(logs.records[-1].plan, "Seq Scan on sample")
+        self.assertEqual(
+            [event.name for event in span.events], ["slow_query", "slow_query_plan"]
+        )
+
+    async def test_skips_locking_statements(self):
+        # Act
+        with patch.object(self.monitor, "_explain") as explain, self.assertLogs(
+            "app.database.slow_queries", logging.WARNING
+        ):
+            # SQLite has no row locks
+            self.monitor.record(
+                MagicMock(), "SELECT id FROM sample FOR UPDATE", (), False, 1.0
+            )
+
+        # Assert
+        explain.assert_not_called()
@@ -0,0 +1,86 @@
+import os
+import re
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+# recorded at ~830ms for `import app.main`, raise it deliberately when needed.
+# IMPORT_TIME_BUDGET_MS overrides it on slow machines.
+IMPORT_TIME_BUDGET_MS = int(os.environ.get("IMPORT_TIME_BUDGET_MS", 1100))
+
+# only imported when their feature is enabled
+LAZY_MODULES = [
+    "azure.monitor.opentelemetry.exporter",
+    "opentelemetry.exporter.otlp",
+    "opentelemetry.instrumentation.asyncpg",
+    "opentelemetry.instrumentation.httpx",
+    "opentelemetry.instrumentation.redis",
+    "opentelemetry.instrumentation.sqlalchemy",
+    "opentelemetry.instrumentation.system_metrics",
+    "cbor2",
+]
+
+CONFIG_PATH = Path(__file__).parent.parent / "gunicorn.conf.py"
+
+# imported by the gunicorn hooks, not when the config is loaded
+CONFIG_LAZY_MODULES = ["opentelemetry.sdk", "app.telemetry.azure_monitor"]
+
+ENV = {
+    **os.environ,
+    "TENANT_ID": "00000000-0000-0000-0000-000000000000",
+    "OPENAPI_CLIENT_ID": "00000000-0000-0000-0000-000000000000",
+    "API_CLIENT_ID": "00000000-0000-0000-0000-000000000000",
+    "POSTGRES_CONNECTION_STRING": "postgresql://user@example.com:5432/main",
+}
+
+
+def import_times(code: str) -> dict[str, int]:
+    """Returns the cumulative import time in microseconds of all modules imported
+    by `code`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        env=ENV,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    times = {}
+    for match in re.finditer(
+        r"^import time:\s+\d+ \|\s+(\d+) \| ( *)(\S+)$", result.stderr, re.MULTILINE
+    ):
+        times[match.group(3)] = int(match.group(1))
+    return times
+
+
+class TestStartup(unittest.TestCase):
+    def test_import_time_budget(self):
+        # Act
+        import_time_ms = min(
+            import_times("import app.main")["app.main"] for _ in range(5)
+        )
+        import_time_ms /= 1000
+
+        # Assert
+        self.assertLess(
+            import_time_ms,
+            IMPORT_TIME_BUDGET_MS,
+            f"Importing app.main took {import_time_ms:.0f}ms",
+        )
+
+    def test_lazy_imports(self):
+        # Act
+        modules = import_times("import app.main")
+
+        # Assert
+        for module in LAZY_MODULES:
+            self.assertNotIn(module, modules)
+
+    def test_gunicorn_config_lazy_imports(self):
+        # Act
+        modules = import_times(f"import runpy; runpy.run_path({str(CONFIG_PATH)!r})")
+
+        # Assert
+        for module in CONFIG_LAZY_MODULES:
+            self.assertNotIn(module, modules)